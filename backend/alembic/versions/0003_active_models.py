@@ -0,0 +1,45 @@
+"""add active_models pointer table and (plan, created_at) index"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0003_active_models"
+down_revision = "0002_add_billing_fields"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_model_versions_plan_created_at", "model_versions", ["plan", "created_at", "id"])
+    op.create_table(
+        "active_models",
+        sa.Column("plan", sa.String, primary_key=True),
+        sa.Column(
+            "model_version_id",
+            sa.Integer,
+            sa.ForeignKey("model_versions.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("uri", sa.String, nullable=False),
+        sa.Column("promoted_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    # Point every plan at its newest version, which is what the registry served before.
+    op.execute(
+        """
+        INSERT INTO active_models (plan, model_version_id, uri, promoted_at)
+        SELECT mv.plan, mv.id, mv.uri, mv.created_at
+        FROM model_versions mv
+        WHERE mv.id = (
+            SELECT latest.id FROM model_versions latest
+            WHERE latest.plan = mv.plan
+            ORDER BY latest.created_at DESC, latest.id DESC
+            LIMIT 1
+        )
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("active_models")
+    op.drop_index("ix_model_versions_plan_created_at", table_name="model_versions")
@@ -0,0 +1,19 @@
+"""add (user_id, created_at) trade and (user_id, date) metrics indexes"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0004_history_indexes"
+down_revision = "0003_active_models"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_trades_user_created_at", "trades", ["user_id", "created_at", "id"])
+    op.create_index("ix_daily_metrics_user_date", "daily_metrics", ["user_id", "date"])
+
+
+def downgrade():
+    op.drop_index("ix_daily_metrics_user_date", table_name="daily_metrics")
+    op.drop_index("ix_trades_user_created_at", table_name="trades")
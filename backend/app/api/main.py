@@ -2,17 +2,25 @@ import asyncio
 import random
 from fastapi import APIRouter, FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from jose import JWTError
 from sqlalchemy import select
 
 from app import models as orm_models  # noqa: F401  ensures models are imported for metadata
+from app.api.middleware import MetricsMiddleware, TracingMiddleware
 from app.api.routes import auth, billing, brokers, chat, dashboard, models as model_routes, plans, portfolio, trading
+from app.core import metrics
 from app.core.config import settings
 from app.core.database import AsyncSessionLocal, init_models
 from app.core.security import decode_token
 from app.models.user import User
+from app.services.ledger import open_ledger, paper_ledger
+from app.services.ledger_server import ledger_client
+from app.services.ml_model_service import ml_model_service
+from app.services.prediction_log import prediction_log
+from app.services.risk_service import risk_service
 from app.services.trading_engine import trading_engine
+from app.services.write_behind import write_buffer
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
@@ -24,6 +32,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 api_router = APIRouter(prefix="/api/v1")
 api_router.include_router(auth.router)
@@ -42,6 +52,24 @@ app.include_router(api_router)
 async def on_startup() -> None:
     # Create tables for dev environments; production should rely on Alembic migrations
     await init_models()
+    if ledger_client is None:
+        # This process owns the ledger; raises LedgerOwnedError if another one already does.
+        await asyncio.to_thread(open_ledger, paper_ledger)
+        app.state.risk_bars = asyncio.create_task(risk_service.run_bars())
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    risk_bars = getattr(app.state, "risk_bars", None)
+    if risk_bars is not None:
+        risk_bars.cancel()
+    # Score queued shadow work and persist buffered prediction-log, trade and chat rows before exiting.
+    await asyncio.to_thread(ml_model_service.shadow.stop)
+    await asyncio.to_thread(prediction_log.stop)
+    await write_buffer.close()
+    await asyncio.to_thread(paper_ledger.release)
+    if ledger_client is not None:
+        ledger_client.close()
 
 
 @app.get("/health")
@@ -49,9 +77,16 @@ async def health() -> JSONResponse:
     return JSONResponse({"status": "ok"})
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    return Response(metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
 @app.websocket("/ws/paper-stream")
 async def paper_stream(websocket: WebSocket):
     await websocket.accept()
+    labels = ("paper-stream",)
+    metrics.WEBSOCKET_CONNECTIONS.inc(labels=labels)
     async with AsyncSessionLocal() as db:
         user = None
         token = websocket.query_params.get("token")
@@ -79,18 +114,28 @@ async def paper_stream(websocket: WebSocket):
                     "pnl": trade["pnl"],
                     "timestamp": trade["created_at"].isoformat() if hasattr(trade["created_at"], "isoformat") else str(trade["created_at"]),
                 }
-                await websocket.send_json({"type": "trade", "payload": trade_event, "signal": event["signal"]})
-                await asyncio.sleep(3)
+                metrics.WEBSOCKET_SEND_QUEUE.inc(labels=labels)
+                try:
+                    await websocket.send_json({"type": "trade", "payload": trade_event, "signal": event["signal"]})
+                finally:
+                    metrics.WEBSOCKET_SEND_QUEUE.dec(labels=labels)
+                await asyncio.sleep(settings.PAPER_STREAM_INTERVAL_SECONDS)
         except WebSocketDisconnect:
             return
+        finally:
+            metrics.WEBSOCKET_CONNECTIONS.dec(labels=labels)
 
 
 @app.websocket("/ws/chat")
 async def chat_ws(websocket: WebSocket):
     await websocket.accept()
+    labels = ("chat",)
+    metrics.WEBSOCKET_CONNECTIONS.inc(labels=labels)
     try:
         while True:
             data = await websocket.receive_text()
             await websocket.send_text(f"Echo: {data}")
     except WebSocketDisconnect:
         return
+    finally:
+        metrics.WEBSOCKET_CONNECTIONS.dec(labels=labels)
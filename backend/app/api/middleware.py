@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics, tracing
+from app.core.config import settings
+
+
+def route_template(scope: Scope) -> str:
+    """Route path template (``/api/v1/trading/signal``) so metrics are not keyed by raw URLs."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency and per-request SQL usage."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        db_stats = [0, 0.0]
+        token = metrics.request_db_stats.set(db_stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.request_db_stats.reset(token)
+            route = route_template(scope)
+            metrics.HTTP_REQUEST_SECONDS.observe(elapsed, (scope["method"], route, status_code))
+            metrics.HTTP_REQUEST_DB_QUERIES.observe(db_stats[0], (route,))
+            metrics.HTTP_REQUEST_DB_SECONDS.observe(db_stats[1], (route,))
+
+
+class TracingMiddleware:
+    """Traces sampled requests (or trusted ones sent with the trace header) and profiles slow ones.
+
+    A trusted request sending the trace header with the value ``profile`` also
+    enables the sampling profiler for that request; otherwise traced requests are
+    profiled when ``PROFILE_SLOW_REQUEST_MS`` is set. See ``tracing.header_trusted``.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.header = settings.TRACE_HEADER.lower().encode()
+        self.key_header = settings.TRACE_KEY_HEADER.lower().encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header_value = trace_key = authorization = None
+        for key, value in scope.get("headers", ()):
+            if key == self.header:
+                header_value = value.decode("latin-1")
+            elif key == self.key_header:
+                trace_key = value.decode("latin-1")
+            elif key == b"authorization":
+                authorization = value.decode("latin-1")
+        trusted = header_value is not None and tracing.header_trusted(trace_key, authorization)
+        if not tracing.should_trace(header_value, trusted):
+            await self.app(scope, receive, send)
+            return
+
+        trace, token = tracing.start_trace(f"{scope['method']} {scope['path']}")
+        profile_enabled = (trusted and header_value == "profile") or settings.PROFILE_SLOW_REQUEST_MS > 0
+        profile = tracing.profiler().begin() if profile_enabled else None
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-trace-id", trace.trace_id.encode())]
+            await send(message)
+
+        start_ns = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_ns = time.perf_counter_ns()
+            trace.add_complete(f"{scope['method']} {route_template(scope)}", start_ns, end_ns)
+            tracing.end_trace(token)
+            if profile is not None:
+                tracing.profiler().end()
+            slow = (end_ns - start_ns) / 1e6 >= settings.PROFILE_SLOW_REQUEST_MS
+            loop = asyncio.get_running_loop()
+            loop.run_in_executor(None, tracing.write_trace, trace)
+            if profile is not None and profile.samples and slow:
+                loop.run_in_executor(None, tracing.write_folded, trace.trace_id, profile)
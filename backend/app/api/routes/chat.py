@@ -14,6 +14,8 @@ async def ask_question(
     db: AsyncSession = Depends(deps.get_db),
     current_user=Depends(deps.get_current_active_user),
 ):
+    """Explain a trade. The question and answer are stored write-behind, and a
+    ``trade_id`` from the live stream is only found once its row has been flushed."""
     answer = await chat_service.explain_trade_decision(
         db, user_id=current_user.id, question=payload.question, trade_id=payload.trade_id
     )
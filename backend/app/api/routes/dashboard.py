@@ -14,6 +14,7 @@ router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 async def get_summary(
     *, db: AsyncSession = Depends(deps.get_db), current_user: User = Depends(deps.get_current_active_user)
 ):
+    """PnL and trade count. Streamed paper trades are written behind, so they may lag by ``WRITE_BEHIND_FLUSH_SECONDS``."""
     result = await db.execute(
         select(func.coalesce(func.sum(Trade.pnl), 0), func.count(Trade.id)).where(Trade.user_id == current_user.id)
     )
@@ -1,26 +1,63 @@
+from pathlib import Path
+
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
+from app.models.user import User
 from app.services.ml_model_service import ml_model_service
-from ml.model_registry import get_latest_model_uri, list_model_versions, register_model_version
+from ml.model_registry import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    MODEL_DIR,
+    get_active_models,
+    get_latest_model_uri,
+    is_registered_uri,
+    list_model_versions,
+    promote_model_version,
+    register_model_version,
+)
 
 router = APIRouter(prefix="/models", tags=["models"])
 
 
+def _version_out(version) -> dict:
+    return {
+        "id": version.id,
+        "plan": version.plan,
+        "uri": version.uri,
+        "sharpe": version.sharpe,
+        "win_rate": version.win_rate,
+        "created_at": version.created_at,
+    }
+
+
 @router.get("/latest")
 async def latest_models(plan: str | None = Query(None), db: AsyncSession = Depends(deps.get_db)):
-    versions = await list_model_versions(plan, db_session=db)
-    latest = {}
-    for version in versions:
-        if version.plan not in latest:
-            latest[version.plan] = {
-                "uri": version.uri,
-                "sharpe": version.sharpe,
-                "win_rate": version.win_rate,
-                "created_at": version.created_at,
-            }
-    return latest
+    versions = await get_active_models(plan, db_session=db)
+    return {
+        version.plan: {
+            "uri": version.uri,
+            "sharpe": version.sharpe,
+            "win_rate": version.win_rate,
+            "created_at": version.created_at,
+        }
+        for version in versions
+    }
+
+
+@router.get("/versions")
+async def model_versions(
+    plan: str | None = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: int | None = Query(None, description="id of the last version on the previous page"),
+    db: AsyncSession = Depends(deps.get_db),
+):
+    versions = await list_model_versions(plan, db_session=db, limit=limit, before_id=before)
+    return {
+        "items": [_version_out(version) for version in versions],
+        "next_cursor": versions[-1].id if len(versions) == limit else None,
+    }
 
 
 @router.get("/test")
@@ -42,7 +79,7 @@ async def test_model(plan: str = Query("free", pattern="^(free|pro|enterprise)$"
         "quant_factor": 0.5,
         "price": 100.0,
     }
-    signal = await ml_model_service.predict_signal(plan, dummy_features, db)
+    signal, uri = await ml_model_service.predict_signal(plan, dummy_features, db)
     return {"plan": plan, "uri": uri, "signal": signal}
 
 
@@ -50,13 +87,54 @@ async def test_model(plan: str = Query("free", pattern="^(free|pro|enterprise)$"
 async def promote_model(
     payload: dict,
     db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_admin_user),
+):
+    if payload.get("id") is not None:
+        # Repoint the plan at an already registered version (promotion or rollback).
+        version = await promote_model_version(int(payload["id"]), db)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Model version not found")
+    else:
+        plan = payload.get("plan")
+        uri = payload.get("uri")
+        sharpe = float(payload.get("sharpe", 0))
+        win_rate = float(payload.get("win_rate", 0))
+        if not plan or not uri:
+            raise HTTPException(status_code=400, detail="plan and uri (or id) are required")
+        version = await register_model_version(plan, uri, sharpe, win_rate, db)
+    await ml_model_service.clear_cache()
+    return {"id": version.id, "plan": version.plan, "uri": version.uri}
+
+
+@router.get("/shadow")
+async def shadow_status():
+    return ml_model_service.shadow.summary()
+
+
+@router.post("/shadow")
+async def set_shadow_model(
+    payload: dict,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_admin_user),
 ):
+    """Score a candidate in shadow; ``uri`` must be under the model directory or a registered version."""
     plan = payload.get("plan")
     uri = payload.get("uri")
-    sharpe = float(payload.get("sharpe", 0))
-    win_rate = float(payload.get("win_rate", 0))
-    if not plan or not uri:
-        raise HTTPException(status_code=400, detail="plan and uri are required")
-    version = await register_model_version(plan, uri, sharpe, win_rate, db)
-    ml_model_service.load_model.cache_clear()
-    return {"id": version.id, "plan": version.plan, "uri": version.uri}
+    if plan not in {"free", "pro", "enterprise"} or not uri:
+        raise HTTPException(status_code=400, detail="plan (free, pro or enterprise) and uri are required")
+    if not Path(uri).resolve().is_relative_to(MODEL_DIR.resolve()) and not await is_registered_uri(uri, db):
+        raise HTTPException(status_code=400, detail="uri must be in the model directory or a registered model version")
+    if not Path(uri).exists():
+        raise HTTPException(status_code=404, detail="Model artifact not found")
+    ml_model_service.shadow.set_shadow(plan, uri)
+    return {"plan": plan, "uri": uri}
+
+
+@router.delete("/shadow")
+async def remove_shadow_model(
+    plan: str = Query(..., pattern="^(free|pro|enterprise)$"), current_user: User = Depends(deps.get_current_admin_user)
+):
+    uri = ml_model_service.shadow.remove_shadow(plan)
+    if uri is None:
+        raise HTTPException(status_code=404, detail="No shadow model for plan")
+    return {"plan": plan, "uri": uri}
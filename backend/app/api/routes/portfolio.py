@@ -1,16 +1,93 @@
-from fastapi import APIRouter, Depends
+import asyncio
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
+from app.models.user import PlanEnum
 from app.schemas.portfolio import DailyMetricsRead
+from app.services.ledger import paper_ledger
+from app.services.ledger_server import LedgerServerError, ledger_client
 from app.services.portfolio_service import portfolio_service
+from app.services.risk_service import risk_service
 
 router = APIRouter(prefix="/portfolio", tags=["portfolio"])
 
 
 @router.get("/metrics", response_model=list[DailyMetricsRead])
 async def get_metrics(
-    *, db: AsyncSession = Depends(deps.get_db), current_user=Depends(deps.get_current_active_user)
+    *,
+    limit: int = Query(365, ge=1, le=5000),
+    before: date | None = Query(None, description="date of the last row on the previous page"),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user=Depends(deps.get_current_active_user),
 ):
-    metrics = await portfolio_service.get_metrics(db, current_user.id)
+    """Daily metrics; trades booked in the last ``WRITE_BEHIND_FLUSH_SECONDS`` may not be reflected yet."""
+    metrics = await portfolio_service.get_metrics(db, current_user.id, limit=limit, before=before)
     return metrics
+
+
+@router.get("/positions")
+async def get_positions(current_user=Depends(deps.get_current_active_user)):
+    """Open paper positions, cash and PnL marked at the latest prices."""
+    if ledger_client is None:
+        return paper_ledger.account(current_user.id)
+    try:
+        return await ledger_client.account(current_user.id)
+    except LedgerServerError as exc:
+        raise HTTPException(status_code=503, detail="Paper ledger is unavailable") from exc
+
+
+@router.get("/risk")
+async def get_risk(
+    *,
+    monte_carlo: bool = Query(False, description="add simulated VaR/CVaR from correlated return paths"),
+    paths: int = Query(10_000, ge=100, le=100_000),
+    horizon: int = Query(1, ge=1, le=250, description="bars"),
+    current_user=Depends(deps.get_current_active_user),
+):
+    """Risk analytics (ENTERPRISE): VaR, CVaR, exposure and risk contributions as of the last bar.
+
+    A bar is ``RISK_BAR_SECONDS`` of ledger marks; see ``app.services.risk_service``.
+    """
+    if current_user.plan != PlanEnum.enterprise:
+        raise HTTPException(status_code=403, detail="Risk analytics require the ENTERPRISE plan")
+    if ledger_client is not None:
+        try:
+            risk = await ledger_client.risk(current_user.id, monte_carlo=monte_carlo, paths=paths, horizon=horizon)
+        except LedgerServerError as exc:
+            raise HTTPException(status_code=503, detail="Paper ledger is unavailable") from exc
+        if risk is None:
+            raise HTTPException(status_code=503, detail="Risk has not been computed yet")
+        return risk
+    risk = risk_service.user_risk(current_user.id)
+    if risk is None:
+        raise HTTPException(status_code=503, detail="Risk has not been computed yet")
+    if monte_carlo:
+        simulated = await asyncio.to_thread(risk_service.monte_carlo, [current_user.id], paths, horizon)
+        risk["monte_carlo"] = simulated.get(current_user.id)
+    return risk
+
+
+@router.get("/export")
+async def export_report(
+    *,
+    dataset: str = Query("trades", pattern="^(trades|metrics)$"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user=Depends(deps.get_current_active_user),
+):
+    """Custom reporting (ENTERPRISE): stream the full history without loading it into memory.
+
+    Trades are written behind, so the newest ones (up to ``WRITE_BEHIND_FLUSH_SECONDS`` old) may be missing.
+    """
+    if current_user.plan != PlanEnum.enterprise:
+        raise HTTPException(status_code=403, detail="Custom reporting requires the ENTERPRISE plan")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"investia-{dataset}-{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        portfolio_service.export_rows(current_user.id, dataset, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,11 +1,14 @@
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
+from app.schemas.trading import TradePage
 from app.services.trading_engine import trading_engine
 from app.services.ml_model_service import ml_model_service
+from app.services.portfolio_service import portfolio_service
+from app.services.prediction_log import prediction_log
 
 router = APIRouter(prefix="/trading", tags=["trading"])
 
@@ -16,14 +19,56 @@ async def get_signal(
     db: AsyncSession = Depends(deps.get_db),
     current_user=Depends(deps.get_current_active_user),
 ):
-    features = trading_engine.build_realtime_features(symbol)
-    signal = await ml_model_service.generate_signal_for_user(current_user, features, db)
+    plan_value = getattr(current_user.plan, "value", current_user.plan)
+    if symbol in trading_engine.symbols:
+        tick = await trading_engine.universe_tick(plan_value, db)
+        features, signal, model_uri = tick.features_for(symbol), tick.signals[symbol], tick.model_uri
+    else:
+        features = trading_engine.build_realtime_features(symbol)
+        signal, model_uri = await ml_model_service.predict_signal(plan_value, features, db)
+    prediction_log.log(
+        plan_value,
+        symbol,
+        features,
+        signal,
+        model=model_uri,
+        user_id=current_user.id,
+        source="signal_api",
+    )
     side = "buy" if signal == 1 else ("sell" if signal == -1 else "flat")
     return {
-        "plan_used": getattr(current_user.plan, "value", current_user.plan),
+        "plan_used": plan_value,
         "symbol": symbol,
         "side": side,
         "price": round(features.get("price", 0.0), 4),
         "timestamp": datetime.utcnow().isoformat(),
         "features": features,
     }
+
+
+@router.get("/signals")
+async def get_universe_signals(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user=Depends(deps.get_current_active_user),
+):
+    """Signals for every symbol in the trading universe from one batched prediction."""
+    plan_value = getattr(current_user.plan, "value", current_user.plan)
+    signals = await trading_engine.generate_signals_for_universe(plan_value, db)
+    return {"plan_used": plan_value, "signals": signals, "timestamp": datetime.utcnow().isoformat()}
+
+
+@router.get("/trades", response_model=TradePage)
+async def list_trades(
+    limit: int = Query(50, ge=1, le=500),
+    before: int | None = Query(None, description="id of the last trade on the previous page"),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user=Depends(deps.get_current_active_user),
+):
+    """Newest-first trade history; streamed trades appear once the write-behind buffer flushes."""
+    trades = await portfolio_service.list_trades(db, current_user.id, limit, before_id=before)
+    if trades is None:
+        raise HTTPException(status_code=400, detail="Unknown cursor: before is not one of your trades")
+    return {
+        "items": trades,
+        "next_cursor": trades[-1].id if len(trades) == limit else None,
+    }
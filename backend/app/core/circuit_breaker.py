@@ -0,0 +1,45 @@
+import time
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker guarding calls to a flaky dependency.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``allow()`` returns False until ``cooldown_seconds`` have elapsed; then a
+    single trial call is let through (half-open) and its outcome closes or
+    re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 5.0) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at < self.cooldown_seconds or self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """Wall clock used by services in normal operation."""
+
+    def now(self) -> datetime:
+        return datetime.utcnow()
+
+
+class VirtualClock:
+    """Manually driven clock for historical replay and deterministic tests."""
+
+    def __init__(self, start: datetime | None = None) -> None:
+        self._now = start or datetime(1970, 1, 1)
+
+    def now(self) -> datetime:
+        return self._now
+
+    def set(self, value: datetime) -> None:
+        self._now = value
+
+    def advance(self, delta: timedelta) -> None:
+        self._now += delta
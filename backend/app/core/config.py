@@ -12,9 +12,64 @@ class Settings(BaseSettings):
     SECRET_KEY: str = Field(..., description="JWT secret key")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    ADMIN_EMAILS: List[str] = []  # users allowed to promote, register and shadow model versions
 
     DATABASE_URL: str = Field(..., description="Async database URL")
     REDIS_URL: str = Field(..., description="Redis connection URL")
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 0.05
+    REDIS_BREAKER_FAILURE_THRESHOLD: int = 3
+    REDIS_BREAKER_COOLDOWN_SECONDS: float = 5.0
+    FEATURE_CACHE_TTL_SECONDS: float = 1.0
+    PAPER_STREAM_INTERVAL_SECONDS: float = 3.0
+    UNIVERSE_SIGNAL_TTL_SECONDS: float = 1.0  # reuse one batched universe prediction per plan for this long
+
+    MODEL_PREFER_COMPILED: bool = True
+    MODEL_BACKEND: str = "inprocess"  # "inprocess" or "remote" (shared model server)
+    MODEL_SERVER_SOCKET: str = "/tmp/investia-models.sock"
+    MODEL_SERVER_TIMEOUT_SECONDS: float = 0.5
+    MODEL_SERVER_LOAD_TIMEOUT_SECONDS: float = 30.0
+    MODEL_SERVER_POOL_SIZE: int = 16
+    MODEL_SERVER_FALLBACK: bool = True
+    MODEL_SERVER_BATCH_WINDOW_MS: float = 1.0
+    MODEL_SERVER_MAX_BATCH_ROWS: int = 512
+    MODEL_SERVER_THREADS: int = 2
+    SHADOW_MODELS: dict[str, str] = {}  # plan -> candidate artifact URI scored in shadow
+    SHADOW_QUEUE_SIZE: int = 1024
+    SHADOW_BATCH_ROWS: int = 256
+    SHADOW_BATCH_WINDOW_SECONDS: float = 0.25
+    SHADOW_DIR: str = "shadow"
+    PREDICTION_LOG_ENABLED: bool = False  # opt in; set PREDICTION_LOG_DIR to an absolute path when enabling
+    PREDICTION_LOG_DIR: str = "prediction_log"
+    PREDICTION_LOG_QUEUE_SIZE: int = 10_000
+    PREDICTION_LOG_BATCH_ROWS: int = 2048
+    PREDICTION_LOG_FLUSH_SECONDS: float = 5.0
+    WRITE_BEHIND_ENABLED: bool = True
+    WRITE_BEHIND_BATCH_ROWS: int = 500
+    WRITE_BEHIND_FLUSH_SECONDS: float = 1.0
+    WRITE_BEHIND_MAX_ROWS: int = 50_000
+    LEDGER_STARTING_CASH: float = 100_000.0
+    LEDGER_SNAPSHOT_PATH: str = "ledger/paper_ledger.npz"
+    LEDGER_SNAPSHOT_SECONDS: float = 60.0
+    LEDGER_BACKEND: str = "inprocess"  # "inprocess" (this process owns the ledger) or "remote" (ledger server)
+    LEDGER_SERVER_SOCKET: str = "/tmp/investia-ledger.sock"
+    LEDGER_SERVER_TIMEOUT_SECONDS: float = 0.5
+    LEDGER_SERVER_RISK_TIMEOUT_SECONDS: float = 10.0  # risk requests may run a Monte Carlo
+    RISK_BAR_SECONDS: float = 60.0  # length of one risk bar: ledger marks are sampled as closes this often
+    RISK_EWMA_LAMBDA: float = 0.94  # RiskMetrics decay per bar
+    RISK_CONFIDENCE: float = 0.99
+    RISK_CHUNK_ROWS: int = 8192  # users per batched matrix product
+    RISK_MC_PATHS: int = 10_000
+
+    TRACE_SAMPLE_RATE: float = 0.0
+    TRACE_HEADER: str = "x-investia-trace"
+    # The trace header is honoured only from an admin's token or with this key in TRACE_KEY_HEADER.
+    TRACE_SECRET: str = ""
+    TRACE_KEY_HEADER: str = "x-investia-trace-key"
+    TRACE_DIR: str = "traces"
+    TRACE_MAX_PER_MINUTE: int = 60  # traces started per process per minute, sampled or requested
+    TRACE_MAX_FILES: int = 1000  # oldest trace and profile files in TRACE_DIR are deleted beyond this
+    PROFILE_SLOW_REQUEST_MS: float = 0.0
+    PROFILE_SAMPLE_INTERVAL_MS: float = 2.0
 
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = [
         "https://investia.live",
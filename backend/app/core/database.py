@@ -2,12 +2,14 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
 # Shared declarative base for all ORM models
 Base = declarative_base()
 
 # Async engine/session factory
 engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True)
+instrument_engine(engine.sync_engine)
 AsyncSessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -0,0 +1,258 @@
+"""Minimal in-process Prometheus-style metrics.
+
+Counters, gauges and fixed-bucket histograms keyed by label tuples. Updates are a
+dict lookup plus a bisect, so they are cheap enough for per-request and
+per-prediction hot paths. ``render_latest`` produces the text exposition format
+served at ``/metrics``.
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Sequence
+
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+COUNT_BUCKETS: tuple[float, ...] = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.register(self)
+
+    def _format_labels(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, labels: tuple = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{self._format_labels(labels)} {value}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, labels: tuple = ()) -> None:
+        self._values[labels] = value
+
+    def inc(self, amount: float = 1.0, labels: tuple = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: tuple = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{self._format_labels(labels)} {value}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, labels: tuple = ()) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, labels)
+
+    def count(self, labels: tuple = ()) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{self._format_labels(labels, le)} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{self._format_labels(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{self._format_labels(labels)} {series[-1]}"
+            yield f"{self.name}_count{self._format_labels(labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REGISTRY = Registry()
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
+
+
+# --- Application metrics -------------------------------------------------------
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "investia_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "investia_http_request_db_queries", "SQL statements issued per HTTP request", ("route",), buckets=COUNT_BUCKETS
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "investia_http_request_db_seconds", "Time spent in SQL statements per HTTP request", ("route",)
+)
+DB_QUERY_SECONDS = Histogram("investia_db_query_duration_seconds", "Latency of individual SQL statements")
+
+PREDICT_SECONDS = Histogram(
+    "investia_predict_signal_duration_seconds", "predict_signal latency by plan and model version", ("plan", "model")
+)
+MODEL_CACHE_LOOKUPS = Counter("investia_model_cache_lookups_total", "Model cache lookups")
+MODEL_LOADS = Counter("investia_model_loads_total", "Model artifacts loaded from disk (cache misses)", ("kind",))
+MODEL_LOAD_SECONDS = Histogram("investia_model_load_duration_seconds", "Model artifact load latency", ("kind",))
+MODEL_SERVER_SECONDS = Histogram(
+    "investia_model_server_call_duration_seconds", "Round trip to the shared model server", ("op",)
+)
+MODEL_SERVER_ERRORS = Counter(
+    "investia_model_server_errors_total", "Model server calls that failed and fell back to in-process scoring", ("op",)
+)
+MODEL_SERVER_BATCH_ROWS = Histogram(
+    "investia_model_server_batch_rows", "Rows scored per coalesced model-server batch", buckets=COUNT_BUCKETS
+)
+LEDGER_SERVER_SECONDS = Histogram(
+    "investia_ledger_server_call_duration_seconds", "Round trip to the ledger server", ("op",)
+)
+TRACES_SKIPPED = Counter(
+    "investia_traces_skipped_total", "Requests not traced because TRACE_MAX_PER_MINUTE was reached"
+)
+SHADOW_ROWS = Counter("investia_shadow_rows_total", "Feature rows scored by shadow models", ("plan",))
+SHADOW_DROPPED = Counter(
+    "investia_shadow_dropped_total", "Shadow scoring requests shed because the queue was full", ("plan",)
+)
+SHADOW_ERRORS = Counter("investia_shadow_errors_total", "Shadow batches that failed to score", ("plan",))
+PREDICTION_LOG_ROWS = Counter("investia_prediction_log_rows_total", "Served predictions written to the prediction log")
+PREDICTION_LOG_DROPPED = Counter(
+    "investia_prediction_log_dropped_total", "Predictions not logged because the log queue was full"
+)
+WRITE_BEHIND_ROWS = Counter("investia_write_behind_rows_total", "Rows persisted by write-behind flushes", ("table",))
+WRITE_BEHIND_FLUSH_SECONDS = Histogram(
+    "investia_write_behind_flush_duration_seconds", "Duration of one write-behind table flush", ("table",)
+)
+WRITE_BEHIND_PENDING = Gauge("investia_write_behind_pending_rows", "Rows buffered and not yet persisted")
+WRITE_BEHIND_DROPPED = Counter(
+    "investia_write_behind_dropped_total", "Buffered rows dropped after failed flushes overflowed the buffer", ("table",)
+)
+RISK_REFRESH_SECONDS = Histogram("investia_risk_refresh_duration_seconds", "Per-bar risk refresh across all accounts")
+
+REDIS_CALL_SECONDS = Histogram("investia_redis_call_duration_seconds", "Redis call latency", ("op",))
+REDIS_FALLBACKS = Counter(
+    "investia_redis_feature_fallbacks_total", "Feature reads served without Redis, by reason", ("reason",)
+)
+FEATURE_L1_HITS = Counter("investia_feature_cache_hits_total", "Feature vectors served from the in-process cache")
+
+WEBSOCKET_CONNECTIONS = Gauge("investia_websocket_connections", "Open websocket connections", ("endpoint",))
+WEBSOCKET_SEND_QUEUE = Gauge(
+    "investia_websocket_send_queue_depth", "Websocket messages waiting to be flushed", ("endpoint",)
+)
+
+WORKER_CYCLE_SECONDS = Histogram(
+    "investia_worker_cycle_duration_seconds",
+    "Duration of one worker task cycle",
+    ("task",),
+    buckets=LATENCY_BUCKETS + (30.0, 60.0, 300.0),
+)
+
+# Per-request SQL accumulator: [statement count, seconds]; set by the HTTP middleware.
+request_db_stats: ContextVar[list | None] = ContextVar("request_db_stats", default=None)
+
+
+def instrument_engine(sync_engine) -> None:
+    """Attach SQL timing listeners to a (sync facade of an async) SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    from app.core import tracing
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("investia_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("investia_query_start")
+        if not starts:
+            return
+        start = starts.pop()
+        end = time.perf_counter()
+        elapsed = end - start
+        DB_QUERY_SECONDS.observe(elapsed)
+        tracing.record_complete("db.query", int(start * 1e9), int(end * 1e9))
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
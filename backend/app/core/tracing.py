@@ -0,0 +1,286 @@
+"""Sampled per-request tracing and slow-request sampling profiler.
+
+A request is traced when it falls in the sampled fraction of traffic, or when
+it carries the trace header and is trusted: it comes with an admin's bearer
+token or with ``TRACE_SECRET`` in ``TRACE_KEY_HEADER``. The header is ignored on
+any other request, so anonymous clients only ever see the sample rate. At most
+``TRACE_MAX_PER_MINUTE`` requests per process are traced, and ``TRACE_DIR``
+keeps the newest ``TRACE_MAX_FILES`` trace and profile files. ``span()`` is a no-op unless the current request is traced,
+so it can wrap hot stages unconditionally. Finished traces are written in
+Chrome trace-event format (open with chrome://tracing or Perfetto).
+
+When profiling is enabled, a background thread samples the event loop's stack
+while a profiled request's task is running; requests slower than the configured
+threshold get a collapsed-stack ``.folded`` file suitable for flamegraph.pl or
+speedscope.
+"""
+
+import asyncio
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as _StackCounter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+from jose import JWTError
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.security import decode_token
+
+
+class Trace:
+    def __init__(self, name: str) -> None:
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.events: list[dict[str, Any]] = []
+        self.pid = os.getpid()
+        self.started_ns = time.perf_counter_ns()
+        self.epoch_offset_us = time.time() * 1e6 - self.started_ns / 1e3
+
+    def add_complete(self, name: str, start_ns: int, end_ns: int, args: dict | None = None) -> None:
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": self.epoch_offset_us + start_ns / 1e3,
+            "dur": (end_ns - start_ns) / 1e3,
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def to_chrome(self) -> dict:
+        return {"traceEvents": self.events, "displayTimeUnit": "ms", "otherData": {"trace_id": self.trace_id}}
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+
+class _Span:
+    __slots__ = ("trace", "name", "args", "start_ns")
+
+    def __init__(self, trace: Trace, name: str, args: dict) -> None:
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.trace.add_complete(self.name, self.start_ns, time.perf_counter_ns(), self.args or None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **args: Any) -> _Span | _NoopSpan:
+    """Time a named stage of the current request if it is being traced."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name, args)
+
+
+def record_complete(name: str, start_ns: int, end_ns: int) -> None:
+    """Attach an already-measured interval (perf_counter_ns) to the current trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_complete(name, start_ns, end_ns)
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+def header_trusted(key: str | None, authorization: str | None) -> bool:
+    """Whether the trace header may be honoured: the configured key, or an admin's bearer token."""
+    if settings.TRACE_SECRET and key and hmac.compare_digest(key.encode(), settings.TRACE_SECRET.encode()):
+        return True
+    if not authorization or not settings.ADMIN_EMAILS:
+        return False
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return decode_token(token).get("sub") in settings.ADMIN_EMAILS
+    except JWTError:
+        return False
+
+
+class _TraceBudget:
+    """Fixed one-minute window of ``TRACE_MAX_PER_MINUTE`` traces."""
+
+    def __init__(self) -> None:
+        self.window = -1
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        window = int(time.monotonic() // 60)
+        with self.lock:
+            if window != self.window:
+                self.window, self.used = window, 0
+            if self.used >= settings.TRACE_MAX_PER_MINUTE:
+                return False
+            self.used += 1
+            return True
+
+
+_budget = _TraceBudget()
+
+
+def should_trace(header_value: str | None, trusted: bool = False) -> bool:
+    """Trace for a trusted header, otherwise at ``TRACE_SAMPLE_RATE``, within the per-minute budget."""
+    if header_value and trusted:
+        wanted = header_value.lower() not in ("0", "false", "off")
+    else:
+        rate = settings.TRACE_SAMPLE_RATE
+        wanted = rate > 0 and random.random() < rate
+    if wanted and not _budget.take():
+        metrics.TRACES_SKIPPED.inc()
+        return False
+    return wanted
+
+
+def start_trace(name: str):
+    trace = Trace(name)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token) -> None:
+    _current_trace.reset(token)
+
+
+def trace_dir() -> Path:
+    path = Path(settings.TRACE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _prune(directory: Path) -> None:
+    """Delete the oldest trace and profile files beyond ``TRACE_MAX_FILES``."""
+    files = [p for p in directory.iterdir() if p.name.startswith(("trace-", "profile-"))]
+    excess = len(files) - settings.TRACE_MAX_FILES
+    if excess > 0:
+        # Names are "<kind>-<timestamp>-<id>", so sorting on what follows the kind orders them by age.
+        for path in sorted(files, key=lambda p: p.name.split("-", 1)[1])[:excess]:
+            path.unlink(missing_ok=True)
+
+
+def write_trace(trace: Trace) -> Path:
+    directory = trace_dir()
+    path = directory / f"trace-{time.strftime('%Y%m%dT%H%M%S')}-{trace.trace_id}.json"
+    path.write_text(json.dumps(trace.to_chrome()))
+    _prune(directory)
+    return path
+
+
+class _Profile:
+    __slots__ = ("stacks", "samples")
+
+    def __init__(self) -> None:
+        self.stacks: _StackCounter[str] = _StackCounter()
+        self.samples = 0
+
+
+class LoopSampler:
+    """Samples the event-loop thread's stack while profiled tasks are running."""
+
+    def __init__(self, interval_seconds: float) -> None:
+        self.interval_seconds = interval_seconds
+        self._profiles: dict[asyncio.Task, _Profile] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def begin(self) -> _Profile | None:
+        task = asyncio.current_task()
+        if task is None:
+            return None
+        profile = _Profile()
+        with self._lock:
+            self._loop = task.get_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._profiles[task] = profile
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="investia-loop-sampler", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+        return profile
+
+    def end(self) -> None:
+        task = asyncio.current_task()
+        with self._lock:
+            self._profiles.pop(task, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                idle = not self._profiles
+            if idle:
+                self._wakeup.clear()
+                self._wakeup.wait()
+                continue
+            time.sleep(self.interval_seconds)
+            self._sample()
+
+    def _sample(self) -> None:
+        with self._lock:
+            loop, thread_id = self._loop, self._loop_thread_id
+            if loop is None or thread_id is None:
+                return
+            # Reading the running task from another thread is racy but only ever misattributes one sample.
+            task = getattr(asyncio.tasks, "_current_tasks", {}).get(loop)
+            profile = self._profiles.get(task) if task is not None else None
+        if profile is None:
+            return
+        frame = sys._current_frames().get(thread_id)
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if names:
+            profile.stacks[";".join(reversed(names))] += 1
+            profile.samples += 1
+
+
+_sampler: LoopSampler | None = None
+
+
+def profiler() -> LoopSampler:
+    global _sampler
+    if _sampler is None:
+        _sampler = LoopSampler(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000.0)
+    return _sampler
+
+
+def write_folded(trace_id: str, profile: _Profile) -> Path:
+    directory = trace_dir()
+    path = directory / f"profile-{time.strftime('%Y%m%dT%H%M%S')}-{trace_id}.folded"
+    path.write_text("".join(f"{stack} {count}\n" for stack, count in profile.stacks.most_common()))
+    _prune(directory)
+    return path
@@ -4,7 +4,7 @@ from app.models.trading import Trade
 from app.models.portfolio import DailyMetrics
 from app.models.chat import ChatMessage
 from app.models.plan import Plan, AVAILABLE_PLANS
-from app.models.model_version import ModelVersion
+from app.models.model_version import ActiveModel, ModelVersion
 
 __all__ = [
     "User",
@@ -16,4 +16,5 @@ __all__ = [
     "Plan",
     "AVAILABLE_PLANS",
     "ModelVersion",
+    "ActiveModel",
 ]
@@ -1,12 +1,13 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Float, Integer, String, func
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, func
 
 from app.core.database import Base
 
 
 class ModelVersion(Base):
     __tablename__ = "model_versions"
+    __table_args__ = (Index("ix_model_versions_plan_created_at", "plan", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     plan = Column(String, nullable=False, index=True)
@@ -14,3 +15,14 @@ class ModelVersion(Base):
     sharpe = Column(Float, nullable=False)
     win_rate = Column(Float, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ActiveModel(Base):
+    """The version currently served for a plan; one row per plan, repointed on promotion."""
+
+    __tablename__ = "active_models"
+
+    plan = Column(String, primary_key=True)
+    model_version_id = Column(Integer, ForeignKey("model_versions.id", ondelete="CASCADE"), nullable=False)
+    uri = Column(String, nullable=False)
+    promoted_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Date, Float, ForeignKey, Integer
+from sqlalchemy import Column, Date, Float, ForeignKey, Index, Integer
 
 from app.core.database import Base
 
 
 class DailyMetrics(Base):
     __tablename__ = "daily_metrics"
+    __table_args__ = (Index("ix_daily_metrics_user_date", "user_id", "date"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -1,10 +1,11 @@
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text, func
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, func
 
 from app.core.database import Base
 
 
 class Trade(Base):
     __tablename__ = "trades"
+    __table_args__ = (Index("ix_trades_user_created_at", "user_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
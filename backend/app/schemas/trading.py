@@ -16,6 +16,11 @@ class TradeRead(BaseModel):
         orm_mode = True
 
 
+class TradePage(BaseModel):
+    items: list[TradeRead]
+    next_cursor: int | None = None
+
+
 class DashboardSummary(BaseModel):
     total_pnl: float
     trades: int
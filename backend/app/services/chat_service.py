@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.models.chat import ChatMessage
 from app.models.trading import Trade
+from app.services.write_behind import write_buffer
 
 
 class ChatService:
@@ -68,9 +69,10 @@ class ChatService:
 
         base_answer = openai_answer or self._fallback_answer(trade_context)
 
-        message = ChatMessage(user_id=user_id, question=question, answer=base_answer, created_at=datetime.utcnow())
-        db.add(message)
-        await db.commit()
+        await write_buffer.add(
+            ChatMessage,
+            {"user_id": user_id, "question": question, "answer": base_answer, "created_at": datetime.utcnow()},
+        )
         return base_answer
 
     @staticmethod
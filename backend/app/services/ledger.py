@@ -0,0 +1,371 @@
+"""Array-backed paper-trading ledger: positions, cost basis and cash for every user.
+
+Ledger state is held in dense arrays indexed by (user row, symbol column):
+
+* ``positions``: signed quantity held;
+* ``cost``: cost basis of the open position, i.e. average cost times quantity;
+* ``cash``, ``realized`` and ``market_value``: one value per user;
+* ``marks``: the last price of each symbol.
+
+``apply_fills`` books a batch of fills with average-cost accounting.
+Fills that reduce or flip a position realize PnL against the average cost. When
+the same (user, symbol) appears more than once in a batch, the batch is split
+into rounds so that fills still apply in order.
+
+``mark_to_market`` takes a price tick for one or more symbols and updates every
+user's market value in one operation,
+``market_value += positions[:, cols] @ (new - old)``. ``revalue`` recomputes it
+from scratch as ``positions @ marks``.
+
+Snapshots are uncompressed ``.npz`` files, written to a per-writer temporary
+name and renamed. ``python benchmarks/ledger_bench.py`` measures throughput at
+10^5 users x 10^3 symbols.
+
+The ledger lives in memory, so exactly one process may own it. ``open_ledger``
+takes an exclusive lock next to ``LEDGER_SNAPSHOT_PATH`` and then loads the
+snapshot, and only the owner writes snapshots. The API does this at startup when
+``LEDGER_BACKEND=inprocess`` (a single-process deployment). With several API
+workers, or the worker tasks running beside the API, run the ledger server
+(``app.services.ledger_server``) as the owner and set ``LEDGER_BACKEND=remote``
+everywhere else. A second in-process owner fails at startup instead of keeping
+a private ledger that silently diverges, and ``TradingEngine`` refuses to book on
+a ledger this process does not own. Ledgers built with ``scratch=True``
+(replays) are private by design and exempt.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import threading
+import time
+from uuid import uuid4
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerOwnedError(RuntimeError):
+    """Another process already owns the ledger snapshot."""
+
+
+class LedgerNotOwnedError(RuntimeError):
+    """Fills were booked on a ledger this process neither owns nor created as scratch."""
+
+
+class PaperLedger:
+    def __init__(
+        self,
+        symbols: Iterable[str] = (),
+        *,
+        user_capacity: int = 1024,
+        symbol_capacity: int = 64,
+        starting_cash: float | None = None,
+        dtype: np.dtype | type = np.float64,
+        scratch: bool = False,
+    ) -> None:
+        self.starting_cash = settings.LEDGER_STARTING_CASH if starting_cash is None else starting_cash
+        self.dtype = np.dtype(dtype)
+        self.user_index: dict[int, int] = {}
+        self.symbol_index: dict[str, int] = {}
+        self.user_ids = np.zeros(user_capacity, dtype=np.int64)
+        self.symbols: list[str] = []
+        self.positions = np.zeros((user_capacity, symbol_capacity), dtype=self.dtype)
+        self.cost = np.zeros((user_capacity, symbol_capacity), dtype=self.dtype)
+        self.cash = np.zeros(user_capacity, dtype=np.float64)
+        self.realized = np.zeros(user_capacity, dtype=np.float64)
+        self.market_value = np.zeros(user_capacity, dtype=np.float64)
+        self.marks = np.zeros(symbol_capacity, dtype=np.float64)
+        self.lock = threading.Lock()
+        self.last_snapshot = time.monotonic()
+        self._owner_fd: int | None = None
+        # Never persisted or shared (e.g. a replay's ledger), so it may be booked on without owning it.
+        self.scratch = scratch
+        self.snapshot_path = Path(settings.LEDGER_SNAPSHOT_PATH)
+        for symbol in symbols:
+            self.symbol_col(symbol)
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_index)
+
+    @property
+    def n_symbols(self) -> int:
+        return len(self.symbols)
+
+    def user_row(self, user_id: int) -> int:
+        row = self.user_index.get(user_id)
+        if row is None:
+            row = len(self.user_index)
+            if row == len(self.user_ids):
+                self._grow_users(2 * row)
+            self.user_index[user_id] = row
+            self.user_ids[row] = user_id
+            self.cash[row] = self.starting_cash
+        return row
+
+    def symbol_col(self, symbol: str) -> int:
+        col = self.symbol_index.get(symbol)
+        if col is None:
+            col = len(self.symbols)
+            if col == len(self.marks):
+                self._grow_symbols(2 * col)
+            self.symbol_index[symbol] = col
+            self.symbols.append(symbol)
+        return col
+
+    def add_users(self, user_ids: Sequence[int]) -> np.ndarray:
+        return np.fromiter((self.user_row(int(u)) for u in user_ids), dtype=np.int64, count=len(user_ids))
+
+    def _grow_users(self, capacity: int) -> None:
+        self.user_ids = np.resize(self.user_ids, capacity)
+        for name in ("positions", "cost"):
+            old = getattr(self, name)
+            grown = np.zeros((capacity, old.shape[1]), dtype=old.dtype)
+            grown[: len(old)] = old
+            setattr(self, name, grown)
+        for name in ("cash", "realized", "market_value"):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[: len(old)] = old
+            setattr(self, name, grown)
+
+    def _grow_symbols(self, capacity: int) -> None:
+        for name in ("positions", "cost"):
+            old = getattr(self, name)
+            grown = np.zeros((old.shape[0], capacity), dtype=old.dtype)
+            grown[:, : old.shape[1]] = old
+            setattr(self, name, grown)
+        marks = np.zeros(capacity, dtype=np.float64)
+        marks[: len(self.marks)] = self.marks
+        self.marks = marks
+
+    def apply_fills(self, rows: np.ndarray, cols: np.ndarray, quantities: np.ndarray, prices: np.ndarray) -> np.ndarray:
+        """Book signed ``quantities`` at ``prices``; returns the realized PnL of each fill.
+
+        ``rows``/``cols`` come from ``user_row``/``symbol_col``. Fill prices also become
+        the symbols' marks.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        quantities = np.asarray(quantities, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        realized = np.zeros(len(rows), dtype=np.float64)
+        if not len(rows):
+            return realized
+
+        # Occurrence rank of each (row, col) pair; every round touches each pair at most once.
+        keys = rows * max(len(self.marks), 1) + cols
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        group_start = np.maximum.accumulate(np.where(starts, np.arange(len(keys)), 0))
+        rank = np.empty(len(keys), dtype=np.int64)
+        rank[order] = np.arange(len(keys)) - group_start
+
+        with self.lock:
+            rounds = int(rank.max()) + 1
+            if rounds == 1:
+                realized[:] = self._apply_round(rows, cols, quantities, prices)
+            else:
+                for r in range(rounds):
+                    idx = np.flatnonzero(rank == r)
+                    realized[idx] = self._apply_round(rows[idx], cols[idx], quantities[idx], prices[idx])
+        return realized
+
+    def _apply_round(self, rows: np.ndarray, cols: np.ndarray, qty: np.ndarray, price: np.ndarray) -> np.ndarray:
+        pos = self.positions[rows, cols].astype(np.float64)
+        cost = self.cost[rows, cols].astype(np.float64)
+        avg = np.divide(cost, pos, out=np.zeros_like(cost), where=pos != 0)
+        reducing = (pos != 0) & (np.sign(pos) != np.sign(qty))
+        closing = np.where(reducing, np.sign(qty) * np.minimum(np.abs(qty), np.abs(pos)), 0.0)
+        opening = qty - closing
+        realized = np.where(reducing, closing * (avg - price), 0.0)
+
+        new_pos = pos + qty
+        new_cost = cost + closing * avg + opening * price
+        self.positions[rows, cols] = new_pos
+        self.cost[rows, cols] = np.where(new_pos == 0, 0.0, new_cost)
+
+        old_marks = self.marks[cols]
+        np.add.at(self.cash, rows, -qty * price)
+        np.add.at(self.realized, rows, realized)
+        # Value the traded quantity at the old mark, then move the symbol's mark to the fill price.
+        np.add.at(self.market_value, rows, qty * old_marks)
+        self._mark(cols, price)
+        return realized
+
+    def mark_to_market(self, cols: np.ndarray, prices: np.ndarray) -> None:
+        """Apply a price tick for ``cols`` to every user's market value in one matrix product."""
+        with self.lock:
+            self._mark(np.asarray(cols, dtype=np.int64), np.asarray(prices, dtype=np.float64))
+
+    def _mark(self, cols: np.ndarray, prices: np.ndarray) -> None:
+        # Last price wins when a symbol appears twice in one tick.
+        unique_cols, last = np.unique(cols[::-1], return_index=True)
+        new = prices[::-1][last]
+        delta = new - self.marks[unique_cols]
+        n, s = self.n_users, self.n_symbols
+        if len(unique_cols) * 32 > s:
+            # Gathering many columns copies most of the matrix; a dense product with zeros is cheaper.
+            dense = np.zeros(s, dtype=self.dtype)
+            dense[unique_cols] = delta
+            self.market_value[:n] += self.positions[:n, :s] @ dense
+        else:
+            self.market_value[:n] += self.positions[:n, unique_cols] @ delta.astype(self.dtype)
+        self.marks[unique_cols] = new
+
+    def revalue(self) -> None:
+        """Recompute every market value from positions and marks (clears incremental drift)."""
+        with self.lock:
+            n, s = self.n_users, self.n_symbols
+            self.market_value[:n] = self.positions[:n, :s] @ self.marks[:s].astype(self.dtype)
+
+    def account(self, user_id: int) -> dict:
+        row = self.user_index.get(user_id)
+        if row is None:
+            cash = self.starting_cash
+            return {"cash": cash, "equity": cash, "realized_pnl": 0.0, "unrealized_pnl": 0.0, "positions": []}
+        s = self.n_symbols
+        held = np.flatnonzero(self.positions[row, :s])
+        cost_total = float(self.cost[row, :s].sum())
+        positions = [
+            {
+                "symbol": self.symbols[col],
+                "quantity": float(self.positions[row, col]),
+                "avg_cost": float(self.cost[row, col] / self.positions[row, col]),
+                "mark": float(self.marks[col]),
+                "unrealized_pnl": float(self.positions[row, col] * self.marks[col] - self.cost[row, col]),
+            }
+            for col in held
+        ]
+        return {
+            "cash": float(self.cash[row]),
+            "equity": float(self.cash[row] + self.market_value[row]),
+            "realized_pnl": float(self.realized[row]),
+            "unrealized_pnl": float(self.market_value[row] - cost_total),
+            "positions": positions,
+        }
+
+    def snapshot(self, path: str | Path | None = None) -> Path:
+        path = Path(path or self.snapshot_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            n, s = self.n_users, self.n_symbols
+            state = {
+                "user_ids": self.user_ids[:n].copy(),
+                "symbols": np.array(self.symbols),
+                "positions": self.positions[:n, :s].copy(),
+                "cost": self.cost[:n, :s].copy(),
+                "cash": self.cash[:n].copy(),
+                "realized": self.realized[:n].copy(),
+                "marks": self.marks[:s].copy(),
+                "starting_cash": np.float64(self.starting_cash),
+            }
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{uuid4().hex}.tmp")
+        try:
+            with open(tmp, "wb") as fh:
+                np.savez(fh, **state)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        self.last_snapshot = time.monotonic()
+        return path
+
+    def maybe_snapshot(self, interval_seconds: float | None = None) -> Path | None:
+        """Snapshot if this process owns the ledger and ``interval_seconds`` have passed."""
+        interval = settings.LEDGER_SNAPSHOT_SECONDS if interval_seconds is None else interval_seconds
+        if not self.owned or time.monotonic() - self.last_snapshot < interval:
+            return None
+        return self.snapshot()
+
+    @property
+    def owned(self) -> bool:
+        return self._owner_fd is not None
+
+    def claim(self, path: str | Path | None = None) -> None:
+        """Take the exclusive owner lock for the snapshot at ``path``; raises ``LedgerOwnedError``."""
+        path = Path(path or settings.LEDGER_SNAPSHOT_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path.with_name(f"{path.name}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise LedgerOwnedError(
+                f"{path} is owned by another process; run one owner and set LEDGER_BACKEND=remote elsewhere"
+            ) from None
+        self._owner_fd, self.snapshot_path = fd, path
+
+    def release(self) -> None:
+        """Snapshot and give up ownership (no-op for a ledger this process does not own)."""
+        if not self.owned:
+            return
+        try:
+            self.snapshot()
+        finally:
+            os.close(self._owner_fd)
+            self._owner_fd = None
+
+    def load(self, path: str | Path | None = None) -> None:
+        """Replace this ledger's state, in place, with the snapshot at ``path``."""
+        restored = PaperLedger.restore(path)
+        with self.lock:
+            for name in (
+                "starting_cash", "dtype", "user_index", "symbol_index", "user_ids", "symbols",
+                "positions", "cost", "cash", "realized", "market_value", "marks",
+            ):
+                setattr(self, name, getattr(restored, name))
+            self.last_snapshot = time.monotonic()
+
+    @classmethod
+    def restore(cls, path: str | Path | None = None) -> "PaperLedger":
+        path = Path(path or settings.LEDGER_SNAPSHOT_PATH)
+        with np.load(path) as state:
+            positions = state["positions"]
+            ledger = cls(
+                state["symbols"].tolist(),
+                user_capacity=max(1024, len(state["user_ids"])),
+                symbol_capacity=max(64, positions.shape[1]),
+                starting_cash=float(state["starting_cash"]),
+                dtype=positions.dtype,
+            )
+            n, s = positions.shape
+            ledger.user_index = {int(u): i for i, u in enumerate(state["user_ids"])}
+            ledger.user_ids[:n] = state["user_ids"]
+            ledger.positions[:n, :s] = positions
+            ledger.cost[:n, :s] = state["cost"]
+            ledger.cash[:n] = state["cash"]
+            ledger.realized[:n] = state["realized"]
+            ledger.marks[:s] = state["marks"]
+        ledger.revalue()
+        return ledger
+
+
+def open_ledger(ledger: PaperLedger, path: str | Path | None = None) -> PaperLedger:
+    """Claim ``ledger`` as this process's owned ledger and load its last snapshot.
+
+    A snapshot that cannot be read is moved aside to ``<name>.corrupt`` and the
+    ledger starts empty, so one bad file does not stop the process from booting.
+    """
+    path = Path(path or settings.LEDGER_SNAPSHOT_PATH)
+    ledger.claim(path)
+    if path.exists():
+        try:
+            ledger.load(path)
+        except Exception:  # noqa: BLE001 - np.load raises several unrelated types for a bad file
+            aside = path.with_name(f"{path.name}.corrupt")
+            logger.exception("Cannot read ledger snapshot %s; moved it to %s and starting empty", path, aside)
+            os.replace(path, aside)
+    return ledger
+
+
+# Empty until the owning process calls ``open_ledger`` (API startup or the ledger server).
+paper_ledger = PaperLedger()
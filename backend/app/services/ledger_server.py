@@ -0,0 +1,196 @@
+"""Ledger server: one process owns the paper ledger for every API worker and the worker tasks.
+
+The ledger is in-memory state, so it needs a single owner once there is more than
+one process. Run the server next to the API and point every other process at its
+Unix socket::
+
+    python -m app.services.ledger_server --socket /tmp/investia-ledger.sock
+    LEDGER_BACKEND=remote LEDGER_SERVER_SOCKET=/tmp/investia-ledger.sock uvicorn app.api.main:app --workers 4
+
+The server claims and loads ``LEDGER_SNAPSHOT_PATH`` on start, snapshots it every
+``LEDGER_SNAPSHOT_SECONDS`` and again on exit. Frames use the model server's
+format with JSON headers only: ``fill`` books one fill and returns its realized
+PnL, ``mark`` applies one price tick and ``account`` returns ``PaperLedger.account``.
+Fills and ticks are applied on the event loop, so they keep their arrival order.
+The server also closes a risk bar every ``RISK_BAR_SECONDS`` and answers ``risk``
+with ``RiskService.user_risk``, plus an optional Monte Carlo run off the loop.
+Unlike the model server there is no in-process fallback: a client-side ledger
+would diverge from the owner's, so errors reach the caller.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import os
+import signal
+import time
+from typing import Any
+
+from app.core import metrics
+from app.core.config import settings
+from app.services.ledger import PaperLedger, open_ledger, paper_ledger
+from app.services.model_server import _read_frame, _write_frame
+from app.services.risk_service import RiskService, risk_service
+
+
+class LedgerServerError(RuntimeError):
+    """The ledger server could not be reached or rejected the request."""
+
+
+class LedgerClient:
+    """Asyncio client used by ``TradingEngine`` and the portfolio routes when ``LEDGER_BACKEND=remote``."""
+
+    def __init__(self, socket_path: str | None = None, timeout_seconds: float | None = None) -> None:
+        self.socket_path = socket_path or settings.LEDGER_SERVER_SOCKET
+        self.timeout_seconds = settings.LEDGER_SERVER_TIMEOUT_SECONDS if timeout_seconds is None else timeout_seconds
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def apply_fill(self, user_id: int, symbol: str, quantity: float, price: float) -> float:
+        header = await self._request({"op": "fill", "user_id": user_id, "symbol": symbol, "quantity": quantity, "price": price})
+        return header["realized"]
+
+    async def mark(self, symbol: str, price: float) -> None:
+        await self._request({"op": "mark", "symbol": symbol, "price": price})
+
+    async def account(self, user_id: int) -> dict:
+        return (await self._request({"op": "account", "user_id": user_id}))["account"]
+
+    async def risk(self, user_id: int, *, monte_carlo: bool = False, paths: int | None = None, horizon: int = 1) -> dict | None:
+        header = {"op": "risk", "user_id": user_id, "monte_carlo": monte_carlo, "paths": paths, "horizon": horizon}
+        return (await self._request(header, settings.LEDGER_SERVER_RISK_TIMEOUT_SECONDS))["risk"]
+
+    async def ping(self) -> dict[str, Any]:
+        return await self._request({"op": "ping"})
+
+    async def _request(self, header: dict[str, Any], timeout_seconds: float | None = None) -> dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Pooled streams belong to the loop that opened them (workers run one loop per cycle).
+            self._idle, self._loop = [], loop
+        op = header["op"]
+        timeout = timeout_seconds or self.timeout_seconds
+        start = time.perf_counter()
+        conn = None
+        try:
+            conn = self._idle.pop() if self._idle else await asyncio.wait_for(
+                asyncio.open_unix_connection(self.socket_path), timeout
+            )
+            reader, writer = conn
+            _write_frame(writer, header)
+            await writer.drain()
+            response, _ = await asyncio.wait_for(_read_frame(reader), timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+            if conn is not None:
+                conn[1].close()
+            raise LedgerServerError(f"ledger server {op} failed: {exc!r}") from exc
+        finally:
+            metrics.LEDGER_SERVER_SECONDS.observe(time.perf_counter() - start, (op,))
+
+        self._idle.append(conn)
+        if not response.get("ok"):
+            raise LedgerServerError(response.get("error", f"ledger server {op} failed"))
+        return response
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+class LedgerServer:
+    def __init__(self, socket_path: str, ledger: PaperLedger | None = None, risk: RiskService | None = None) -> None:
+        self.socket_path = socket_path
+        self.ledger = ledger or paper_ledger
+        self.risk = risk or (risk_service if self.ledger is paper_ledger else RiskService(self.ledger))
+        self.requests = 0
+
+    async def serve_forever(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        background = [asyncio.create_task(self._snapshot_loop()), asyncio.create_task(self.risk.run_bars())]
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in background:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+
+    async def _snapshot_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.LEDGER_SNAPSHOT_SECONDS)
+            await asyncio.to_thread(self.ledger.maybe_snapshot)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    header, _ = await _read_frame(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                self.requests += 1
+                try:
+                    response = await self._dispatch(header)
+                except Exception as exc:  # noqa: BLE001 - reported back to the client
+                    response = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+                _write_frame(writer, response)
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    return
+        finally:
+            writer.close()
+
+    async def _dispatch(self, header: dict[str, Any]) -> dict[str, Any]:
+        op = header.get("op")
+        ledger = self.ledger
+        if op == "fill":
+            row, col = ledger.user_row(int(header["user_id"])), ledger.symbol_col(header["symbol"])
+            realized = ledger.apply_fills([row], [col], [float(header["quantity"])], [float(header["price"])])
+            return {"ok": True, "realized": float(realized[0])}
+        if op == "mark":
+            ledger.mark_to_market([ledger.symbol_col(header["symbol"])], [float(header["price"])])
+            return {"ok": True}
+        if op == "account":
+            return {"ok": True, "account": ledger.account(int(header["user_id"]))}
+        if op == "risk":
+            user_id = int(header["user_id"])
+            risk = self.risk.user_risk(user_id)
+            if risk is not None and header.get("monte_carlo"):
+                simulated = await asyncio.to_thread(self.risk.monte_carlo, [user_id], header.get("paths"), header.get("horizon", 1))
+                risk["monte_carlo"] = simulated.get(user_id)
+            return {"ok": True, "risk": risk}
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "requests": self.requests, "users": ledger.n_users}
+        raise ValueError(f"unknown op {op!r}")
+
+
+# Set when another process owns the ledger; ``None`` means this process books on ``paper_ledger``.
+ledger_client = LedgerClient() if settings.LEDGER_BACKEND == "remote" else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Own the Investia paper ledger and serve it over a Unix socket")
+    parser.add_argument("--socket", default=settings.LEDGER_SERVER_SOCKET)
+    parser.add_argument("--snapshot", default=settings.LEDGER_SNAPSHOT_PATH, help="snapshot to claim, load and write")
+    args = parser.parse_args()
+
+    ledger = open_ledger(paper_ledger, args.snapshot)
+    # Stop on SIGTERM the way Ctrl-C does, so the final snapshot is written.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    server = LedgerServer(args.socket, ledger)
+    print(f"ledger server listening on {args.socket} (pid {os.getpid()}, {ledger.n_users} users)")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ledger.release()
+
+
+if __name__ == "__main__":
+    main()
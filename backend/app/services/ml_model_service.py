@@ -1,25 +1,49 @@
 from __future__ import annotations
 
+import time
 from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
-import joblib
 import numpy as np
-import torch
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import metrics, tracing
+from app.core.config import settings
 from app.models.user import PlanEnum, User
+from app.services.model_server import ModelServerClient, ModelServerError
+from app.services.shadow import ShadowEvaluator
 from ml.model_registry import get_latest_model_uri
-from ml.utils import SimpleLSTMClassifier
 
 
 class MLModelService:
-    """Load, cache, and score ML models per plan."""
+    """Load, cache, and score ML models per plan.
+
+    torch, joblib (and through unpickling xgboost/sklearn) are imported only when
+    an artifact of that kind is first loaded, so workers serving auth, billing or
+    heuristic-only traffic never pay for the ML stack.
+
+    With ``MODEL_BACKEND=remote`` scoring is delegated to the shared model server
+    (``app.services.model_server``) so the artifacts live in one process no matter
+    how many API workers run; the registry lookup and feature layout stay local.
+
+    Plans with a shadow model (``self.shadow``) also get every scored batch copied
+    to it off the request path; see ``app.services.shadow``.
+
+    ``predict_batch`` / ``predict_signal`` return the artifact URI they scored
+    with (None for the heuristic), so callers attribute logged predictions to the
+    model actually used even if the plan is promoted concurrently.
+    """
+
+    def __init__(self, backend: str | None = None) -> None:
+        backend = backend or settings.MODEL_BACKEND
+        self.remote = ModelServerClient(settings.MODEL_SERVER_SOCKET) if backend == "remote" else None
+        self.shadow = ShadowEvaluator(self)
 
     async def get_model_uri_for_plan(self, plan: str, db: AsyncSession) -> str | None:
         plan_key = self._normalize_plan(plan)
-        uri = await get_latest_model_uri(plan_key, db_session=db)
+        with tracing.span("registry.get_latest_model_uri", plan=plan_key):
+            uri = await get_latest_model_uri(plan_key, db_session=db)
         return uri
 
     async def get_active_model_uri(self, plan: str, db: AsyncSession) -> str | None:
@@ -38,58 +62,145 @@ class MLModelService:
         if not path.exists():
             raise FileNotFoundError(f"Model artifact not found at {uri}")
 
-        if path.suffix == ".pt":  # LSTM
-            payload = torch.load(path, map_location="cpu")
-            model = SimpleLSTMClassifier(payload["input_dim"], payload.get("hidden_dim", 32))
-            model.load_state_dict(payload["state_dict"])
-            model.eval()
-            payload["model"] = model
-            return payload
+        kind = path.suffix.lstrip(".") or "unknown"
+        metrics.MODEL_LOADS.inc(labels=(kind,))
+        with metrics.MODEL_LOAD_SECONDS.time((kind,)), tracing.span("model.load", uri=uri):
+            if path.is_dir():  # checksummed, memory-mapped package (ml.model_package)
+                from ml.model_package import load_package
+
+                return load_package(path)
+
+            if path.suffix == ".pt":  # LSTM
+                import torch
+
+                payload = torch.load(path, map_location="cpu")
+                compiled = path.with_suffix(".ts")
+                if settings.MODEL_PREFER_COMPILED and compiled.exists():
+                    # TorchScript (possibly INT8) build written by ml.quantize after its parity check.
+                    payload["model"] = torch.jit.load(str(compiled), map_location="cpu")
+                    payload["compiled"] = True
+                else:
+                    from ml.lstm import SimpleLSTMClassifier
 
-        return joblib.load(path)
+                    model = SimpleLSTMClassifier(payload["input_dim"], payload.get("hidden_dim", 32))
+                    model.load_state_dict(payload["state_dict"])
+                    model.eval()
+                    payload["model"] = model
+                payload["kind"] = "lstm"
+                return payload
+
+            import joblib
+
+            return joblib.load(path)
 
     # Alias matching requested naming
     load_model_from_uri = load_model
 
-    async def predict_signal(self, plan: str, feature_dict: dict[str, float], db: AsyncSession) -> int:
+    def model_layout(self, uri: str) -> tuple[list[str] | None, int | None]:
+        """Feature order the artifact was trained with and, for sequence models, its window length."""
+        model_obj = self.load_model(uri)
+        if not isinstance(model_obj, dict):
+            return None, None
+        feature_order = model_obj.get("feature_order")
+        seq_len = None
+        if model_obj.get("kind") == "lstm":
+            seq_len = int(model_obj.get("seq_len", 10))
+        return (list(feature_order) if feature_order else None), seq_len
+
+    def predict_matrix(self, uri: str, matrix: np.ndarray) -> np.ndarray:
+        """Score a ``(rows, n_features)`` matrix laid out in ``model_layout(uri)`` order."""
+        metrics.MODEL_CACHE_LOOKUPS.inc()
+        model_obj = self.load_model(uri)
+        with tracing.span("model.inference", rows=len(matrix)):
+            return self._score(model_obj, matrix)
+
+    async def predict_signal(self, plan: str, feature_dict: dict[str, float], db: AsyncSession) -> tuple[int, str | None]:
+        """``(signal, uri of the artifact that produced it)``."""
+        signals, uri = await self.predict_batch(plan, [feature_dict], db)
+        return signals[0], uri
+
+    async def predict_batch(
+        self, plan: str, feature_rows: list[dict[str, float]], db: AsyncSession
+    ) -> tuple[list[int], str | None]:
+        """``(signals, uri of the artifact that produced them)``."""
+        start = time.perf_counter()
         plan_key = self._normalize_plan(plan)
         uri = await self.get_model_uri_for_plan(plan_key, db)
+        try:
+            signals = await self._predict_active(uri, feature_rows)
+            if plan_key in self.shadow.models:
+                self.shadow.offer(plan_key, uri, feature_rows, signals)
+            return signals, uri
+        finally:
+            model_label = Path(uri).name if uri else "heuristic"
+            metrics.PREDICT_SECONDS.observe(time.perf_counter() - start, (plan_key, model_label))
+
+    async def _predict_active(self, uri: str | None, feature_rows: list[dict[str, float]]) -> list[int]:
         if not uri:
-            score = feature_dict.get("sentiment_score", 0.0) * 0.6 + feature_dict.get("log_return", 0)
-            return 1 if score >= 0 else 0
+            return [self._heuristic(features) for features in feature_rows]
+        if self.remote is not None:
+            signals = await self._predict_remote(uri, feature_rows)
+            if signals is not None:
+                return signals
+        feature_order, _ = self.model_layout(uri)
+        return self.predict_matrix(uri, self._to_matrix(feature_rows, feature_order)).tolist()
+
+    async def _predict_remote(self, uri: str, feature_rows: list[dict[str, float]]) -> list[int] | None:
+        try:
+            feature_order, _ = await self.remote.layout(uri)
+            signals = await self.remote.predict(uri, self._to_matrix(feature_rows, feature_order))
+        except ModelServerError:
+            if not settings.MODEL_SERVER_FALLBACK:
+                raise
+            metrics.MODEL_SERVER_ERRORS.inc(labels=("predict",))
+            return None
+        return signals.tolist()
+
+    async def clear_cache(self) -> None:
+        """Drop cached artifacts here and, when configured, in the shared model server."""
+        self.load_model.cache_clear()
+        if self.remote is not None:
+            try:
+                await self.remote.reload()
+            except ModelServerError:
+                metrics.MODEL_SERVER_ERRORS.inc(labels=("reload",))
+
+    @staticmethod
+    def _heuristic(feature_dict: dict[str, float]) -> int:
+        score = feature_dict.get("sentiment_score", 0.0) * 0.6 + feature_dict.get("log_return", 0)
+        return 1 if score >= 0 else 0
+
+    @staticmethod
+    def _to_matrix(feature_rows: list[dict[str, float]], feature_order: list[str] | None) -> np.ndarray:
+        feature_order = feature_order or list(feature_rows[0].keys())
+        return np.array([[row.get(f, 0.0) for f in feature_order] for row in feature_rows], dtype=np.float32)
+
+    def _score(self, model_obj: Any, matrix: np.ndarray) -> np.ndarray:
+        model = model_obj["model"] if isinstance(model_obj, dict) and "model" in model_obj else model_obj
 
-        model_obj = self.load_model(uri)
-        feature_order = model_obj.get("feature_order") if isinstance(model_obj, dict) else None
-
-        if isinstance(model_obj, dict) and model_obj.get("model"):
-            model = model_obj["model"]
-            if model.__class__.__name__ == "SimpleLSTMClassifier":
-                seq_len = model_obj.get("seq_len", 10)
-                feature_order = model_obj.get("feature_order", list(feature_dict.keys()))
-                vector = np.array([feature_dict.get(f, 0.0) for f in feature_order], dtype=np.float32)
-                sequence = np.tile(vector, (seq_len, 1)).reshape(1, seq_len, -1)
-                with torch.no_grad():
-                    logits = model(torch.tensor(sequence, dtype=torch.float32))
-                    pred_idx = torch.argmax(logits, dim=1).item()
-                    if logits.shape[1] == 3:
-                        return [-1, 0, 1][pred_idx]
-                    return int(pred_idx)
+        if isinstance(model_obj, dict) and model_obj.get("kind") == "lstm":
+            import torch
+
+            # Only the latest bar is available at serving time, so it is repeated across the window.
+            seq_len = model_obj.get("seq_len", 10)
+            sequences = np.repeat(matrix[:, None, :], seq_len, axis=1)
+            with torch.no_grad():
+                logits = model(torch.from_numpy(np.ascontiguousarray(sequences, dtype=np.float32)))
+            pred_idx = torch.argmax(logits, dim=1).numpy()
+            if logits.shape[1] == 3:
+                return np.array([-1, 0, 1])[pred_idx]
+            return pred_idx.astype(np.int64)
 
-        model = model_obj["model"] if isinstance(model_obj, dict) and "model" in model_obj else model_obj
-        feature_order = feature_order or list(feature_dict.keys())
-        vector = np.array([feature_dict.get(f, 0.0) for f in feature_order]).reshape(1, -1)
         if hasattr(model, "predict_proba"):
-            proba = model.predict_proba(vector)[0][1]
-            return 1 if proba >= 0.5 else 0
-        pred = model.predict(vector)[0]
-        return int(pred)
+            return (model.predict_proba(matrix)[:, 1] >= 0.5).astype(np.int64)
+        return np.asarray(model.predict(matrix)).astype(np.int64)
 
     async def generate_signal_for_user(self, user: User, feature_dict: dict[str, float], db: AsyncSession) -> int:
         plan_value = user.plan.value if isinstance(user.plan, PlanEnum) else str(user.plan)
-        return await self.predict_signal(plan_value, feature_dict, db)
+        return (await self.predict_signal(plan_value, feature_dict, db))[0]
 
     async def predict_signal_for_plan(self, plan: str, feature_dict: dict[str, float], db: AsyncSession) -> int:
-        return await self.predict_signal(plan, feature_dict, db)
+        return (await self.predict_signal(plan, feature_dict, db))[0]
 
 
 ml_model_service = MLModelService()
@@ -0,0 +1,270 @@
+"""Shared model server: one process owns the model artifacts for every API worker.
+
+Run it next to the API and point the workers at its Unix socket::
+
+    python -m app.services.model_server --socket /tmp/investia-models.sock --threads 2
+    MODEL_BACKEND=remote MODEL_SERVER_SOCKET=/tmp/investia-models.sock uvicorn app.api.main:app --workers 4
+
+Several workers also need the ledger server (``app.services.ledger_server``),
+since each one would otherwise try to own the paper ledger.
+
+Frames are a 4-byte little-endian header length, a JSON header and an optional raw
+payload whose size is given by the header's ``nbytes``. ``predict`` requests carry
+a float32 feature matrix and get int8 signals back. Concurrent requests for the
+same artifact are coalesced into one matrix for up to ``MODEL_SERVER_BATCH_WINDOW_MS``
+so several workers share a single forward pass, and scoring runs on one thread
+whose intra-op parallelism is capped by ``--threads``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import settings
+
+_HEADER_LEN = struct.Struct("<I")
+
+
+class ModelServerError(RuntimeError):
+    """The model server could not be reached or rejected the request."""
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> tuple[dict[str, Any], bytes]:
+    (size,) = _HEADER_LEN.unpack(await reader.readexactly(_HEADER_LEN.size))
+    header = json.loads(await reader.readexactly(size))
+    nbytes = header.get("nbytes", 0)
+    payload = await reader.readexactly(nbytes) if nbytes else b""
+    return header, payload
+
+
+def _write_frame(writer: asyncio.StreamWriter, header: dict[str, Any], payload: bytes = b"") -> None:
+    header["nbytes"] = len(payload)
+    encoded = json.dumps(header).encode()
+    writer.write(_HEADER_LEN.pack(len(encoded)) + encoded + payload)
+
+
+class ModelServerClient:
+    """Pooled asyncio client used by ``MLModelService`` when ``MODEL_BACKEND=remote``."""
+
+    def __init__(self, socket_path: str, pool_size: int | None = None, timeout_seconds: float | None = None) -> None:
+        self.socket_path = socket_path
+        self.pool_size = settings.MODEL_SERVER_POOL_SIZE if pool_size is None else pool_size
+        self.timeout_seconds = settings.MODEL_SERVER_TIMEOUT_SECONDS if timeout_seconds is None else timeout_seconds
+        self.load_timeout_seconds = settings.MODEL_SERVER_LOAD_TIMEOUT_SECONDS
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._layouts: dict[str, tuple[list[str] | None, int | None]] = {}
+
+    async def layout(self, uri: str) -> tuple[list[str] | None, int | None]:
+        cached = self._layouts.get(uri)
+        if cached is None:
+            # The first layout request makes the server load the artifact, so it gets the load timeout.
+            header, _ = await self._request({"op": "layout", "uri": uri}, timeout_seconds=self.load_timeout_seconds)
+            cached = (header.get("feature_order"), header.get("seq_len"))
+            self._layouts[uri] = cached
+        return cached
+
+    async def predict(self, uri: str, matrix: np.ndarray) -> np.ndarray:
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        header, payload = await self._request({"op": "predict", "uri": uri, "shape": list(matrix.shape)}, matrix.tobytes())
+        return np.frombuffer(payload, dtype=np.int8).astype(np.int64)
+
+    async def reload(self) -> None:
+        self._layouts.clear()
+        await self._request({"op": "reload"}, timeout_seconds=self.load_timeout_seconds)
+
+    async def ping(self) -> dict[str, Any]:
+        header, _ = await self._request({"op": "ping"})
+        return header
+
+    async def _request(
+        self, header: dict[str, Any], payload: bytes = b"", timeout_seconds: float | None = None
+    ) -> tuple[dict[str, Any], bytes]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Pooled streams belong to the loop that opened them (workers run one loop per cycle).
+            self._idle, self._loop = [], loop
+            self._slots = asyncio.Semaphore(self.pool_size)
+        async with self._slots:
+            return await self._roundtrip(header, payload, timeout_seconds or self.timeout_seconds)
+
+    async def _roundtrip(self, header: dict[str, Any], payload: bytes, timeout: float) -> tuple[dict[str, Any], bytes]:
+        op = header["op"]
+        start = time.perf_counter()
+        conn = None
+        try:
+            conn = self._idle.pop() if self._idle else await asyncio.wait_for(
+                asyncio.open_unix_connection(self.socket_path), timeout
+            )
+            reader, writer = conn
+            _write_frame(writer, header, payload)
+            await writer.drain()
+            response, body = await asyncio.wait_for(_read_frame(reader), timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+            if conn is not None:
+                conn[1].close()
+            raise ModelServerError(f"model server {op} failed: {exc!r}") from exc
+        finally:
+            metrics.MODEL_SERVER_SECONDS.observe(time.perf_counter() - start, (op,))
+
+        self._idle.append(conn)
+        if not response.get("ok"):
+            raise ModelServerError(response.get("error", f"model server {op} failed"))
+        return response, body
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+class _Batcher:
+    """Coalesces concurrent predict requests for one artifact into a single matrix."""
+
+    def __init__(self, server: "ModelServer", uri: str) -> None:
+        self.server = server
+        self.uri = uri
+        self.pending: list[tuple[np.ndarray, asyncio.Future]] = []
+        self.pending_rows = 0
+        self.flush_handle: asyncio.TimerHandle | None = None
+
+    def submit(self, matrix: np.ndarray) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((matrix, future))
+        self.pending_rows += len(matrix)
+        if self.pending_rows >= self.server.max_batch_rows:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.server.batch_window_seconds, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending, self.pending_rows = self.pending, [], 0
+        if batch:
+            asyncio.ensure_future(self._score(batch))
+
+    async def _score(self, batch: list[tuple[np.ndarray, asyncio.Future]]) -> None:
+        matrix = batch[0][0] if len(batch) == 1 else np.concatenate([m for m, _ in batch])
+        metrics.MODEL_SERVER_BATCH_ROWS.observe(len(matrix))
+        loop = asyncio.get_running_loop()
+        try:
+            signals = await loop.run_in_executor(self.server.executor, self.server.service.predict_matrix, self.uri, matrix)
+        except Exception as exc:  # noqa: BLE001 - reported back to every waiting client
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        offset = 0
+        for rows, future in batch:
+            if not future.done():
+                future.set_result(signals[offset : offset + len(rows)])
+            offset += len(rows)
+
+
+class ModelServer:
+    def __init__(
+        self,
+        socket_path: str,
+        *,
+        service: Any = None,
+        batch_window_ms: float | None = None,
+        max_batch_rows: int | None = None,
+    ) -> None:
+        if service is None:
+            from app.services.ml_model_service import MLModelService
+
+            service = MLModelService(backend="inprocess")
+        self.socket_path = socket_path
+        self.service = service
+        window = settings.MODEL_SERVER_BATCH_WINDOW_MS if batch_window_ms is None else batch_window_ms
+        self.batch_window_seconds = window / 1000.0
+        self.max_batch_rows = settings.MODEL_SERVER_MAX_BATCH_ROWS if max_batch_rows is None else max_batch_rows
+        # A single scoring thread: models are not duplicated and intra-op threads do the parallel work.
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="investia-model-server")
+        self._batchers: dict[str, _Batcher] = {}
+        self.requests = 0
+
+    async def serve_forever(self) -> None:
+        path = Path(self.socket_path)
+        if path.exists():
+            path.unlink()
+        server = await asyncio.start_unix_server(self._handle, path=str(path))
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    header, payload = await _read_frame(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                self.requests += 1
+                try:
+                    response, body = await self._dispatch(header, payload)
+                except Exception as exc:  # noqa: BLE001 - the client falls back to in-process scoring
+                    response, body = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}, b""
+                _write_frame(writer, response, body)
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    return
+        finally:
+            writer.close()
+
+    async def _dispatch(self, header: dict[str, Any], payload: bytes) -> tuple[dict[str, Any], bytes]:
+        op = header.get("op")
+        loop = asyncio.get_running_loop()
+        if op == "predict":
+            matrix = np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+            batcher = self._batchers.get(header["uri"])
+            if batcher is None:
+                batcher = self._batchers[header["uri"]] = _Batcher(self, header["uri"])
+            signals = await batcher.submit(matrix)
+            return {"ok": True}, np.asarray(signals, dtype=np.int8).tobytes()
+        if op == "layout":
+            feature_order, seq_len = await loop.run_in_executor(self.executor, self.service.model_layout, header["uri"])
+            return {"ok": True, "feature_order": feature_order, "seq_len": seq_len}, b""
+        if op == "reload":
+            self.service.load_model.cache_clear()
+            return {"ok": True}, b""
+        if op == "ping":
+            cache = self.service.load_model.cache_info()
+            return {"ok": True, "pid": os.getpid(), "requests": self.requests, "models_cached": cache.currsize}, b""
+        raise ValueError(f"unknown op {op!r}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve Investia models to API workers over a Unix socket")
+    parser.add_argument("--socket", default=settings.MODEL_SERVER_SOCKET)
+    parser.add_argument("--threads", type=int, default=settings.MODEL_SERVER_THREADS, help="intra-op threads for scoring")
+    parser.add_argument("--preload", nargs="*", default=[], help="artifact URIs to load before accepting requests")
+    args = parser.parse_args()
+
+    # Read by torch / OpenMP when they are first imported (lazily, on the first model load).
+    os.environ.setdefault("OMP_NUM_THREADS", str(args.threads))
+    os.environ.setdefault("MKL_NUM_THREADS", str(args.threads))
+    server = ModelServer(args.socket)
+    for uri in args.preload:
+        server.service.load_model(uri)
+    print(f"model server listening on {args.socket} (pid {os.getpid()})")
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
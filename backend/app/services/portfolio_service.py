@@ -1,18 +1,97 @@
+import csv
+import io
+import json
 from datetime import date
+from typing import AsyncIterator
 
-from sqlalchemy import select
+from sqlalchemy import and_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.database import AsyncSessionLocal
 from app.models.portfolio import DailyMetrics
+from app.models.trading import Trade
+
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_COLUMNS = {
+    "trades": ("id", "symbol", "side", "quantity", "price", "pnl", "explanation", "created_at"),
+    "metrics": ("date", "pnl", "sharpe_ratio", "win_rate"),
+}
 
 
 class PortfolioService:
-    async def get_metrics(self, db: AsyncSession, user_id: int) -> list[DailyMetrics]:
-        result = await db.execute(
-            select(DailyMetrics).where(DailyMetrics.user_id == user_id).order_by(DailyMetrics.date.desc())
+    async def get_metrics(
+        self, db: AsyncSession, user_id: int, limit: int | None = None, before: date | None = None
+    ) -> list[DailyMetrics]:
+        """Newest-first daily metrics; pass the last row's date as ``before`` for the next page."""
+        stmt = select(DailyMetrics).where(DailyMetrics.user_id == user_id).order_by(DailyMetrics.date.desc())
+        if before is not None:
+            stmt = stmt.where(DailyMetrics.date < before)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def list_trades(
+        self, db: AsyncSession, user_id: int, limit: int, before_id: int | None = None
+    ) -> list[Trade] | None:
+        """Newest-first trades, keyset-paged on ``(created_at, id)`` over ``ix_trades_user_created_at``.
+
+        Returns None when ``before_id`` is not one of the user's trades.
+        """
+        stmt = (
+            select(Trade)
+            .where(Trade.user_id == user_id)
+            .order_by(Trade.created_at.desc(), Trade.id.desc())
+            .limit(limit)
         )
+        if before_id is not None:
+            cursor_created_at = await db.scalar(
+                select(Trade.created_at).where(Trade.id == before_id, Trade.user_id == user_id)
+            )
+            if cursor_created_at is None:
+                return None
+            stmt = stmt.where(
+                or_(
+                    Trade.created_at < cursor_created_at,
+                    and_(Trade.created_at == cursor_created_at, Trade.id < before_id),
+                )
+            )
+        result = await db.execute(stmt)
         return result.scalars().all()
 
+    async def export_rows(self, user_id: int, dataset: str, fmt: str) -> AsyncIterator[str]:
+        """Stream a user's trades or daily metrics as NDJSON or CSV text chunks.
+
+        Rows come from a server-side cursor (``stream`` + ``yield_per``) on a session
+        owned by the generator, so memory stays constant whatever the history size
+        and the request's session can close before the body is sent.
+        """
+        columns = EXPORT_COLUMNS[dataset]
+        if dataset == "trades":
+            model, order = Trade, (Trade.created_at, Trade.id)
+        else:
+            model, order = DailyMetrics, (DailyMetrics.date,)
+        stmt = (
+            select(*(getattr(model, column) for column in columns))
+            .where(model.user_id == user_id)
+            .order_by(*order)
+            .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+        )
+        if fmt == "csv":
+            yield ",".join(columns) + "\r\n"
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(stmt)
+            async for rows in result.partitions():
+                buffer = io.StringIO()
+                if fmt == "csv":
+                    writer = csv.writer(buffer)
+                    writer.writerows(rows)
+                else:
+                    for row in rows:
+                        buffer.write(json.dumps(dict(zip(columns, row)), default=str))
+                        buffer.write("\n")
+                yield buffer.getvalue()
+
     async def upsert_daily_metric(
         self, db: AsyncSession, *, user_id: int, metric_date: date, pnl: float, sharpe_ratio: float, win_rate: float
     ) -> DailyMetrics:
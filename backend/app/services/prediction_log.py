@@ -0,0 +1,207 @@
+"""Append-only log of live feature vectors and the signals served from them.
+
+``PredictionLog.log`` is called on the hot path by ``generate_trade_event`` and
+``/trading/signal``. It puts a small tuple on a bounded queue with ``put_nowait``
+and returns. When the queue is full the row is dropped and counted in
+``investia_prediction_log_dropped_total``.
+
+A background thread drains the queue. It flushes when ``PREDICTION_LOG_BATCH_ROWS``
+rows are buffered or every ``PREDICTION_LOG_FLUSH_SECONDS``, writing one columnar
+``.npz`` per partition. Logging is off unless ``PREDICTION_LOG_ENABLED`` is set,
+since the log grows without bound; point ``PREDICTION_LOG_DIR`` at a managed
+volume when turning it on::
+
+    PREDICTION_LOG_DIR/date=2025-12-01/plan=pro/<HHMMSS>-<pid>-<seq>.npz
+
+Columns: ``timestamp`` (epoch seconds), ``symbol``, ``user_id`` (-1 when anonymous),
+``signal``, ``model``, ``source`` and ``features``, a float32 ``(rows, n)`` matrix in
+``REALTIME_FEATURE_ORDER``. Files are written under a temporary name and renamed,
+so readers never see a partial batch. ``read_prediction_log`` returns the columns
+as arrays; ``ml.feature_store`` builds DataFrames and label joins from them.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from itertools import count
+from pathlib import Path
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import settings
+from app.services.realtime_features import REALTIME_FEATURE_ORDER
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_COLUMNS = ("timestamp", "symbol", "user_id", "signal", "model", "source", "features")
+
+
+class PredictionLog:
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        *,
+        queue_size: int | None = None,
+        batch_rows: int | None = None,
+        flush_seconds: float | None = None,
+        enabled: bool | None = None,
+    ) -> None:
+        self.directory = Path(directory or settings.PREDICTION_LOG_DIR)
+        self.enabled = settings.PREDICTION_LOG_ENABLED if enabled is None else enabled
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size or settings.PREDICTION_LOG_QUEUE_SIZE)
+        self.batch_rows = batch_rows or settings.PREDICTION_LOG_BATCH_ROWS
+        self.flush_seconds = settings.PREDICTION_LOG_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self._seq = count()
+        self._thread: threading.Thread | None = None
+
+    def log(
+        self,
+        plan: str,
+        symbol: str,
+        features: dict[str, float],
+        signal: int,
+        *,
+        model: str | None = None,
+        user_id: int | None = None,
+        source: str = "",
+        timestamp: float | None = None,
+    ) -> bool:
+        """Queue one served prediction; never blocks."""
+        if not self.enabled:
+            return False
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="investia-prediction-log", daemon=True)
+            self._thread.start()
+        record = (
+            time.time() if timestamp is None else timestamp,
+            plan,
+            symbol,
+            -1 if user_id is None else user_id,
+            signal,
+            Path(model).name if model else "heuristic",
+            source,
+            dict(features),
+        )
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.PREDICTION_LOG_DROPPED.inc()
+            return False
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush buffered rows and stop the background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        buffer: list[tuple] = []
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                record = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                record = None
+            if record is _STOP:
+                self._flush(buffer)
+                return
+            if record is not None:
+                buffer.append(record)
+            if len(buffer) >= self.batch_rows or time.monotonic() >= deadline:
+                self._flush(buffer)
+                buffer = []
+                deadline = time.monotonic() + self.flush_seconds
+
+    def _flush(self, records: list[tuple]) -> None:
+        if not records:
+            return
+        partitions: dict[tuple[str, str], list[tuple]] = defaultdict(list)
+        for record in records:
+            day = datetime.fromtimestamp(record[0], tz=timezone.utc).date().isoformat()
+            partitions[(day, record[1])].append(record)
+        for (day, plan), rows in partitions.items():
+            try:
+                self._write(day, plan, rows)
+            except OSError:
+                logger.exception("Failed to write prediction log batch for %s/%s", day, plan)
+                continue
+            metrics.PREDICTION_LOG_ROWS.inc(len(rows))
+
+    def _write(self, day: str, plan: str, rows: list[tuple]) -> Path:
+        directory = self.directory / f"date={day}" / f"plan={plan}"
+        directory.mkdir(parents=True, exist_ok=True)
+        timestamps, _, symbols, user_ids, signals, models, sources, features = zip(*rows)
+        matrix = np.array([[row.get(name, 0.0) for name in REALTIME_FEATURE_ORDER] for row in features], dtype=np.float32)
+        path = directory / f"{time.strftime('%H%M%S')}-{os.getpid()}-{next(self._seq)}.npz"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as fh:
+            np.savez(
+                fh,
+                timestamp=np.array(timestamps, dtype=np.float64),
+                symbol=np.array(symbols),
+                user_id=np.array(user_ids, dtype=np.int64),
+                signal=np.array(signals, dtype=np.int8),
+                model=np.array(models),
+                source=np.array(sources),
+                features=matrix,
+                feature_order=np.array(REALTIME_FEATURE_ORDER),
+            )
+        tmp.rename(path)
+        return path
+
+
+def _partition_value(path: Path) -> str:
+    return path.name.split("=", 1)[1]
+
+
+def read_prediction_log(
+    directory: str | Path | None = None,
+    *,
+    start: date | None = None,
+    end: date | None = None,
+    plan: str | None = None,
+) -> dict[str, np.ndarray]:
+    """Concatenate logged batches (inclusive date range, optional plan) sorted by timestamp.
+
+    Partitions outside the range are skipped from their directory names alone.
+    """
+    root = Path(directory or settings.PREDICTION_LOG_DIR)
+    parts: dict[str, list[np.ndarray]] = defaultdict(list)
+    feature_order: list[str] = list(REALTIME_FEATURE_ORDER)
+    for day_dir in sorted(root.glob("date=*")):
+        day = date.fromisoformat(_partition_value(day_dir))
+        if (start and day < start) or (end and day > end):
+            continue
+        for plan_dir in sorted(day_dir.glob("plan=*")):
+            plan_value = _partition_value(plan_dir)
+            if plan and plan_value != plan:
+                continue
+            for path in sorted(plan_dir.glob("*.npz")):
+                with np.load(path) as batch:
+                    feature_order = batch["feature_order"].tolist()
+                    for column in _COLUMNS:
+                        parts[column].append(batch[column])
+                    parts["plan"].append(np.full(len(batch["timestamp"]), plan_value))
+    if not parts:
+        return {}
+    columns = {column: np.concatenate(arrays) for column, arrays in parts.items()}
+    order = np.argsort(columns["timestamp"], kind="stable")
+    columns = {column: array[order] for column, array in columns.items()}
+    columns["feature_order"] = np.array(feature_order)
+    return columns
+
+
+prediction_log = PredictionLog()
@@ -0,0 +1,174 @@
+import json
+import time
+from typing import Iterable, Sequence
+
+import numpy as np
+from redis.asyncio import Redis
+
+from app.core import metrics, tracing
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+
+# Fixed feature layout of the float32 blobs stored under ``features:{symbol}``.
+# Appending a feature requires bumping FEATURE_SCHEMA_VERSION.
+REALTIME_FEATURE_ORDER: tuple[str, ...] = (
+    "log_return",
+    "volatility_10",
+    "volatility_20",
+    "volatility_50",
+    "ma_ratio",
+    "rsi_14",
+    "volume_zscore",
+    "price_spread",
+    "sentiment_score",
+    "orderbook_depth",
+    "quant_factor",
+    "price",
+)
+FEATURE_SCHEMA_VERSION = 1
+FEATURE_MAGIC = b"IF"
+
+_N_FEATURES = len(REALTIME_FEATURE_ORDER)
+_BLOB_DTYPE = np.dtype([("magic", "S2"), ("version", "<u2"), ("n", "<u2"), ("values", "<f4", (_N_FEATURES,))])
+
+
+def encode_features(features: dict[str, float] | Sequence[float]) -> bytes:
+    """Serialize a feature dict (or ordered vector) as a versioned float32 blob."""
+    record = np.zeros(1, dtype=_BLOB_DTYPE)
+    record["magic"] = FEATURE_MAGIC
+    record["version"] = FEATURE_SCHEMA_VERSION
+    record["n"] = _N_FEATURES
+    if isinstance(features, dict):
+        record["values"][0] = [features.get(name, 0.0) for name in REALTIME_FEATURE_ORDER]
+    else:
+        record["values"][0] = features
+    return record.tobytes()
+
+
+def _decode_legacy_json(blob: bytes) -> np.ndarray | None:
+    try:
+        data = json.loads(blob)
+        return np.array([float(data.get(name, 0.0)) for name in REALTIME_FEATURE_ORDER], dtype=np.float32)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def decode_features_many(blobs: Sequence[bytes | None]) -> tuple[np.ndarray, np.ndarray]:
+    """Decode blobs into a ``(len(blobs), n_features)`` float32 matrix plus a hit mask.
+
+    Current-schema blobs are decoded in a single ``np.frombuffer`` call; legacy JSON
+    payloads are still accepted so a rolling deploy does not drop features.
+    """
+    matrix = np.zeros((len(blobs), _N_FEATURES), dtype=np.float32)
+    hits = np.zeros(len(blobs), dtype=bool)
+    binary_idx: list[int] = []
+    binary_blobs: list[bytes] = []
+    for idx, blob in enumerate(blobs):
+        if not blob:
+            continue
+        if len(blob) == _BLOB_DTYPE.itemsize and blob[:2] == FEATURE_MAGIC:
+            binary_idx.append(idx)
+            binary_blobs.append(blob)
+        elif blob[:1] == b"{":
+            row = _decode_legacy_json(blob)
+            if row is not None:
+                matrix[idx] = row
+                hits[idx] = True
+    if binary_blobs:
+        records = np.frombuffer(b"".join(binary_blobs), dtype=_BLOB_DTYPE)
+        valid = (records["version"] == FEATURE_SCHEMA_VERSION) & (records["n"] == _N_FEATURES)
+        rows = np.asarray(binary_idx)[valid]
+        matrix[rows] = records["values"][valid]
+        hits[rows] = True
+    return matrix, hits
+
+
+def features_to_dict(row: np.ndarray) -> dict[str, float]:
+    return dict(zip(REALTIME_FEATURE_ORDER, row.tolist()))
+
+
+class RealtimeFeatureStore:
+    """Redis-backed feature vectors with an in-process L1 cache and a circuit breaker."""
+
+    def __init__(self, redis: Redis | None, ttl_seconds: float | None = None) -> None:
+        self.redis = redis
+        self.ttl_seconds = settings.FEATURE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+            cooldown_seconds=settings.REDIS_BREAKER_COOLDOWN_SECONDS,
+        )
+        self._l1: dict[str, tuple[float, np.ndarray]] = {}
+
+    @staticmethod
+    def key(symbol: str) -> str:
+        return f"features:{symbol}"
+
+    async def fetch_many(self, symbols: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Return a feature matrix for ``symbols`` and a mask of rows actually found."""
+        matrix = np.zeros((len(symbols), _N_FEATURES), dtype=np.float32)
+        hits = np.zeros(len(symbols), dtype=bool)
+        now = time.monotonic()
+        missing: list[int] = []
+        for idx, symbol in enumerate(symbols):
+            cached = self._l1.get(symbol)
+            if cached and cached[0] > now:
+                matrix[idx] = cached[1]
+                hits[idx] = True
+            else:
+                missing.append(idx)
+
+        if len(missing) < len(symbols):
+            metrics.FEATURE_L1_HITS.inc(len(symbols) - len(missing))
+        if not missing:
+            return matrix, hits
+        if self.redis is None or not self.breaker.allow():
+            metrics.REDIS_FALLBACKS.inc(len(missing), ("unavailable" if self.redis is None else "breaker_open",))
+            return matrix, hits
+
+        start = time.perf_counter()
+        try:
+            with tracing.span("redis.mget", keys=len(missing)):
+                blobs = await self.redis.mget([self.key(symbols[idx]) for idx in missing])
+        except Exception:
+            self.breaker.record_failure()
+            metrics.REDIS_FALLBACKS.inc(len(missing), ("error",))
+            return matrix, hits
+        finally:
+            metrics.REDIS_CALL_SECONDS.observe(time.perf_counter() - start, ("mget",))
+        self.breaker.record_success()
+
+        fetched, fetched_hits = decode_features_many(blobs)
+        expires_at = now + self.ttl_seconds
+        for pos, idx in enumerate(missing):
+            if fetched_hits[pos]:
+                matrix[idx] = fetched[pos]
+                hits[idx] = True
+                self._l1[symbols[idx]] = (expires_at, fetched[pos].copy())
+        misses = len(missing) - int(fetched_hits.sum())
+        if misses:
+            metrics.REDIS_FALLBACKS.inc(misses, ("miss",))
+        return matrix, hits
+
+    async def publish_many(self, features_by_symbol: dict[str, dict[str, float]], expire_seconds: int | None = None) -> None:
+        """Write feature vectors for several symbols in one pipelined round trip."""
+        if self.redis is None or not self.breaker.allow():
+            return
+        start = time.perf_counter()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for symbol, features in features_by_symbol.items():
+                    pipe.set(self.key(symbol), encode_features(features), ex=expire_seconds)
+                await pipe.execute()
+        except Exception:
+            self.breaker.record_failure()
+            return
+        finally:
+            metrics.REDIS_CALL_SECONDS.observe(time.perf_counter() - start, ("pipeline_set",))
+        self.breaker.record_success()
+
+    def invalidate(self, symbols: Iterable[str] | None = None) -> None:
+        if symbols is None:
+            self._l1.clear()
+            return
+        for symbol in symbols:
+            self._l1.pop(symbol, None)
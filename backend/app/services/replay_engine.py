@@ -0,0 +1,181 @@
+"""Accelerated historical replay of stored OHLCV bars through the trading engine.
+
+Run from ``backend/``::
+
+    python -m app.services.replay_engine --symbols BTC-USD ETH-USD --interval 1d --speed 3600
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Sequence
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.clock import VirtualClock
+from app.models.user import PlanEnum, User
+from app.services.data_ingestion_service import data_ingestion_service
+from app.services.ledger import PaperLedger
+from app.services.realtime_features import REALTIME_FEATURE_ORDER
+from app.services.trading_engine import TradingEngine, trading_engine
+from app.services.write_behind import write_buffer
+from ml import utils
+
+
+@dataclass
+class ReplayStats:
+    events: int = 0
+    trades_recorded: int = 0
+    wall_seconds: float = 0.0
+    virtual_seconds: float = 0.0
+    signals: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.wall_seconds if self.wall_seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "events": self.events,
+            "trades_recorded": self.trades_recorded,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "virtual_seconds": self.virtual_seconds,
+            "events_per_second": round(self.events_per_second, 2),
+            "signals": self.signals,
+        }
+
+
+class ReplayDriver:
+    """Feed stored bars for a symbol universe through features, MLModelService and trade recording.
+
+    ``speed`` is the virtual-to-wall time ratio (``speed=3600`` plays one hour of
+    bars per second); ``speed=None`` replays as fast as possible. The engine's
+    clock is swapped for a ``VirtualClock`` for the duration of ``run`` so trade
+    timestamps follow bar time, and its ledger for ``self.ledger`` (bypassing any
+    ledger server) so replayed fills never touch live paper positions.
+    """
+
+    def __init__(
+        self,
+        symbols: Sequence[str],
+        interval: str = "1d",
+        *,
+        engine: TradingEngine | None = None,
+        speed: float | None = None,
+        seed: int = 42,
+    ) -> None:
+        self.engine = engine or trading_engine
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.speed = speed
+        self.seed = seed
+        self.clock = VirtualClock()
+        self.ledger = PaperLedger(self.symbols, scratch=True)
+        self._timestamps, self._symbol_idx, self._rows = self._build_timeline()
+
+    def _build_timeline(self) -> tuple[np.ndarray, np.ndarray, list[np.ndarray]]:
+        order_book = [data_ingestion_service.get_order_book_snapshot(s) for s in self.symbols]
+        quant = [data_ingestion_service.get_quant_features(s) for s in self.symbols]
+        timestamps, symbol_idx, rows = [], [], []
+        for idx, symbol in enumerate(self.symbols):
+            df = utils.load_ohlcv(symbol, self.interval)
+            features, _ = utils.build_features_pro(df)
+            features = features.fillna(0)
+            features["orderbook_depth"] = order_book[idx]
+            features["quant_factor"] = quant[idx]
+            features["price"] = df["close"].to_numpy()
+            rows.append(features[list(REALTIME_FEATURE_ORDER)].to_numpy(dtype=np.float64))
+            if "date" in df.columns:
+                timestamps.append(df["date"].to_numpy(dtype="datetime64[ns]"))
+            else:
+                timestamps.append(np.arange(len(df), dtype="datetime64[D]").astype("datetime64[ns]"))
+            symbol_idx.append(np.full(len(df), idx, dtype=np.int32))
+        ts = np.concatenate(timestamps)
+        sym = np.concatenate(symbol_idx)
+        order = np.argsort(ts, kind="stable")
+        return ts[order], sym[order], rows
+
+    def _row_offsets(self) -> np.ndarray:
+        # Position of each timeline event within its symbol's feature matrix
+        offsets = np.zeros(len(self._symbol_idx), dtype=np.int64)
+        for idx in range(len(self.symbols)):
+            mask = self._symbol_idx == idx
+            offsets[mask] = np.arange(int(mask.sum()))
+        return offsets
+
+    async def run(
+        self,
+        db: AsyncSession | None = None,
+        *,
+        user: User | None = None,
+        plan: str = PlanEnum.free.value,
+        record_trades: bool = False,
+        max_events: int | None = None,
+    ) -> ReplayStats:
+        """Replay the timeline; trades are only persisted for a real ``user`` with ``record_trades``."""
+        random.seed(self.seed)
+        actor = user or User(id=0, email="replay@local", plan=PlanEnum(plan))
+        offsets = self._row_offsets()
+        total = len(offsets) if max_events is None else min(len(offsets), max_events)
+        stats = ReplayStats()
+        if total == 0:
+            return stats
+
+        previous_clock, previous_ledger, previous_client = self.engine.clock, self.engine.ledger, self.engine.ledger_client
+        self.engine.clock, self.engine.ledger, self.engine.ledger_client = self.clock, self.ledger, None
+        first_ts = self._timestamps[0]
+        wall_start = time.perf_counter()
+        try:
+            for pos in range(total):
+                bar_ts = self._timestamps[pos]
+                virtual_elapsed = (bar_ts - first_ts) / np.timedelta64(1, "s")
+                if self.speed:
+                    delay = wall_start + virtual_elapsed / self.speed - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                self.clock.set(bar_ts.astype("datetime64[us]").item())
+
+                sym_idx = self._symbol_idx[pos]
+                row = self._rows[sym_idx][offsets[pos]]
+                features = dict(zip(REALTIME_FEATURE_ORDER, row.tolist()))
+                event = await self.engine.generate_trade_event(
+                    db, user=actor, symbol=self.symbols[sym_idx], features=features, log_source=None
+                )
+                if record_trades and user is not None and db is not None:
+                    await self.engine.record_trade(db, event["trade"])
+                    stats.trades_recorded += 1
+                stats.events += 1
+                stats.signals[event["signal"]] = stats.signals.get(event["signal"], 0) + 1
+                stats.virtual_seconds = float(virtual_elapsed)
+            if stats.trades_recorded:
+                await write_buffer.flush()
+        finally:
+            self.engine.clock, self.engine.ledger, self.engine.ledger_client = previous_clock, previous_ledger, previous_client
+            stats.wall_seconds = time.perf_counter() - wall_start
+        return stats
+
+
+async def _main(args) -> None:
+    from app.core.database import AsyncSessionLocal
+
+    driver = ReplayDriver(args.symbols, args.interval, speed=args.speed, seed=args.seed)
+    async with AsyncSessionLocal() as session:
+        stats = await driver.run(session, plan=args.plan, max_events=args.max_events)
+    print("Replay stats", stats.as_dict())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay stored bars through the trading engine")
+    parser.add_argument("--symbols", nargs="+", default=["BTC-USD"])
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--plan", default=PlanEnum.free.value, choices=[p.value for p in PlanEnum])
+    parser.add_argument("--speed", type=float, default=None, help="virtual seconds per wall second; omit for max speed")
+    parser.add_argument("--max-events", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,280 @@
+"""Portfolio risk for every paper account, refreshed once per bar.
+
+A bar is one ``RISK_BAR_SECONDS`` interval. Paper trading has no exchange bars,
+so the marks the ledger holds when a bar closes (the last fill or tick price of
+each symbol) are taken as its closes. The covariance decay, the parametric
+VaR/CVaR and the Monte Carlo ``horizon`` are all per bar of this length.
+``run_bars`` closes bars in the process that owns the ledger: the API with
+``LEDGER_BACKEND=inprocess``, otherwise the ledger server, which also answers
+risk requests for the API workers.
+
+``on_bar`` treats the ledger's current marks as a bar close. It updates an
+exponentially weighted (RiskMetrics) covariance of symbol log returns in place::
+
+    cov = lambda * cov + (1 - lambda) * r r^T
+
+``refresh`` then computes risk for all ledger users, in chunks of
+``RISK_CHUNK_ROWS``, with dollar exposures ``X = positions * marks``:
+
+* one-bar volatility ``sigma = sqrt(rowsum((X @ cov) * X))``;
+* parametric (normal, zero-mean) VaR and CVaR at ``RISK_CONFIDENCE``;
+* gross and net exposure;
+* marginal risk ``(X @ cov) / sigma`` and component contributions
+  ``X * marginal``, which sum to ``sigma``. These are kept only for held symbols,
+  in CSR layout.
+
+Results are stored per bar and read with ``user_risk``, so requests never
+recompute them. ``monte_carlo`` draws vectorized scenario returns through the
+Cholesky factor of the covariance. It scores any number of users against the
+same paths, and results are cached per (user, bar).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Sequence
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import settings
+from app.services.ledger import PaperLedger, paper_ledger
+
+
+@dataclass
+class RiskSnapshot:
+    bar: int
+    computed_at: float
+    n_users: int
+    symbols: list[str]
+    sigma: np.ndarray
+    var: np.ndarray
+    cvar: np.ndarray
+    gross: np.ndarray
+    net: np.ndarray
+    # CSR rows of held symbols: user row r owns entries indptr[r]:indptr[r + 1]
+    indptr: np.ndarray
+    cols: np.ndarray
+    exposure: np.ndarray
+    marginal: np.ndarray
+
+
+class RiskService:
+    def __init__(
+        self,
+        ledger: PaperLedger | None = None,
+        *,
+        decay: float | None = None,
+        confidence: float | None = None,
+        chunk_rows: int | None = None,
+    ) -> None:
+        self.ledger = ledger or paper_ledger
+        self.decay = settings.RISK_EWMA_LAMBDA if decay is None else decay
+        self.confidence = settings.RISK_CONFIDENCE if confidence is None else confidence
+        self.chunk_rows = chunk_rows or settings.RISK_CHUNK_ROWS
+        z = NormalDist().inv_cdf(self.confidence)
+        self._var_scale = z
+        self._cvar_scale = NormalDist().pdf(z) / (1 - self.confidence)
+        self.cov = np.zeros((0, 0), dtype=np.float64)
+        self.last_marks = np.zeros(0, dtype=np.float64)
+        self.bar = 0
+        self.snapshot: RiskSnapshot | None = None
+        self._cholesky: tuple[int, np.ndarray] | None = None
+        self._mc_cache: dict[tuple[int, int, int, int], dict] = {}
+        self._lock = threading.Lock()
+
+    def on_bar(self, marks: np.ndarray | None = None) -> int:
+        """Fold one bar of closes (default: the ledger's marks) into the covariance."""
+        if marks is None:
+            with self.ledger.lock:
+                marks = self.ledger.marks[: self.ledger.n_symbols].copy()
+        marks = np.asarray(marks, dtype=np.float64)
+        with self._lock:
+            s = len(marks)
+            if s > len(self.last_marks):
+                cov = np.zeros((s, s), dtype=np.float64)
+                cov[: len(self.cov), : len(self.cov)] = self.cov
+                self.cov = cov
+                self.last_marks = np.r_[self.last_marks, np.zeros(s - len(self.last_marks))]
+            valid = (self.last_marks > 0) & (marks > 0)
+            returns = np.zeros(s, dtype=np.float64)
+            np.log(marks, out=returns, where=valid)
+            returns[valid] -= np.log(self.last_marks[valid])
+            self.cov *= self.decay
+            self.cov += (1 - self.decay) * np.outer(returns, returns)
+            self.last_marks = np.where(marks > 0, marks, self.last_marks)
+            self.bar += 1
+            self._mc_cache.clear()
+            return self.bar
+
+    def refresh(self) -> RiskSnapshot:
+        """Compute risk for every ledger user against the current bar's covariance."""
+        start = time.perf_counter()
+        with self._lock:
+            bar, cov = self.bar, self.cov.copy()
+            marks = self.last_marks.copy()
+        ledger = self.ledger
+        n, s = ledger.n_users, min(ledger.n_symbols, len(marks))
+        cov = cov[:s, :s].astype(ledger.dtype)
+        marks = marks[:s].astype(ledger.dtype)
+
+        sigma = np.zeros(n, dtype=np.float64)
+        gross = np.zeros(n, dtype=np.float64)
+        net = np.zeros(n, dtype=np.float64)
+        counts = np.zeros(n, dtype=np.int64)
+        cols, exposure, marginal = [], [], []
+        for lo in range(0, n, self.chunk_rows):
+            hi = min(n, lo + self.chunk_rows)
+            with ledger.lock:
+                x = ledger.positions[lo:hi, :s] * marks
+            xc = x @ cov
+            var = np.einsum("ij,ij->i", xc, x, dtype=np.float64)
+            sigma[lo:hi] = np.sqrt(np.maximum(var, 0.0))
+            gross[lo:hi] = np.abs(x).sum(axis=1, dtype=np.float64)
+            net[lo:hi] = x.sum(axis=1, dtype=np.float64)
+            rows, held = np.nonzero(x)
+            counts[lo:hi] = np.bincount(rows, minlength=hi - lo)
+            scale = np.divide(1.0, sigma[lo:hi], out=np.zeros(hi - lo), where=sigma[lo:hi] > 0)
+            cols.append(held)
+            exposure.append(x[rows, held].astype(np.float64))
+            marginal.append(xc[rows, held] * scale[rows])
+
+        snapshot = RiskSnapshot(
+            bar=bar,
+            computed_at=time.time(),
+            n_users=n,
+            symbols=list(ledger.symbols[:s]),
+            sigma=sigma,
+            var=self._var_scale * sigma,
+            cvar=self._cvar_scale * sigma,
+            gross=gross,
+            net=net,
+            indptr=np.r_[0, np.cumsum(counts)],
+            cols=np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64),
+            exposure=np.concatenate(exposure) if exposure else np.zeros(0),
+            marginal=np.concatenate(marginal) if marginal else np.zeros(0),
+        )
+        self.snapshot = snapshot
+        metrics.RISK_REFRESH_SECONDS.observe(time.perf_counter() - start)
+        return snapshot
+
+    def close_bar(self) -> RiskSnapshot:
+        """Close a bar at the ledger's current marks and refresh every account's risk."""
+        self.on_bar()
+        return self.refresh()
+
+    async def run_bars(self, bar_seconds: float | None = None) -> None:
+        """Close a bar every ``bar_seconds`` (default ``RISK_BAR_SECONDS``) until cancelled."""
+        interval = settings.RISK_BAR_SECONDS if bar_seconds is None else bar_seconds
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.close_bar)
+
+    def user_risk(self, user_id: int) -> dict | None:
+        """Cached risk for ``user_id`` as of the last ``refresh``; None before the first one."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        row = self.ledger.user_index.get(user_id)
+        result = {
+            "bar": snapshot.bar,
+            "computed_at": snapshot.computed_at,
+            "confidence": self.confidence,
+            "volatility": 0.0,
+            "var": 0.0,
+            "cvar": 0.0,
+            "gross_exposure": 0.0,
+            "net_exposure": 0.0,
+            "contributions": [],
+        }
+        if row is None or row >= snapshot.n_users:
+            return result
+        lo, hi = snapshot.indptr[row], snapshot.indptr[row + 1]
+        result.update(
+            volatility=float(snapshot.sigma[row]),
+            var=float(snapshot.var[row]),
+            cvar=float(snapshot.cvar[row]),
+            gross_exposure=float(snapshot.gross[row]),
+            net_exposure=float(snapshot.net[row]),
+            contributions=[
+                {
+                    "symbol": snapshot.symbols[col],
+                    "exposure": float(x),
+                    "marginal": float(m),
+                    "contribution": float(x * m),
+                }
+                for col, x, m in zip(snapshot.cols[lo:hi], snapshot.exposure[lo:hi], snapshot.marginal[lo:hi])
+            ],
+        )
+        return result
+
+    def cholesky(self) -> np.ndarray:
+        """Lower factor ``L`` with ``L @ L.T ~= cov`` for the current bar (negative eigenvalues clipped)."""
+        with self._lock:
+            if self._cholesky is not None and self._cholesky[0] == self.bar:
+                return self._cholesky[1]
+            bar, cov = self.bar, self.cov.copy()
+        s = len(cov)
+        jitter = 1e-12 * (np.trace(cov) / s if s else 0.0) + 1e-18
+        try:
+            factor = np.linalg.cholesky(cov + jitter * np.eye(s))
+        except np.linalg.LinAlgError:
+            values, vectors = np.linalg.eigh(cov)
+            factor = vectors * np.sqrt(np.clip(values, 0.0, None))
+        with self._lock:
+            self._cholesky = (bar, factor)
+        return factor
+
+    def monte_carlo(
+        self, user_ids: Sequence[int], paths: int | None = None, horizon: int = 1, seed: int | None = None
+    ) -> dict[int, dict]:
+        """Simulated ``horizon``-bar VaR/CVaR for ``user_ids`` from one shared set of return paths."""
+        paths = paths or settings.RISK_MC_PATHS
+        snapshot = self.snapshot
+        if snapshot is None:
+            return {}
+        key_bar = snapshot.bar
+        results: dict[int, dict] = {}
+        for user_id in user_ids:
+            cached = self._mc_cache.get((user_id, key_bar, paths, horizon))
+            if cached is not None:
+                results[user_id] = cached
+        todo = [u for u in user_ids if u not in results]
+        if not todo:
+            return results
+
+        s = len(snapshot.symbols)
+        x = np.zeros((len(todo), s), dtype=np.float64)
+        for i, user_id in enumerate(todo):
+            row = self.ledger.user_index.get(user_id)
+            if row is not None and row < snapshot.n_users:
+                lo, hi = snapshot.indptr[row], snapshot.indptr[row + 1]
+                x[i, snapshot.cols[lo:hi]] = snapshot.exposure[lo:hi]
+        factor = self.cholesky()[:s, :s]
+        rng = np.random.default_rng(seed)
+        # Simple (not log) scenario returns over the horizon; pnl is (users, paths).
+        scenarios = np.expm1(rng.standard_normal((paths, s)) @ factor.T * np.sqrt(horizon))
+        pnl = x @ scenarios.T
+        var = 0.0 - np.quantile(pnl, 1 - self.confidence, axis=1)
+        tail = pnl <= -var[:, None]
+        cvar = 0.0 - np.divide((pnl * tail).sum(axis=1), tail.sum(axis=1), out=np.zeros(len(todo)), where=tail.any(axis=1))
+        for i, user_id in enumerate(todo):
+            result = {
+                "bar": key_bar,
+                "paths": paths,
+                "horizon": horizon,
+                "confidence": self.confidence,
+                "var": float(var[i]),
+                "cvar": float(cvar[i]),
+                "expected_pnl": float(pnl[i].mean()),
+            }
+            self._mc_cache[(user_id, key_bar, paths, horizon)] = result
+            results[user_id] = result
+        return results
+
+
+risk_service = RiskService()
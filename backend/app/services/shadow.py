@@ -0,0 +1,227 @@
+"""Shadow evaluation of candidate models on live feature vectors.
+
+``MLModelService.predict_batch`` hands every scored batch to ``ShadowEvaluator.offer``.
+When the plan has a shadow model, ``offer`` copies the feature rows and the active
+signals into a bounded queue with ``put_nowait`` and returns. It never waits: if
+the queue is full, the batch is dropped and counted in ``investia_shadow_dropped_total``.
+
+A background thread drains the queue. It coalesces up to ``SHADOW_BATCH_ROWS`` rows,
+or whatever arrives within ``SHADOW_BATCH_WINDOW_SECONDS``, and scores them with the
+shadow model as one matrix. Each batch is written as
+``SHADOW_DIR/<plan>/<shadow stem>/<timestamp>.npz`` with the features and both
+models' signals. ``load_shadow_results`` reads them back for offline comparison.
+
+Shadow models are scored in this process, even with ``MODEL_BACKEND=remote``.
+Registrations are per process. Set ``SHADOW_MODELS`` to configure every worker,
+because ``POST /models/shadow`` only reaches the worker that serves it.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class _ShadowItem:
+    plan: str
+    shadow_uri: str
+    active_uri: str
+    rows: list[dict[str, float]]
+    active: list[int]
+    timestamp: float
+
+
+@dataclass
+class _ShadowStats:
+    uri: str
+    rows: int = 0
+    agree: int = 0
+    active_positive: int = 0
+    shadow_positive: int = 0
+    batches: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        rows = self.rows or 1
+        return {
+            "uri": self.uri,
+            "rows": self.rows,
+            "batches": self.batches,
+            "errors": self.errors,
+            "agreement": self.agree / rows if self.rows else None,
+            "active_positive_rate": self.active_positive / rows if self.rows else None,
+            "shadow_positive_rate": self.shadow_positive / rows if self.rows else None,
+        }
+
+
+class ShadowEvaluator:
+    def __init__(
+        self,
+        service: Any,
+        *,
+        queue_size: int | None = None,
+        batch_rows: int | None = None,
+        batch_window_seconds: float | None = None,
+        output_dir: str | Path | None = None,
+    ) -> None:
+        self.service = service
+        self.models: dict[str, str] = dict(settings.SHADOW_MODELS)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size or settings.SHADOW_QUEUE_SIZE)
+        self.batch_rows = batch_rows or settings.SHADOW_BATCH_ROWS
+        self.batch_window_seconds = (
+            settings.SHADOW_BATCH_WINDOW_SECONDS if batch_window_seconds is None else batch_window_seconds
+        )
+        self.output_dir = Path(output_dir or settings.SHADOW_DIR)
+        self.stats: dict[tuple[str, str], _ShadowStats] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def set_shadow(self, plan: str, uri: str) -> None:
+        self.models[plan] = uri
+
+    def remove_shadow(self, plan: str) -> str | None:
+        return self.models.pop(plan, None)
+
+    def offer(self, plan: str, active_uri: str | None, feature_rows: list[dict[str, float]], active: list[int]) -> bool:
+        """Queue a copy of a scored batch for the plan's shadow model; never blocks."""
+        shadow_uri = self.models.get(plan)
+        if shadow_uri is None or not feature_rows:
+            return False
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="investia-shadow", daemon=True)
+            self._thread.start()
+        item = _ShadowItem(
+            plan, shadow_uri, active_uri or "heuristic", [dict(row) for row in feature_rows], list(active), time.time()
+        )
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            metrics.SHADOW_DROPPED.inc(labels=(plan,))
+            return False
+        return True
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            stats = {f"{plan}:{Path(uri).name}": s.as_dict() for (plan, uri), s in self.stats.items()}
+        return {
+            "models": dict(self.models),
+            "queue_depth": self.queue.qsize(),
+            "dropped": {plan: metrics.SHADOW_DROPPED.value((plan,)) for plan in self.models},
+            "stats": stats,
+        }
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Score whatever is queued and stop the background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            batch, rows, stopping = [item], len(item.rows), False
+            deadline = time.monotonic() + self.batch_window_seconds
+            while rows < self.batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                rows += len(item.rows)
+            self.score_batch(batch)
+            if stopping:
+                return
+
+    def score_batch(self, batch: list[_ShadowItem]) -> None:
+        groups: dict[tuple[str, str], list[_ShadowItem]] = defaultdict(list)
+        for item in batch:
+            groups[(item.plan, item.shadow_uri)].append(item)
+
+        for (plan, shadow_uri), items in groups.items():
+            rows = [row for item in items for row in item.rows]
+            try:
+                feature_order, _ = self.service.model_layout(shadow_uri)
+                matrix = self.service._to_matrix(rows, feature_order)
+                shadow = np.asarray(self.service.predict_matrix(shadow_uri, matrix), dtype=np.int64)
+            except Exception:  # noqa: BLE001 - a broken candidate must not take the thread down
+                logger.exception("Shadow scoring failed for %s (%s)", plan, shadow_uri)
+                metrics.SHADOW_ERRORS.inc(labels=(plan,))
+                with self._lock:
+                    self.stats.setdefault((plan, shadow_uri), _ShadowStats(shadow_uri)).errors += 1
+                continue
+
+            active = np.array([signal for item in items for signal in item.active], dtype=np.int64)
+            sizes = [len(item.rows) for item in items]
+            timestamps = np.repeat([item.timestamp for item in items], sizes)
+            active_uris = np.repeat([item.active_uri for item in items], sizes)
+            self._record(plan, shadow_uri, feature_order or list(rows[0].keys()), matrix, active, shadow, timestamps, active_uris)
+
+            metrics.SHADOW_ROWS.inc(len(rows), labels=(plan,))
+            with self._lock:
+                stats = self.stats.setdefault((plan, shadow_uri), _ShadowStats(shadow_uri))
+                stats.rows += len(rows)
+                stats.agree += int(np.sum(active == shadow))
+                stats.active_positive += int(np.sum(active > 0))
+                stats.shadow_positive += int(np.sum(shadow > 0))
+                stats.batches += 1
+
+    def _record(self, plan, shadow_uri, feature_order, matrix, active, shadow, timestamps, active_uris) -> None:
+        directory = self.output_dir / plan / Path(shadow_uri).stem
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{time.strftime('%Y%m%dT%H%M%S')}-{time.monotonic_ns()}.npz"
+        np.savez(
+            path,
+            timestamp=timestamps,
+            features=matrix,
+            feature_order=np.array(feature_order),
+            active=active,
+            shadow=shadow,
+            active_uri=active_uris,
+        )
+
+
+def load_shadow_results(plan: str, shadow_uri: str, output_dir: str | Path | None = None) -> dict[str, np.ndarray]:
+    """Concatenate every recorded batch for ``shadow_uri`` on ``plan`` in time order."""
+    directory = Path(output_dir or settings.SHADOW_DIR) / plan / Path(shadow_uri).stem
+    parts: dict[str, list[np.ndarray]] = defaultdict(list)
+    feature_order: list[str] = []
+    for path in sorted(directory.glob("*.npz")):
+        with np.load(path) as batch:
+            feature_order = batch["feature_order"].tolist()
+            for key in ("timestamp", "features", "active", "shadow", "active_uri"):
+                parts[key].append(batch[key])
+    if not parts:
+        return {}
+    results = {key: np.concatenate(arrays) for key, arrays in parts.items()}
+    order = np.argsort(results["timestamp"], kind="stable")
+    results = {key: array[order] for key, array in results.items()}
+    results["feature_order"] = np.array(feature_order)
+    return results
@@ -1,29 +1,65 @@
-import json
+import asyncio
 import random
-from datetime import datetime
+import time
+from dataclasses import dataclass
 from uuid import uuid4
-from typing import Any, Dict
+from typing import Any, Dict, Sequence
 
+import numpy as np
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.clock import SystemClock
 from app.core.config import settings
 from app.models.trading import Trade
 from app.models.user import PlanEnum, User
 from app.services.data_ingestion_service import data_ingestion_service
+from app.services.ledger import LedgerNotOwnedError, PaperLedger, paper_ledger
+from app.services.ledger_server import ledger_client
 from app.services.ml_model_service import ml_model_service
+from app.services.prediction_log import prediction_log
+from app.services.realtime_features import REALTIME_FEATURE_ORDER, RealtimeFeatureStore, features_to_dict
+from app.services.write_behind import write_buffer
+
+
+@dataclass
+class UniverseTick:
+    """Features and signals for every symbol of the universe from one batched prediction."""
+
+    plan: str
+    symbols: list[str]
+    features: np.ndarray  # (len(symbols), n_features) in REALTIME_FEATURE_ORDER
+    signals: dict[str, int]
+    expires_at: float
+    model_uri: str | None = None  # artifact that produced ``signals``; None for the heuristic
+
+    def features_for(self, symbol: str) -> dict[str, float]:
+        return features_to_dict(self.features[self.symbols.index(symbol)])
 
 
 class TradingEngine:
-    """Generates plan-aware paper trades and persists them."""
+    """Generates plan-aware paper trades, books them on the paper ledger and persists them."""
 
     def __init__(self) -> None:
         self.symbols = ["AAPL", "SPY", "BTC-USD", "ETH-USD", "NVDA", "MSFT"]
         try:
             self.redis: Redis | None = Redis.from_url(settings.REDIS_URL)
+            # The circuit-broken feature path gets its own client so its short timeout
+            # does not apply to every other Redis call made through ``self.redis``.
+            feature_redis: Redis | None = Redis.from_url(
+                settings.REDIS_URL,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            )
         except Exception:
-            self.redis = None
+            self.redis = feature_redis = None
+        self.feature_store = RealtimeFeatureStore(feature_redis)
         self._last_prices: dict[str, float] = {}
+        self.clock = SystemClock()
+        self.ledger = paper_ledger
+        self.ledger_client = ledger_client
+        self._universe: dict[tuple[str, tuple[str, ...]], UniverseTick] = {}
+        self._universe_refreshing: dict[tuple[str, tuple[str, ...]], asyncio.Future] = {}
 
     def build_realtime_features(self, symbol: str) -> dict[str, float]:
         """Compose a feature dictionary aligned with model expectations."""
@@ -52,27 +88,119 @@ class TradingEngine:
 
     async def get_realtime_features(self, symbol: str) -> dict[str, float]:
         """Use Redis if available, otherwise synthesize."""
-        if self.redis:
+        matrix = await self.get_realtime_features_many([symbol])
+        return features_to_dict(matrix[0])
+
+    async def get_realtime_features_many(self, symbols: Sequence[str]) -> np.ndarray:
+        """Fetch features for several symbols as a ``(len(symbols), n_features)`` matrix.
+
+        Columns follow ``REALTIME_FEATURE_ORDER``. Symbols missing from Redis (or all of
+        them while the circuit breaker is open) are synthesized locally.
+        """
+        matrix, hits = await self.feature_store.fetch_many(symbols)
+        for idx in np.flatnonzero(~hits):
+            synthetic = self.build_realtime_features(symbols[idx])
+            matrix[idx] = [synthetic[name] for name in REALTIME_FEATURE_ORDER]
+        return matrix
+
+    async def universe_tick(self, plan: str, db: AsyncSession, symbols: Sequence[str] | None = None) -> UniverseTick:
+        """Score the whole universe for ``plan`` with one feature fetch and one batched prediction.
+
+        The result is shared by every caller for ``UNIVERSE_SIGNAL_TTL_SECONDS``, so
+        concurrent streams and the worker do not each invoke the model per symbol.
+        When it expires, the first caller refreshes it and the others await that
+        refresh instead of starting their own.
+        """
+        universe = list(symbols or self.symbols)
+        key = (plan, tuple(universe))
+        loop = asyncio.get_running_loop()
+        while True:
+            cached = self._universe.get(key)
+            if cached is not None and cached.expires_at > time.monotonic():
+                return cached
+            pending = self._universe_refreshing.get(key)
+            if pending is None or pending.get_loop() is not loop:
+                break
             try:
-                cached = await self.redis.get(f"features:{symbol}")
-                if cached:
-                    data = json.loads(cached)
-                    return {k: float(v) for k, v in data.items()}
-            except Exception:
-                pass
-        return self.build_realtime_features(symbol)
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The refreshing caller was cancelled; take over the refresh.
+
+        future = self._universe_refreshing[key] = loop.create_future()
+        try:
+            matrix = await self.get_realtime_features_many(universe)
+            signals, uri = await ml_model_service.predict_batch(plan, [features_to_dict(row) for row in matrix], db)
+            tick = UniverseTick(
+                plan,
+                universe,
+                matrix,
+                dict(zip(universe, (int(s) for s in signals))),
+                time.monotonic() + settings.UNIVERSE_SIGNAL_TTL_SECONDS,
+                uri,
+            )
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # waiters re-raise it; do not also log it as unretrieved
+            raise
+        finally:
+            if self._universe_refreshing.get(key) is future:
+                del self._universe_refreshing[key]
+        self._universe[key] = tick
+        future.set_result(tick)
+        return tick
+
+    async def generate_signals_for_universe(
+        self, plan: str, db: AsyncSession, symbols: Sequence[str] | None = None
+    ) -> dict[str, int]:
+        """Map each symbol of the universe to its signal for ``plan``."""
+        return (await self.universe_tick(plan, db, symbols)).signals
 
     async def generate_trade_event(
-        self, db: AsyncSession, *, user: User | None = None, symbol: str | None = None
+        self,
+        db: AsyncSession,
+        *,
+        user: User | None = None,
+        symbol: str | None = None,
+        features: dict[str, float] | None = None,
+        log_source: str | None = "trade_event",
     ) -> Dict[str, Any]:
         sym = symbol or random.choice(self.symbols)
-        features = await self.get_realtime_features(sym)
         plan_value = user.plan.value if user and isinstance(user.plan, PlanEnum) else PlanEnum.free.value
-        signal = await ml_model_service.predict_signal(plan_value, features, db)
+        if features is None and sym in self.symbols:
+            # Universe symbols come from the shared per-plan tick instead of a predict call each.
+            tick = await self.universe_tick(plan_value, db)
+            features, signal, model_uri = tick.features_for(sym), tick.signals[sym], tick.model_uri
+        else:
+            if features is None:
+                features = await self.get_realtime_features(sym)
+            signal, model_uri = await ml_model_service.predict_signal(plan_value, features, db)
+        if log_source:
+            prediction_log.log(
+                plan_value,
+                sym,
+                features,
+                signal,
+                model=model_uri,
+                user_id=user.id if user else None,
+                source=log_source,
+            )
         side = "buy" if signal == 1 else ("sell" if signal == -1 else "flat")
         quantity = round(random.uniform(0.1, 3.0), 2)
         price = round(features.get("price", random.uniform(50, 350)), 2)
-        pnl = round(quantity * price * random.uniform(-0.002, 0.004), 2)
+        pnl = 0.0
+        if user is not None and side != "flat":
+            signed = quantity if side == "buy" else -quantity
+            pnl = round(await self.book_fill(user.id, sym, signed, price), 2)
+        elif self.ledger_client is not None:
+            await self.ledger_client.mark(sym, price)
+        else:
+            ledger = self._local_ledger()
+            ledger.mark_to_market([ledger.symbol_col(sym)], [price])
         explanation = (
             f"{plan_value.capitalize()} model generated {side} on {sym} "
             f"using sentiment={features['sentiment_score']:.2f} and order-book={features['orderbook_depth']:.2f}."
@@ -85,16 +213,36 @@ class TradingEngine:
             "price": price,
             "pnl": pnl,
             "explanation": explanation,
-            "created_at": datetime.utcnow(),
+            "created_at": self.clock.now(),
         }
         return {"trade": trade_data, "features": features, "signal": signal, "event_id": str(uuid4())}
 
-    async def record_trade(self, db: AsyncSession, trade_data: dict) -> Trade:
-        trade = Trade(**trade_data)
-        db.add(trade)
-        await db.commit()
-        await db.refresh(trade)
-        return trade
+    async def book_fill(self, user_id: int, symbol: str, quantity: float, price: float) -> float:
+        """Book one fill on the ledger owner (this process or the ledger server); returns realized PnL."""
+        if self.ledger_client is not None:
+            return await self.ledger_client.apply_fill(user_id, symbol, quantity, price)
+        ledger = self._local_ledger()
+        realized = ledger.apply_fills([ledger.user_row(user_id)], [ledger.symbol_col(symbol)], [quantity], [price])
+        return float(realized[0])
+
+    def _local_ledger(self) -> PaperLedger:
+        """``self.ledger`` if this process may book on it; a private copy would diverge from the owner's."""
+        if not (self.ledger.owned or self.ledger.scratch):
+            raise LedgerNotOwnedError(
+                "this process does not own the paper ledger: call open_ledger() at startup, "
+                "or set LEDGER_BACKEND=remote and run app.services.ledger_server"
+            )
+        return self.ledger
+
+    async def record_trade(self, db: AsyncSession, trade_data: dict, durable: bool = False) -> Trade | None:
+        """Queue the trade on the write-behind buffer.
+
+        With ``durable`` the call returns only after the row is committed, and
+        returns the ``Trade`` with its id. Otherwise it returns None at once. The row
+        becomes visible to readers within ``WRITE_BEHIND_FLUSH_SECONDS``.
+        """
+        trade_id = await write_buffer.add(Trade, trade_data, durable=durable)
+        return Trade(id=trade_id, **trade_data) if durable else None
 
 
 trading_engine = TradingEngine()
@@ -0,0 +1,184 @@
+"""Write-behind buffer for append-only rows (trades, chat messages).
+
+``add`` appends a row dict and returns at once. Rows are written by whichever
+comes first:
+
+* the buffer reaches ``WRITE_BEHIND_BATCH_ROWS``;
+* ``WRITE_BEHIND_FLUSH_SECONDS`` passes after the first buffered row;
+* ``flush()`` or ``close()`` is called, e.g. at the end of a worker cycle or on
+  shutdown.
+
+Each flush issues one statement per table on its own session. That is a
+multi-row ``INSERT``, or ``COPY`` when the engine runs on asyncpg and no caller
+needs ids. With ``durable=True``, ``add`` triggers a flush and waits for it. That
+flush uses ``INSERT ... RETURNING`` and returns the row's generated id.
+
+If a flush fails, non-durable rows are put back for the next attempt until
+``WRITE_BEHIND_MAX_ROWS`` are pending. Beyond that they are dropped and counted
+in ``investia_write_behind_dropped_total``. An integrity error is the exception:
+the batch is retried one row at a time so a single bad row cannot block the rest,
+and only the rows that fail again are dropped.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        session_factory=None,
+        *,
+        batch_rows: int | None = None,
+        flush_seconds: float | None = None,
+        max_rows: int | None = None,
+        enabled: bool | None = None,
+    ) -> None:
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.batch_rows = batch_rows or settings.WRITE_BEHIND_BATCH_ROWS
+        self.flush_seconds = settings.WRITE_BEHIND_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self.max_rows = max_rows or settings.WRITE_BEHIND_MAX_ROWS
+        self.enabled = settings.WRITE_BEHIND_ENABLED if enabled is None else enabled
+        self._pending: dict[Any, list[tuple[dict, asyncio.Future | None]]] = defaultdict(list)
+        self._rows = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def pending_rows(self) -> int:
+        return self._rows
+
+    async def add(self, model: Any, row: dict, durable: bool = False) -> int | None:
+        """Buffer ``row`` for ``model``'s table; with ``durable`` wait for the write and return its id."""
+        loop = self._bind_loop()
+        durable = durable or not self.enabled
+        future = loop.create_future() if durable else None
+        self._pending[model].append((row, future))
+        self._rows += 1
+        metrics.WRITE_BEHIND_PENDING.set(self._rows)
+        if durable:
+            await self.flush()
+            return await future
+        if self._rows >= self.batch_rows:
+            self._flush_soon()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_seconds, self._flush_soon)
+        return None
+
+    async def flush(self) -> None:
+        self._bind_loop()
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch, self._pending, self._rows = self._pending, defaultdict(list), 0
+            for model, items in batch.items():
+                await self._flush_table(model, items)
+            metrics.WRITE_BEHIND_PENDING.set(self._rows)
+            if self._rows and self._timer is None:
+                # Rows that arrived during the write, or failed ones waiting for a retry.
+                self._timer = self._loop.call_later(self.flush_seconds, self._flush_soon)
+
+    async def close(self) -> None:
+        """Flush everything still buffered (called on shutdown)."""
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        if self._rows:
+            await self.flush()
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Locks and timers belong to one loop (workers may run a fresh loop per cycle).
+            self._loop, self._lock, self._timer = loop, asyncio.Lock(), None
+        return loop
+
+    def _flush_soon(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self.flush())
+
+    async def _flush_table(self, model: Any, items: list[tuple[dict, asyncio.Future | None]]) -> None:
+        table = model.__tablename__
+        rows = [row for row, _ in items]
+        returning = any(future is not None for _, future in items)
+        start = time.perf_counter()
+        try:
+            ids = await self._write(model, rows, returning)
+        except IntegrityError as exc:
+            if len(items) > 1:
+                # A single bad row would fail every retry of the batch, so isolate it.
+                for item in items:
+                    await self._flush_table(model, [item])
+                return
+            logger.warning("Dropping %s row rejected by the database: %s", table, exc.orig)
+            metrics.WRITE_BEHIND_DROPPED.inc(labels=(table,))
+            future = items[0][1]
+            if future is not None and not future.done():
+                future.set_exception(exc)
+            return
+        except Exception as exc:  # noqa: BLE001 - surfaced to durable callers, retried for the rest
+            logger.exception("Write-behind flush of %d %s rows failed", len(rows), table)
+            retry = [(row, None) for row, future in items if future is None]
+            for _, future in items:
+                if future is not None and not future.done():
+                    future.set_exception(exc)
+            room = max(0, self.max_rows - self._rows)
+            if len(retry) > room:
+                metrics.WRITE_BEHIND_DROPPED.inc(len(retry) - room, labels=(table,))
+                retry = retry[:room]
+            self._pending[model][:0] = retry
+            self._rows += len(retry)
+            return
+        finally:
+            metrics.WRITE_BEHIND_FLUSH_SECONDS.observe(time.perf_counter() - start, (table,))
+        metrics.WRITE_BEHIND_ROWS.inc(len(rows), labels=(table,))
+        if ids is not None:
+            for (_, future), row_id in zip(items, ids):
+                if future is not None and not future.done():
+                    future.set_result(row_id)
+
+    async def _write(self, model: Any, rows: list[dict], returning: bool) -> list[int] | None:
+        async with self.session_factory() as session:
+            if not returning and session.get_bind().dialect.driver == "asyncpg":
+                await self._copy(session, model, rows)
+                return None
+            if returning:
+                result = await session.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+                ids = list(result.scalars())
+            else:
+                await session.execute(insert(model), rows)
+                ids = None
+            await session.commit()
+            return ids
+
+    @staticmethod
+    async def _copy(session, model: Any, rows: list[dict]) -> None:
+        columns = list(rows[0])
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            model.__tablename__, records=[tuple(row.get(column) for column in columns) for row in rows], columns=columns
+        )
+        await session.commit()
+
+
+write_buffer = WriteBehindBuffer()
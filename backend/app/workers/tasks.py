@@ -4,23 +4,51 @@ from datetime import date
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import metrics
 from app.models.trading import Trade
 from app.models.user import User
 from app.services.portfolio_service import portfolio_service
+from app.services.risk_service import risk_service
 from app.services.trading_engine import trading_engine
+from app.services.write_behind import write_buffer
 
 
 async def generate_paper_trades_for_users(db: AsyncSession) -> None:
     """Simulate paper trades for each active user."""
+    with metrics.WORKER_CYCLE_SECONDS.time(("generate_paper_trades_for_users",)):
+        await _generate_paper_trades_for_users(db)
+
+
+async def _generate_paper_trades_for_users(db: AsyncSession) -> None:
     users = (await db.execute(select(User).where(User.is_active == True))).scalars().all()  # noqa: E712
     for user in users:
         event = await trading_engine.generate_trade_event(db, user=user)
         await trading_engine.record_trade(db, event["trade"])
         await asyncio.sleep(0)  # yield control
+    # recompute_daily_metrics reads these trades back, so do not leave them buffered.
+    await write_buffer.flush()
+    # Booking raises LedgerNotOwnedError unless this process owns the ledger, so workers running
+    # beside the API need LEDGER_BACKEND=remote. The snapshot is a no-op for a remote ledger.
+    await asyncio.to_thread(trading_engine.ledger.maybe_snapshot)
+
+
+async def update_portfolio_risk(db: AsyncSession) -> None:
+    """Close a bar at the current marks and refresh every account's cached risk.
+
+    Only for a process that books on its own ledger (benchmarks, one-off runs).
+    The ledger owner already closes a bar every ``RISK_BAR_SECONDS``.
+    """
+    with metrics.WORKER_CYCLE_SECONDS.time(("update_portfolio_risk",)):
+        await asyncio.to_thread(risk_service.close_bar)
 
 
 async def recompute_daily_metrics(db: AsyncSession) -> None:
     """Aggregate trades into DailyMetrics (simplified)."""
+    with metrics.WORKER_CYCLE_SECONDS.time(("recompute_daily_metrics",)):
+        await _recompute_daily_metrics(db)
+
+
+async def _recompute_daily_metrics(db: AsyncSession) -> None:
     users = (await db.execute(select(User).where(User.is_active == True))).scalars().all()  # noqa: E712
     for user in users:
         result = await db.execute(
@@ -0,0 +1,90 @@
+"""Per-symbol pandas features vs. the ``(time, symbols)`` kernels in ``ml.indicators``.
+
+For each universe size, builds ``--rows`` bars per symbol and times:
+
+* ``pandas``: ``utils.build_features_pro`` once per symbol (today's path);
+* ``matrix``: ``indicators.features_pro`` once over the whole ``(rows, symbols)`` matrix.
+
+It also reports the largest absolute difference per feature::
+
+    python benchmarks/indicators_bench.py --symbols 10 100 1000 --rows 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from benchmarks.standins import apply_standin_env  # noqa: E402
+
+apply_standin_env()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from ml import indicators, utils  # noqa: E402
+
+
+def synthetic_universe(rows: int, symbols: int, seed: int = 7) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (rows, symbols)), axis=0))
+    volume = rng.integers(800, 2000, (rows, symbols)).astype(np.float64)
+    sentiment = rng.uniform(-1, 1, (rows, symbols))
+    # Late listings: a tenth of the symbols start part-way through the history.
+    late = rng.choice(symbols, max(1, symbols // 10), replace=False)
+    close[: rows // 4, late] = np.nan
+    return close, volume, sentiment
+
+
+def run(rows: int, symbols: int, repeat: int, seed: int) -> dict:
+    close, volume, sentiment = synthetic_universe(rows, symbols, seed)
+    frames = [
+        pd.DataFrame({"close": close[:, j], "volume": volume[:, j], "sentiment": sentiment[:, j]}) for j in range(symbols)
+    ]
+
+    pandas_seconds, matrix_seconds = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        reference = [utils.build_features_pro(frame)[0] for frame in frames]
+        pandas_seconds.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        features = indicators.features_pro(close, volume, sentiment)
+        matrix_seconds.append(time.perf_counter() - start)
+
+    max_abs_diff = {}
+    for name in indicators.PRO_COLUMNS:
+        expected = np.column_stack([frame[name].to_numpy(dtype=np.float64) for frame in reference])
+        max_abs_diff[name] = float(np.nanmax(np.abs(expected - features[name]), initial=0.0))
+
+    return {
+        "rows": rows,
+        "symbols": symbols,
+        "pandas_seconds": round(min(pandas_seconds), 4),
+        "matrix_seconds": round(min(matrix_seconds), 4),
+        "speedup": round(min(pandas_seconds) / min(matrix_seconds), 1),
+        "max_abs_diff": max_abs_diff,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--rows", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore", category=FutureWarning)  # fillna(method="bfill") in utils
+    print(json.dumps([run(args.rows, n, args.repeat, args.seed) for n in args.symbols], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Throughput of the array-backed paper ledger at full scale.
+
+Builds a ``PaperLedger`` with ``--users`` x ``--symbols`` positions, then times:
+
+* booking a batch of random fills (``apply_fills``);
+* one mark-to-market tick for 1, 10 and every symbol (``mark_to_market``);
+* a full ``revalue`` and a snapshot to disk::
+
+    python benchmarks/ledger_bench.py --users 100000 --symbols 1000
+    python benchmarks/ledger_bench.py --dtype float64 --fills 1000000
+
+Two ``(users, symbols)`` arrays are allocated; at 10^5 x 10^3 that is 400 MB each
+in float32 and 800 MB in float64.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from benchmarks.standins import apply_standin_env  # noqa: E402
+
+apply_standin_env()
+
+import numpy as np  # noqa: E402
+
+from app.services.ledger import PaperLedger  # noqa: E402
+
+
+def _best(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(users: int, symbols: int, fills: int, dtype: str, repeat: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    ledger = PaperLedger(
+        [f"SYM{i}" for i in range(symbols)], user_capacity=users, symbol_capacity=symbols, dtype=np.dtype(dtype)
+    )
+    start = time.perf_counter()
+    ledger.add_users(range(users))
+    setup_seconds = time.perf_counter() - start
+    ledger.mark_to_market(np.arange(symbols), rng.uniform(50, 350, symbols))
+
+    rows = rng.integers(0, users, fills)
+    cols = rng.integers(0, symbols, fills)
+    quantities = np.round(rng.uniform(-3, 3, fills), 2)
+    prices = ledger.marks[cols] * (1 + rng.uniform(-0.01, 0.01, fills))
+    start = time.perf_counter()
+    ledger.apply_fills(rows, cols, quantities, prices)
+    fill_seconds = time.perf_counter() - start
+
+    ticks = {}
+    for width in sorted({1, min(10, symbols), symbols}):
+        tick_cols = rng.choice(symbols, width, replace=False)
+
+        def tick(tick_cols=tick_cols):
+            ledger.mark_to_market(tick_cols, ledger.marks[tick_cols] * (1 + rng.uniform(-0.001, 0.001, len(tick_cols))))
+
+        ticks[str(width)] = round(_best(tick, repeat) * 1e3, 3)
+
+    incremental = ledger.market_value[:users].copy()
+    revalue_seconds = _best(ledger.revalue, repeat)
+    drift = float(np.max(np.abs(incremental - ledger.market_value[:users])))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "ledger.npz"
+        snapshot_seconds = _best(lambda: ledger.snapshot(path), 1)
+        snapshot_mb = path.stat().st_size / 2**20
+        start = time.perf_counter()
+        PaperLedger.restore(path)
+        restore_seconds = time.perf_counter() - start
+
+    return {
+        "users": users,
+        "symbols": symbols,
+        "dtype": dtype,
+        "add_users_seconds": round(setup_seconds, 3),
+        "fills": fills,
+        "fill_seconds": round(fill_seconds, 4),
+        "fills_per_second": round(fills / fill_seconds),
+        "mark_to_market_ms": ticks,
+        "revalue_ms": round(revalue_seconds * 1e3, 2),
+        "incremental_drift": drift,
+        "snapshot_seconds": round(snapshot_seconds, 3),
+        "snapshot_mb": round(snapshot_mb, 1),
+        "restore_seconds": round(restore_seconds, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--symbols", type=int, default=1_000)
+    parser.add_argument("--fills", type=int, default=100_000)
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float64"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args.users, args.symbols, args.fills, args.dtype, args.repeat, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
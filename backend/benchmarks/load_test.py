@@ -0,0 +1,306 @@
+"""End-to-end load test of the API against local stand-ins.
+
+Starts ``app.api.main:app`` under uvicorn inside this process, backed by SQLite
+(aiosqlite) unless DATABASE_URL is exported, fakeredis unless ``--real-redis`` is
+given, and in-process mocks of the OpenAI and Mercado Pago HTTP APIs. Each
+scenario is driven at the requested concurrency and reported as JSON with
+p50/p95/p99 latency, throughput and DB queries per request, e.g.::
+
+    python benchmarks/load_test.py --requests 500 --concurrency 32 --output bench.json
+
+Stand-in dependencies are listed in ``benchmarks/requirements.txt``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import platform
+import subprocess
+import sys
+import time
+import types
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from benchmarks.standins import apply_standin_env  # noqa: E402
+
+apply_standin_env()
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.api.main import app  # noqa: E402
+from app.core.database import AsyncSessionLocal, Base, engine  # noqa: E402
+from app.services import chat_service as chat_service_module  # noqa: E402
+from app.services.trading_engine import trading_engine  # noqa: E402
+from app.api.routes import billing as billing_module  # noqa: E402
+from app.workers.tasks import generate_paper_trades_for_users, recompute_daily_metrics, update_portfolio_risk  # noqa: E402
+from ml.model_registry import register_model_version  # noqa: E402
+from ml.utils import MODEL_DIR  # noqa: E402
+
+API = "/api/v1"
+
+
+class QueryCounter:
+    """Counts SQL statements issued through the shared async engine."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs) -> None:
+        self.count += 1
+
+    def reset(self) -> int:
+        count, self.count = self.count, 0
+        return count
+
+
+def _install_http_mocks(llm_latency: float, payment_latency: float) -> None:
+    """Route the services' outbound httpx calls to in-process mock servers."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "api.openai.com":
+            await asyncio.sleep(llm_latency)
+            return httpx.Response(200, json={"choices": [{"message": {"content": "Mock explanation."}}]})
+        if request.url.host == "api.mercadopago.com":
+            await asyncio.sleep(payment_latency)
+            if request.url.path.startswith("/checkout/preferences"):
+                return httpx.Response(201, json={"id": "pref-mock", "init_point": "https://mock.local/checkout"})
+            return httpx.Response(200, json={"status": "approved", "metadata": {}})
+        return httpx.Response(404)
+
+    mocked = types.SimpleNamespace(
+        AsyncClient=functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler)),
+    )
+    chat_service_module.httpx = mocked
+    billing_module.httpx = mocked
+
+
+async def _install_redis(real_redis: bool) -> None:
+    if not real_redis:
+        import fakeredis
+
+        fake = fakeredis.aioredis.FakeRedis()
+        trading_engine.redis = fake
+        trading_engine.feature_store.redis = fake
+    await trading_engine.feature_store.publish_many(
+        {symbol: trading_engine.build_realtime_features(symbol) for symbol in trading_engine.symbols}
+    )
+
+
+async def _seed_models() -> None:
+    prefixes = {"free": "free_signal_model_", "pro": "pro_signal_model_", "enterprise": "enterprise_model_"}
+    async with AsyncSessionLocal() as session:
+        for plan, prefix in prefixes.items():
+            candidates = sorted(p for p in MODEL_DIR.glob(f"{prefix}*") if "incremental" not in p.name and "online" not in p.name)
+            if candidates:
+                await register_model_version(plan, str(candidates[-1]), 0.0, 0.0, session)
+
+
+async def _register_users(client: httpx.AsyncClient, count: int) -> list[str]:
+    tokens = []
+    run_id = int(time.time() * 1000)
+    for idx in range(count):
+        resp = await client.post(
+            f"{API}/auth/register", json={"email": f"load{run_id}_{idx}@example.com", "password": "load-test-pw"}
+        )
+        resp.raise_for_status()
+        tokens.append(resp.json()["access_token"])
+    return tokens
+
+
+def _summarize(latencies: list[float], errors: int, wall_seconds: float, queries: int) -> dict:
+    arr = np.asarray(latencies) * 1000.0
+    count = len(latencies)
+    return {
+        "count": count,
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(arr, 50)), 3) if count else None,
+        "p95_ms": round(float(np.percentile(arr, 95)), 3) if count else None,
+        "p99_ms": round(float(np.percentile(arr, 99)), 3) if count else None,
+        "mean_ms": round(float(arr.mean()), 3) if count else None,
+        "throughput_rps": round(count / wall_seconds, 2) if wall_seconds else None,
+        "db_queries": queries,
+        "db_queries_per_request": round(queries / count, 2) if count else None,
+    }
+
+
+async def _run_concurrent(total: int, concurrency: int, call: Callable[[int], Awaitable[bool]]) -> tuple[list[float], int, float]:
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal errors
+        for idx in counter:
+            start = time.perf_counter()
+            ok = await call(idx)
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def _http_scenario(client: httpx.AsyncClient, tokens: list[str], method: str, path: str, **kwargs):
+    async def call(idx: int) -> bool:
+        headers = {"Authorization": f"Bearer {tokens[idx % len(tokens)]}"}
+        try:
+            resp = await client.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError:
+            return False
+        return resp.status_code < 400
+
+    return call
+
+
+async def _ws_scenario(base_ws: str, tokens: list[str], total: int, concurrency: int) -> tuple[list[float], int, float]:
+    latencies: list[float] = []
+    errors = 0
+    per_conn = max(1, total // concurrency)
+
+    async def connection(idx: int) -> None:
+        nonlocal errors
+        try:
+            async with websockets.connect(f"{base_ws}/ws/paper-stream?token={tokens[idx % len(tokens)]}") as ws:
+                last = time.perf_counter()
+                for _ in range(per_conn):
+                    await ws.recv()
+                    now = time.perf_counter()
+                    latencies.append(now - last)
+                    last = now
+        except Exception:
+            errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connection(i) for i in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def _worker_scenario(cycles: int, task) -> tuple[list[float], int, float]:
+    latencies: list[float] = []
+    start = time.perf_counter()
+    for _ in range(cycles):
+        async with AsyncSessionLocal() as session:
+            cycle_start = time.perf_counter()
+            await task(session)
+            latencies.append(time.perf_counter() - cycle_start)
+    return latencies, 0, time.perf_counter() - start
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+async def run_load_test(args) -> dict:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    _install_http_mocks(args.llm_latency, args.payment_latency)
+    await _install_redis(args.real_redis)
+    await _seed_models()
+    queries = QueryCounter()
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning", lifespan="on"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results: dict[str, dict] = {}
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            tokens = await _register_users(client, args.users)
+            scenarios = {
+                "GET /trading/signal": _http_scenario(client, tokens, "GET", f"{API}/trading/signal", params={"symbol": "BTC-USD"}),
+                "GET /dashboard/summary": _http_scenario(client, tokens, "GET", f"{API}/dashboard/summary"),
+                "POST /chat/ask": _http_scenario(client, tokens, "POST", f"{API}/chat/ask", json={"question": "Why?"}),
+                "POST /billing/create-checkout": _http_scenario(
+                    client, tokens, "POST", f"{API}/billing/create-checkout", json={"plan": "pro"}
+                ),
+            }
+            for name, call in scenarios.items():
+                if args.only and name not in args.only:
+                    continue
+                queries.reset()
+                latencies, errors, wall = await _run_concurrent(args.requests, args.concurrency, call)
+                results[name] = _summarize(latencies, errors, wall, queries.reset())
+
+        if not args.only or "WS /ws/paper-stream" in args.only:
+            queries.reset()
+            latencies, errors, wall = await _ws_scenario(f"ws://127.0.0.1:{args.port}", tokens, args.requests, args.concurrency)
+            results["WS /ws/paper-stream"] = _summarize(latencies, errors, wall, queries.reset())
+
+        for name, task in (
+            ("worker generate_paper_trades_for_users", generate_paper_trades_for_users),
+            ("worker recompute_daily_metrics", recompute_daily_metrics),
+            ("worker update_portfolio_risk", update_portfolio_risk),
+        ):
+            if args.only and name not in args.only:
+                continue
+            queries.reset()
+            latencies, errors, wall = await _worker_scenario(args.worker_cycles, task)
+            results[name] = _summarize(latencies, errors, wall, queries.reset())
+    finally:
+        server.should_exit = True
+        await server_task
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "database": engine.url.get_backend_name(),
+            "redis": "real" if args.real_redis else "fakeredis",
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+        },
+        "endpoints": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests (or websocket messages) per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--worker-cycles", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the mock LLM waits per call")
+    parser.add_argument("--payment-latency", type=float, default=0.0, help="seconds the mock payment API waits per call")
+    parser.add_argument("--real-redis", action="store_true", help="use REDIS_URL instead of fakeredis")
+    parser.add_argument("--only", nargs="*", help="restrict to scenario names as they appear in the report")
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args))
+    payload = json.dumps(report, indent=2, default=str)
+    if args.output:
+        args.output.write_text(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Micro-benchmarks with regression gates for the ml.utils hot paths.
+
+Each benchmark runs over synthetic price histories of increasing length and
+records wall time (median of ``--repeat``) and peak traced memory. Every timed
+repeat is paired with a run of a fixed calibration workload (numpy, pandas and
+plain Python), and the gate compares the median ratio of the two. A slower or
+busier machine scales both, so a baseline saved on one host still applies on
+another. Cases whose baseline is under ``--min-seconds`` are too short to gate
+on time. ``peak_mb`` comes from tracemalloc, which does not see torch's
+allocator, so torch cases report no memory.
+
+Results are compared to a stored baseline; the run exits non-zero when any case
+is slower (or heavier) than the baseline by more than the configured threshold,
+and with status 2 when there is no baseline to compare against. The committed
+baseline is ``benchmarks/baselines/micro.json``::
+
+    python benchmarks/micro.py --sizes 1e3 1e4 1e5              # compare
+    python benchmarks/micro.py --sizes 1e3 1e4 1e5 --save-baseline
+    python benchmarks/micro.py --sizes 1e6 1e7 --no-caps         # full sweep
+
+Some functions are capped by default at sizes where a single run would take
+minutes or several GB (see ``ROW_CAPS``); ``--no-caps`` lifts them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+from typing import Callable
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from benchmarks.standins import apply_standin_env  # noqa: E402
+
+apply_standin_env()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from app.services.ml_model_service import MLModelService  # noqa: E402
+from ml import utils  # noqa: E402
+
+DEFAULT_BASELINE = CURRENT_DIR / "baselines" / "micro.json"
+SEQ_LEN = 20
+
+# Largest history each benchmark runs at unless --no-caps is given.
+ROW_CAPS = {
+    "make_sequence_data": 1_000_000,
+    "train_lstm": 100_000,
+    "predict_signal": 1_000,
+}
+# Cases that allocate through torch, whose memory tracemalloc cannot see.
+UNTRACED_MEMORY = {"train_lstm"}
+
+
+def synthetic_history(rows: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, rows)
+    close = 100 * np.exp(np.cumsum(returns))
+    return pd.DataFrame(
+        {
+            "date": pd.date_range("2000-01-01", periods=rows, freq="min"),
+            "close": close,
+            "volume": rng.integers(800, 2000, rows),
+            "sentiment": rng.uniform(-1, 1, rows),
+        }
+    )
+
+
+class _StaticUriService(MLModelService):
+    """MLModelService that skips the registry and always serves one artifact."""
+
+    def __init__(self, uri: str) -> None:
+        super().__init__()
+        self._uri = uri
+
+    async def get_model_uri_for_plan(self, plan: str, db) -> str | None:
+        return self._uri
+
+
+def _predict_signal_case(rows: int, workdir: Path) -> Callable[[], None]:
+    from sklearn.ensemble import RandomForestClassifier
+
+    features, target = utils.build_features_free(synthetic_history(2_000))
+    model = RandomForestClassifier(n_estimators=150, max_depth=6, random_state=42).fit(features, target)
+    path = utils.save_model(model, workdir / "bench_free_model.pkl", list(features.columns))
+    service = _StaticUriService(str(path))
+    service.load_model(str(path))
+    feature_rows = features.tail(min(rows, len(features))).to_dict("records")
+
+    async def _run() -> None:
+        for idx in range(rows):
+            await service.predict_signal("free", feature_rows[idx % len(feature_rows)], db=None)
+
+    return lambda: asyncio.run(_run())
+
+
+def build_cases(rows: int, workdir: Path) -> dict[str, Callable[[], Callable[[], None]]]:
+    """Map benchmark name to a setup callable returning the timed closure."""
+
+    def history():
+        return synthetic_history(rows)
+
+    def pro_features():
+        return utils.build_features_pro(history())
+
+    def sequences():
+        features, target = pro_features()
+        return utils.make_sequence_data(features.fillna(0), seq_len=SEQ_LEN), target.iloc[SEQ_LEN:].to_numpy()
+
+    def strategy_inputs():
+        rng = np.random.default_rng(3)
+        return rng.normal(0, 0.01, rows), rng.integers(0, 2, rows)
+
+    return {
+        "compute_rsi": lambda: (lambda close=history()["close"]: utils.compute_rsi(close, 14)),
+        "build_features_free": lambda: (lambda df=history(): utils.build_features_free(df)),
+        "build_features_pro": lambda: (lambda df=history(): utils.build_features_pro(df)),
+        "make_sequence_data": lambda: (
+            lambda X=pro_features()[0].fillna(0): utils.make_sequence_data(X, seq_len=SEQ_LEN)
+        ),
+        "compute_strategy_metrics": lambda: (
+            lambda inputs=strategy_inputs(): utils.compute_strategy_metrics(*inputs)
+        ),
+        "train_lstm": lambda: (
+            lambda data=sequences(): utils.train_lstm(data[0], data[1], [], epochs=1)
+        ),
+        "predict_signal": lambda: _predict_signal_case(rows, workdir),
+    }
+
+
+def _calibration_workload() -> None:
+    rng = np.random.default_rng(0)
+    values = rng.random(200_000)
+    np.sort(values)
+    pd.Series(values).rolling(20).mean()
+    total = 0.0
+    for value in values[:50_000].tolist():
+        total += value * value
+
+
+def _timed(fn: Callable[[], None]) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def measure(fn: Callable[[], None], repeat: int, trace_memory: bool = True) -> dict:
+    # The first run doubles as warm-up so lazy imports and allocator growth stay out of the timings
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    fn()
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    timings, ratios = [], []
+    for _ in range(repeat):
+        calibration = _timed(_calibration_workload)
+        timings.append(_timed(fn))
+        ratios.append(timings[-1] / calibration)
+    result = {"seconds": statistics.median(timings), "calibrated": statistics.median(ratios)}
+    if trace_memory:
+        result["peak_mb"] = peak / 2**20
+    return result
+
+
+def run_suite(sizes: list[int], only: list[str] | None, repeat: int, caps: bool) -> dict[str, dict[str, dict]]:
+    results: dict[str, dict[str, dict]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            for name, setup in build_cases(rows, Path(tmp)).items():
+                if only and name not in only:
+                    continue
+                if caps and rows > ROW_CAPS.get(name, rows):
+                    continue
+                result = measure(setup(), repeat, trace_memory=name not in UNTRACED_MEMORY)
+                results.setdefault(name, {})[str(rows)] = result
+                memory = f"{result['peak_mb']:>10.2f} MB" if "peak_mb" in result else f"{'-':>13}"
+                print(
+                    f"{name:<26} rows={rows:<10} {result['seconds'] * 1000:>12.3f} ms"
+                    f" {result['calibrated']:>10.3f}x cal {memory}"
+                )
+    return results
+
+
+def compare(
+    results: dict, baseline: dict, time_threshold: float, memory_threshold: float, min_seconds: float = 0.0
+) -> list[str]:
+    regressions = []
+    for name, by_size in results.items():
+        for rows, current in by_size.items():
+            reference = baseline.get(name, {}).get(rows)
+            if not reference:
+                continue
+            if "calibrated" in reference and reference["seconds"] >= min_seconds:
+                time_ratio = current["calibrated"] / max(reference["calibrated"], 1e-9)
+                if time_ratio > 1 + time_threshold:
+                    regressions.append(f"{name}[{rows}] calibrated time {time_ratio:.2f}x baseline")
+            if "peak_mb" in reference and "peak_mb" in current:
+                memory_ratio = current["peak_mb"] / max(reference["peak_mb"], 1e-6)
+                if memory_ratio > 1 + memory_threshold:
+                    regressions.append(f"{name}[{rows}] peak memory {memory_ratio:.2f}x baseline")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ml.utils micro-benchmarks")
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1e3, 1e4, 1e5])
+    parser.add_argument("--only", nargs="*", help="benchmark names to run")
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per case; the median is compared")
+    parser.add_argument("--no-caps", action="store_true", help="run every benchmark at every size")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="merge this run into the baseline file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="allowed relative peak-memory growth")
+    parser.add_argument(
+        "--min-seconds", type=float, default=0.002, help="do not gate time for cases whose baseline is faster than this"
+    )
+    parser.add_argument("--output", type=Path, help="write this run's results as JSON")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore", category=UserWarning)
+    warnings.filterwarnings("ignore", category=FutureWarning)
+
+    sizes = [int(size) for size in args.sizes]
+    results = run_suite(sizes, args.only, args.repeat, caps=not args.no_caps)
+    report = {"meta": {"python": platform.python_version(), "machine": platform.machine()}, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"results": {}}
+    if args.save_baseline:
+        for name, by_size in results.items():
+            baseline["results"].setdefault(name, {}).update(by_size)
+            if name in UNTRACED_MEMORY:
+                for stored in baseline["results"][name].values():
+                    stored.pop("peak_mb", None)
+        baseline["meta"] = report["meta"]
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+        print("Baseline updated at", args.baseline)
+        return 0
+
+    if not baseline["results"]:
+        # A missing baseline must not pass as "no regressions".
+        print("No baseline at", args.baseline, "- run with --save-baseline to create one")
+        return 2
+    regressions = compare(results, baseline["results"], args.threshold, args.memory_threshold, args.min_seconds)
+    for line in regressions:
+        print("REGRESSION", line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
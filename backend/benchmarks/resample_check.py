@@ -0,0 +1,102 @@
+"""Incremental resampling against one full backfill, read back through ``utils.load_ohlcv``.
+
+Writes ``--hours`` of synthetic 1m bars for a symbol in a temporary data
+directory. It then derives the default intervals the way a live feed does,
+appending ``--step`` minutes of source rows and catching up after each append,
+and again with a single backfill. Each derived csv is reloaded with
+``utils.load_ohlcv`` and must match the single backfill bar for bar. Exits 1 on
+any difference or load error::
+
+    python benchmarks/resample_check.py --hours 72 --step 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from ml import resample, utils  # noqa: E402
+
+SYMBOL = "CHECK-USD"
+
+
+def synthetic_minutes(hours: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    # Start mid-evening so catch-ups straddle midnight, where every closed bar is a bare date.
+    dates = pd.date_range("2020-01-01 20:00", periods=hours * 60, freq="min")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, len(dates))))
+    spread = np.abs(rng.normal(0, 0.0005, len(dates))) * close
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "open": np.r_[close[0], close[:-1]],
+            "high": close + spread,
+            "low": close - spread,
+            "close": close,
+            "volume": rng.integers(1, 100, len(dates)).astype(np.float64),
+        }
+    )
+
+
+def run(hours: int, step: int) -> dict:
+    minutes = synthetic_minutes(hours)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        utils.DATA_DIR, resample.RESAMPLED_DIR = data_dir, data_dir / "resampled"
+        source = utils.ohlcv_path(SYMBOL, resample.BASE_INTERVAL)
+        minutes.iloc[:step].to_csv(source, index=False)
+        start = time.perf_counter()
+        for lo in range(step, len(minutes), step):
+            resample.ensure_interval(SYMBOL, resample.DEFAULT_INTERVALS[0])
+            minutes.iloc[lo : lo + step].to_csv(source, mode="a", header=False, index=False)
+        catch_up_seconds = time.perf_counter() - start
+
+        full_dir = data_dir / "full"
+        start = time.perf_counter()
+        resample.backfill(SYMBOL, source=source, directory=full_dir)
+        full_seconds = time.perf_counter() - start
+
+        mismatches = {}
+        for interval in resample.DEFAULT_INTERVALS:
+            try:
+                incremental = utils.load_ohlcv(SYMBOL, interval)
+            except ValueError as exc:
+                mismatches[interval] = f"load failed: {exc}"
+                continue
+            expected = pd.read_csv(resample.resampled_path(SYMBOL, interval, full_dir), parse_dates=["date"])
+            if not incremental.equals(expected):
+                mismatches[interval] = f"{len(incremental)} rows vs {len(expected)} from a full backfill"
+
+    return {
+        "source_rows": len(minutes),
+        "catch_ups": -(-len(minutes) // step) - 1,
+        "catch_up_seconds": round(catch_up_seconds, 3),
+        "full_seconds": round(full_seconds, 3),
+        "mismatches": mismatches,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=int, default=72)
+    parser.add_argument("--step", type=int, default=60, help="1m rows appended between catch-ups")
+    args = parser.parse_args()
+    result = run(args.hours, args.step)
+    print(json.dumps(result, indent=2))
+    return 1 if result["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
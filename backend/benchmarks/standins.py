@@ -0,0 +1,25 @@
+"""Environment defaults that let benchmarks import the app without real services."""
+
+import os
+import tempfile
+from pathlib import Path
+
+STANDIN_ENV = {
+    "SECRET_KEY": "load-test-secret",
+    "DATABASE_URL": f"sqlite+aiosqlite:///{Path(tempfile.gettempdir()) / 'investia_load_test.db'}",
+    "REDIS_URL": "redis://127.0.0.1:6379/15",
+    "ENCRYPTION_SECRET_KEY": "load-test-encryption-key",
+    "OPENAI_API_KEY": "mock-openai-key",
+    "MERCADOPAGO_ACCESS_TOKEN": "mock-mp-token",
+    "MERCADOPAGO_PUBLIC_KEY": "mock-mp-public",
+    "MERCADOPAGO_WEBHOOK_TOKEN": "mock-mp-webhook",
+    "PAPER_STREAM_INTERVAL_SECONDS": "0",
+    # The in-process API claims this throwaway ledger at startup, so worker scenarios may book on it.
+    "LEDGER_SNAPSHOT_PATH": str(Path(tempfile.gettempdir()) / "investia_load_test_ledger.npz"),
+}
+
+
+def apply_standin_env() -> None:
+    """Fill in any settings the caller has not exported."""
+    for key, value in STANDIN_ENV.items():
+        os.environ.setdefault(key, value)
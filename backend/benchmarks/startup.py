@@ -0,0 +1,87 @@
+"""Measure API worker cold start: import time, RSS and which heavy ML modules get loaded.
+
+Each measurement runs in a fresh interpreter so nothing is cached between runs::
+
+    python benchmarks/startup.py --runs 5
+    python benchmarks/startup.py --module app.api.main --warm-plan pro
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from benchmarks.standins import apply_standin_env  # noqa: E402
+
+HEAVY_MODULES = ("torch", "xgboost", "sklearn", "pandas", "joblib")
+
+_PROBE = r"""
+import importlib, json, sys, time
+sys.path.insert(0, {backend!r})
+
+def rss_mb():
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+start = time.perf_counter()
+importlib.import_module({module!r})
+import_seconds = time.perf_counter() - start
+result = {{"import_seconds": import_seconds, "rss_mb": rss_mb()}}
+plan = {plan!r}
+if plan:
+    from pathlib import Path
+    MODEL_DIR = Path({backend!r}) / "ml" / "models"
+    prefix = {{"free": "free_signal_model_", "pro": "pro_signal_model_", "enterprise": "enterprise_model_"}}[plan]
+    uri = str(sorted(MODEL_DIR.glob(prefix + "*"))[-1])
+    from app.services.ml_model_service import ml_model_service
+    start = time.perf_counter()
+    ml_model_service.load_model(uri)
+    result["first_model_load_seconds"] = time.perf_counter() - start
+    result["rss_after_load_mb"] = rss_mb()
+result["heavy_modules_loaded"] = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps(result))
+"""
+
+
+def probe(module: str, plan: str | None) -> dict:
+    code = _PROBE.format(backend=str(BACKEND_DIR), module=module, plan=plan, heavy=HEAVY_MODULES)
+    out = subprocess.check_output([sys.executable, "-c", code], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True)
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.api.main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--warm-plan", choices=["free", "pro", "enterprise"], help="also load this plan's latest artifact")
+    args = parser.parse_args()
+
+    apply_standin_env()
+    runs = [probe(args.module, args.warm_plan) for _ in range(args.runs)]
+    summary = {
+        "module": args.module,
+        "runs": args.runs,
+        "import_seconds_median": statistics.median(r["import_seconds"] for r in runs),
+        "rss_mb_median": statistics.median(r["rss_mb"] for r in runs),
+        "heavy_modules_loaded": runs[-1]["heavy_modules_loaded"],
+    }
+    if args.warm_plan:
+        summary["first_model_load_seconds_median"] = statistics.median(r["first_model_load_seconds"] for r in runs)
+        summary["rss_after_load_mb_median"] = statistics.median(r["rss_after_load_mb"] for r in runs)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
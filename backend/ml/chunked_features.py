@@ -0,0 +1,212 @@
+"""Out-of-core feature building for histories that do not fit in memory.
+
+``build_features_chunked`` streams an OHLCV csv in ``chunk_rows`` pieces. Each
+piece is prefixed with the last ``overlap`` raw rows of the previous one, so
+every rolling window is complete. It gets one look-ahead row so the last target
+is correct. The piece then goes through the same ``build_features_free`` /
+``build_features_pro`` as training, and only its own rows are kept.
+
+The one feature with unbounded memory, the recursive RSI EWM, is recomputed for
+those rows starting from the carried ``(ma_up, ma_down)`` state. That reproduces
+``compute_rsi`` over the full series.
+
+Rows are appended to raw files in a staging directory, which is renamed into
+place when done::
+
+    <out>/manifest.json   columns, rows, dtype, source
+    <out>/features.bin    (rows, n_features) in ``dtype`` (float32 by default)
+    <out>/target.bin      int8
+    <out>/date.bin        datetime64[ns] as int64, when the source has a date column
+
+``load_chunked_features`` memory-maps them. Peak memory is set by
+``chunk_rows`` rather than the history length. Output matches the in-memory
+builders up to the rolling-window summation order (about 1e-12 relative in
+float64) and is then cast to ``dtype``.
+
+    python ml/chunked_features.py ml/data/BTC-USD_1m.csv --kind pro --chunk-rows 500000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from ml import utils  # noqa: E402
+
+RSI_WINDOW = 14
+MANIFEST = "manifest.json"
+# kind -> (builder, longest rolling window it uses)
+FEATURE_BUILDERS: dict[str, tuple[Callable[[pd.DataFrame], tuple[pd.DataFrame, pd.Series]], int]] = {
+    "free": (utils.build_features_free, 30),
+    "pro": (utils.build_features_pro, 50),
+}
+
+
+def _normalize(chunk: pd.DataFrame) -> pd.DataFrame:
+    # Same column handling as utils.load_ohlcv, minus the sort (the file must already be in time order).
+    if "date" in chunk.columns:
+        chunk["date"] = pd.to_datetime(chunk["date"])
+    chunk = chunk.rename(columns={c: c.lower() for c in chunk.columns})
+    if "close" not in chunk.columns:
+        raise ValueError("Dataframe must include close column")
+    if "volume" not in chunk.columns:
+        chunk["volume"] = 1_000
+    return chunk
+
+
+def read_csv_chunks(path: str | Path, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        yield _normalize(chunk)
+
+
+def _rsi(close: pd.Series, previous_close: float | None, state: tuple[float, float] | None):
+    """``compute_rsi`` for ``close`` continued from the EWM state left by the previous chunk."""
+    alpha_com = RSI_WINDOW - 1
+    delta = close.diff()
+    if previous_close is not None:
+        delta.iloc[0] = close.iloc[0] - previous_close
+    up = delta.clip(lower=0)
+    down = -1 * delta.clip(upper=0)
+    if state is not None:
+        # Seeding the recursion with the carried value is exactly how adjust=False continues.
+        up = pd.concat([pd.Series([state[0]]), up], ignore_index=True)
+        down = pd.concat([pd.Series([state[1]]), down], ignore_index=True)
+    ma_up = up.ewm(com=alpha_com, adjust=False).mean()
+    ma_down = down.ewm(com=alpha_com, adjust=False).mean()
+    if state is not None:
+        ma_up, ma_down = ma_up.iloc[1:], ma_down.iloc[1:]
+    rs = ma_up / (ma_down + 1e-9)
+    rsi = (100 - (100 / (1 + rs))).fillna(50)
+    return rsi.to_numpy(), (float(ma_up.iloc[-1]), float(ma_down.iloc[-1]))
+
+
+def iter_feature_chunks(
+    chunks: Iterable[pd.DataFrame], kind: str = "pro"
+) -> Iterator[tuple[pd.DataFrame, pd.Series, pd.DataFrame]]:
+    """Yield ``(features, target, raw rows)`` per input chunk, equal to the full-history builder's rows.
+
+    Chunks shorter than the overlap are merged into the next one.
+    """
+    builder, window = FEATURE_BUILDERS[kind]
+    overlap = window + 1  # one extra row for the log-return diff at the start of the window
+    tail, pending, state = None, None, None
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        chunk = chunk.reset_index(drop=True)
+        if pending is not None and len(pending) < overlap:
+            pending = pd.concat([pending, chunk], ignore_index=True)
+            continue
+        if pending is not None:
+            features, target, state = _build_piece(builder, tail, pending, chunk.iloc[:1], state)
+            yield features, target, pending
+            tail = pending.iloc[-overlap:].reset_index(drop=True)
+        pending = chunk
+    if pending is not None:
+        features, target, _ = _build_piece(builder, tail, pending, None, state)
+        yield features, target, pending
+
+
+def _build_piece(builder, tail, pending, lookahead, state):
+    parts = [frame for frame in (tail, pending, lookahead) if frame is not None]
+    frame = pd.concat(parts, ignore_index=True) if len(parts) > 1 else pending
+    features, target = builder(frame)
+    start = 0 if tail is None else len(tail)
+    keep = slice(start, start + len(pending))
+    features = features.iloc[keep].reset_index(drop=True)
+    target = target.iloc[keep].reset_index(drop=True)
+    previous_close = None if tail is None else float(tail["close"].iloc[-1])
+    features["rsi_14"], state = _rsi(pending["close"].astype(float), previous_close, state)
+    return features, target, state
+
+
+def build_features_chunked(
+    source: str | Path | Iterable[pd.DataFrame],
+    out_dir: str | Path,
+    kind: str = "pro",
+    chunk_rows: int = 500_000,
+    dtype: np.dtype | type = np.float32,
+) -> dict:
+    """Build features for ``source`` (a csv path or an iterable of time-ordered chunks) into ``out_dir``."""
+    out_dir = Path(out_dir)
+    staging = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    chunks = read_csv_chunks(source, chunk_rows) if isinstance(source, (str, Path)) else source
+    dtype = np.dtype(dtype)
+
+    rows, columns, has_dates = 0, None, None
+    start = time.perf_counter()
+    with open(staging / "features.bin", "wb") as feature_fh, open(staging / "target.bin", "wb") as target_fh, open(
+        staging / "date.bin", "wb"
+    ) as date_fh:
+        for features, target, raw in iter_feature_chunks(chunks, kind):
+            columns = columns or list(features.columns)
+            features.to_numpy(dtype=dtype).tofile(feature_fh)
+            target.to_numpy(dtype=np.int8).tofile(target_fh)
+            has_dates = "date" in raw.columns if has_dates is None else has_dates
+            if has_dates:
+                raw["date"].to_numpy(dtype="datetime64[ns]").astype(np.int64).tofile(date_fh)
+            rows += len(features)
+    if not has_dates:
+        (staging / "date.bin").unlink()
+
+    manifest = {
+        "kind": kind,
+        "rows": rows,
+        "columns": columns or [],
+        "dtype": dtype.name,
+        "has_dates": bool(has_dates),
+        "chunk_rows": chunk_rows,
+        "source": str(source) if isinstance(source, (str, Path)) else None,
+        "build_seconds": round(time.perf_counter() - start, 3),
+    }
+    (staging / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    shutil.rmtree(out_dir, ignore_errors=True)
+    staging.rename(out_dir)
+    return manifest
+
+
+def load_chunked_features(out_dir: str | Path, mmap: bool = True) -> tuple[np.ndarray, np.ndarray, np.ndarray | None, list[str]]:
+    """``(features, target, dates, columns)``; arrays are read-only memory maps unless ``mmap=False``."""
+    out_dir = Path(out_dir)
+    manifest = json.loads((out_dir / MANIFEST).read_text())
+    rows, columns = manifest["rows"], manifest["columns"]
+    if mmap:
+        features = np.memmap(out_dir / "features.bin", dtype=manifest["dtype"], mode="r", shape=(rows, len(columns)))
+        target = np.memmap(out_dir / "target.bin", dtype=np.int8, mode="r", shape=(rows,))
+        dates = np.memmap(out_dir / "date.bin", dtype=np.int64, mode="r", shape=(rows,)) if manifest["has_dates"] else None
+    else:
+        features = np.fromfile(out_dir / "features.bin", dtype=manifest["dtype"]).reshape(rows, len(columns))
+        target = np.fromfile(out_dir / "target.bin", dtype=np.int8)
+        dates = np.fromfile(out_dir / "date.bin", dtype=np.int64) if manifest["has_dates"] else None
+    if dates is not None:
+        dates = dates.view("datetime64[ns]")
+    return features, target, dates, columns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build features for a long OHLCV csv in bounded memory")
+    parser.add_argument("csv")
+    parser.add_argument("--kind", default="pro", choices=sorted(FEATURE_BUILDERS))
+    parser.add_argument("--out", help="output directory (default: <csv stem>.<kind>.features next to the csv)")
+    parser.add_argument("--chunk-rows", type=int, default=500_000)
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float64"])
+    args = parser.parse_args()
+
+    source = Path(args.csv)
+    out = Path(args.out) if args.out else source.with_name(f"{source.stem}.{args.kind}.features")
+    print(json.dumps(build_features_chunked(source, out, args.kind, args.chunk_rows, args.dtype), indent=2))
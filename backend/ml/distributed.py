@@ -0,0 +1,210 @@
+"""Data-parallel LSTM training across local CPU processes (torch.distributed, gloo).
+
+Each rank memory-maps the same ``.npy`` dataset, reads its shard through a
+``DistributedSampler`` and trains a ``DistributedDataParallel`` copy of
+``SimpleLSTMClassifier``; gradients are all-reduced after every backward pass.
+Rank 0 writes the checkpoint in the same ``.pt`` payload format as
+``train_enterprise_model``, so the serving path loads it unchanged.
+
+    python ml/distributed.py --scaling 1 2 4 8 --samples 100000
+    python ml/distributed.py --train --world-size 4 --no-register
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch import nn
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader, Dataset, DistributedSampler
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from ml.lstm import SimpleLSTMClassifier  # noqa: E402
+
+
+class _MemmapSequences(Dataset):
+    def __init__(self, x_path: str, y_path: str) -> None:
+        self.X = np.load(x_path, mmap_mode="r")
+        self.y = np.load(y_path, mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+    def __getitem__(self, idx: int):
+        return torch.from_numpy(np.array(self.X[idx], dtype=np.float32)), int(self.y[idx])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _worker(rank: int, world_size: int, port: int, workdir: str, options: dict) -> None:
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+    torch.set_num_threads(max(1, options["threads_per_rank"]))
+    torch.manual_seed(options["seed"])
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    try:
+        dataset = _MemmapSequences(f"{workdir}/X.npy", f"{workdir}/y.npy")
+        sampler = DistributedSampler(dataset, num_replicas=world_size, rank=rank, shuffle=True, seed=options["seed"])
+        loader = DataLoader(dataset, batch_size=options["batch_size"], sampler=sampler)
+
+        model = SimpleLSTMClassifier(options["input_dim"], options["hidden_dim"])
+        if options.get("init_checkpoint"):
+            model.load_state_dict(torch.load(options["init_checkpoint"], map_location="cpu")["state_dict"])
+        # DDP broadcasts rank 0's parameters on construction, so every replica starts identical.
+        ddp_model = DistributedDataParallel(model)
+        optimizer = torch.optim.Adam(ddp_model.parameters(), lr=options["lr"])
+        criterion = nn.CrossEntropyLoss()
+
+        dist.barrier()
+        start = time.perf_counter()
+        seen = 0
+        ddp_model.train()
+        for epoch in range(options["epochs"]):
+            sampler.set_epoch(epoch)
+            for xb, yb in loader:
+                optimizer.zero_grad()
+                loss = criterion(ddp_model(xb), yb)
+                loss.backward()
+                optimizer.step()
+                seen += len(yb)
+        dist.barrier()
+        elapsed = time.perf_counter() - start
+
+        totals = torch.tensor([float(seen)])
+        dist.all_reduce(totals)
+        if rank == 0:
+            model.eval()
+            torch.save(
+                {
+                    "state_dict": model.state_dict(),
+                    "input_dim": options["input_dim"],
+                    "hidden_dim": options["hidden_dim"],
+                    "feature_order": options["feature_order"],
+                    "seq_len": options["seq_len"],
+                },
+                options["save_path"],
+            )
+            stats = {
+                "world_size": world_size,
+                "samples": int(totals.item()),
+                "seconds": elapsed,
+                "samples_per_second": totals.item() / elapsed if elapsed else 0.0,
+            }
+            Path(workdir, "stats.json").write_text(json.dumps(stats))
+    finally:
+        dist.destroy_process_group()
+
+
+def train_lstm_ddp(
+    X: np.ndarray,
+    y: np.ndarray,
+    feature_order: list[str],
+    *,
+    world_size: int = 2,
+    epochs: int = 5,
+    lr: float = 1e-3,
+    batch_size: int = 256,
+    hidden_dim: int = 32,
+    save_path: Path | None = None,
+    init_checkpoint: str | None = None,
+    seed: int = 42,
+) -> tuple[SimpleLSTMClassifier, dict]:
+    """Train ``SimpleLSTMClassifier`` on ``X`` (samples, seq_len, features) with ``world_size`` processes.
+
+    Returns the trained model (loaded from rank 0's checkpoint) and throughput stats.
+    ``batch_size`` is per rank. When ``save_path`` is None the checkpoint lives in a
+    temporary directory and only the returned model is kept.
+    """
+    with tempfile.TemporaryDirectory(prefix="investia-ddp-") as workdir:
+        np.save(f"{workdir}/X.npy", np.ascontiguousarray(X, dtype=np.float32))
+        np.save(f"{workdir}/y.npy", np.asarray(y, dtype=np.int64))
+        checkpoint = Path(save_path) if save_path else Path(workdir) / "model.pt"
+        options = {
+            "input_dim": X.shape[2],
+            "hidden_dim": hidden_dim,
+            "seq_len": X.shape[1],
+            "feature_order": list(feature_order),
+            "epochs": epochs,
+            "lr": lr,
+            "batch_size": batch_size,
+            "seed": seed,
+            "threads_per_rank": (os.cpu_count() or 1) // world_size,
+            "init_checkpoint": init_checkpoint,
+            "save_path": str(checkpoint),
+        }
+        mp.spawn(_worker, args=(world_size, _free_port(), workdir, options), nprocs=world_size, join=True)
+
+        stats = json.loads(Path(workdir, "stats.json").read_text())
+        payload = torch.load(checkpoint, map_location="cpu")
+    model = SimpleLSTMClassifier(payload["input_dim"], payload["hidden_dim"])
+    model.load_state_dict(payload["state_dict"])
+    model.eval()
+    return model, stats
+
+
+def scaling_report(world_sizes: list[int], samples: int, seq_len: int, n_features: int, epochs: int, batch_size: int) -> dict:
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((samples, seq_len, n_features), dtype=np.float32)
+    y = (X[:, -1, 0] > 0).astype(np.int64)
+    feature_order = [f"f{i}" for i in range(n_features)]
+    runs = []
+    for world_size in world_sizes:
+        _, stats = train_lstm_ddp(X, y, feature_order, world_size=world_size, epochs=epochs, batch_size=batch_size)
+        runs.append(stats)
+    base = runs[0]
+    for stats in runs:
+        stats["speedup"] = stats["samples_per_second"] / (base["samples_per_second"] or 1)
+        stats["efficiency"] = stats["speedup"] * base["world_size"] / stats["world_size"]
+    return {
+        "cpu_count": os.cpu_count(),
+        "samples": samples,
+        "seq_len": seq_len,
+        "n_features": n_features,
+        "batch_size_per_rank": batch_size,
+        "runs": runs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data-parallel LSTM training")
+    parser.add_argument("--scaling", type=int, nargs="*", help="world sizes to benchmark, e.g. 1 2 4 8")
+    parser.add_argument("--samples", type=int, default=50_000)
+    parser.add_argument("--seq-len", type=int, default=20)
+    parser.add_argument("--features", type=int, default=9)
+    parser.add_argument("--train", action="store_true", help="train the ENTERPRISE model with --world-size processes")
+    parser.add_argument("--world-size", type=int, default=2)
+    parser.add_argument("--epochs", type=int, default=1, help="epochs per scaling run")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--no-register", action="store_true")
+    args = parser.parse_args()
+
+    if args.scaling:
+        report = scaling_report(args.scaling, args.samples, args.seq_len, args.features, args.epochs, args.batch_size)
+        print(json.dumps(report, indent=2))
+    elif args.train:
+        from ml.train_enterprise_model import train_enterprise_model
+
+        path, metrics = train_enterprise_model(register=not args.no_register, world_size=args.world_size)
+        print("Saved ENTERPRISE model to", path)
+        print("Validation metrics", metrics)
+    else:
+        parser.print_help()
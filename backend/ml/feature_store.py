@@ -0,0 +1,175 @@
+"""Training frames built from the live prediction log (``app.services.prediction_log``).
+
+``load_prediction_log`` returns one row per served prediction. Its columns are
+timestamp (UTC), plan, symbol, user_id, signal, model, source, and one column per
+feature in ``REALTIME_FEATURE_ORDER``.
+
+``join_labels`` finds, per symbol, the bar each prediction was made in using
+``merge_asof`` with direction "backward". It then attaches that bar's forward log
+return over ``horizon`` bars and ``target = forward_return > 0``, the same target
+as ``build_features_*``. Predictions whose horizon has not closed yet are dropped,
+as are symbols without bars for ``interval`` (stored or derivable from 1m).
+
+``cached_labels`` stores ``ml.labels`` output per (symbol, interval, label spec)
+under ``DATA_DIR/labels``, keyed by a fingerprint of the closes. A trainer that
+switches label definitions, or retrains on unchanged bars, reads them back
+instead of recomputing.
+
+    python ml/feature_store.py --plan pro --interval 1d --horizon 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from app.services.prediction_log import read_prediction_log  # noqa: E402
+from ml import utils  # noqa: E402
+from ml.labels import DEFAULT_LABEL, LabelSpec, compute_labels  # noqa: E402
+
+LABEL_DIR = utils.DATA_DIR / "labels"
+
+
+def load_prediction_log(
+    plan: str | None = None, start: date | None = None, end: date | None = None, directory: str | Path | None = None
+) -> pd.DataFrame:
+    columns = read_prediction_log(directory, start=start, end=end, plan=plan)
+    if not columns:
+        return pd.DataFrame()
+    feature_order = columns.pop("feature_order").tolist()
+    features = columns.pop("features")
+    frame = pd.DataFrame(columns)
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], unit="s")
+    return pd.concat([frame, pd.DataFrame(features, columns=feature_order)], axis=1)
+
+
+def join_labels(log: pd.DataFrame, interval: str = "1d", horizon: int = 1, last_per_bar: bool = True) -> pd.DataFrame:
+    """Attach ``bar``, ``forward_return`` and ``target`` to logged predictions.
+
+    With ``last_per_bar`` only the latest prediction per (symbol, plan, bar) is kept,
+    so a symbol streamed every few seconds does not outweigh the rest.
+    """
+    labeled = []
+    for symbol, rows in log.groupby("symbol", sort=False):
+        if not utils.has_ohlcv(symbol, interval):
+            continue
+        prices = utils.load_ohlcv(symbol, interval)
+        if "date" not in prices.columns:
+            continue
+        bars = pd.DataFrame(
+            {
+                "bar": pd.to_datetime(prices["date"]).dt.tz_localize(None),
+                "forward_return": np.log(prices["close"].shift(-horizon) / prices["close"]),
+            }
+        )
+        merged = pd.merge_asof(rows.sort_values("timestamp"), bars, left_on="timestamp", right_on="bar", direction="backward")
+        labeled.append(merged.dropna(subset=["bar", "forward_return"]))
+    if not labeled:
+        return log.iloc[:0].assign(bar=pd.NaT, forward_return=np.nan, target=0)
+    out = pd.concat(labeled, ignore_index=True)
+    if last_per_bar:
+        out = out.drop_duplicates(subset=["symbol", "plan", "bar"], keep="last")
+    out["target"] = (out["forward_return"] > 0).astype(int)
+    return out.sort_values("timestamp").reset_index(drop=True)
+
+
+def training_frame(
+    plan: str | None,
+    feature_order: list[str],
+    interval: str = "1d",
+    horizon: int = 1,
+    start: date | None = None,
+    end: date | None = None,
+) -> tuple[pd.DataFrame, pd.Series, pd.Series]:
+    """``(features, target, forward_return)`` from the log, with columns in ``feature_order``."""
+    labeled = join_labels(load_prediction_log(plan, start, end), interval=interval, horizon=horizon)
+    if labeled.empty:
+        return pd.DataFrame(columns=feature_order), pd.Series(dtype=int), pd.Series(dtype=float)
+    features = labeled.reindex(columns=feature_order, fill_value=0.0)
+    return features, labeled["target"], labeled["forward_return"]
+
+
+def _fingerprint(close: np.ndarray) -> str:
+    return hashlib.blake2b(np.ascontiguousarray(close, dtype=np.float64).tobytes(), digest_size=16).hexdigest()
+
+
+def label_path(symbol: str, interval: str, spec: LabelSpec, directory: Path | None = None) -> Path:
+    return (directory or LABEL_DIR) / f"{symbol.replace('/', '-')}_{interval}_{spec.name.replace(':', '_')}.npz"
+
+
+def cached_labels(
+    prices: pd.DataFrame,
+    spec: LabelSpec | str = DEFAULT_LABEL,
+    symbol: str | None = None,
+    interval: str = "1d",
+    directory: Path | None = None,
+) -> pd.DataFrame:
+    """``compute_labels(prices["close"], spec)`` as a frame on ``prices.index``, cached when ``symbol`` is given.
+
+    A cache entry is reused only if the closes it was computed from are identical.
+    """
+    spec = LabelSpec.parse(spec)
+    close = prices["close"].to_numpy(dtype=np.float64)
+    path = label_path(symbol, interval, spec, directory) if symbol else None
+    fingerprint = _fingerprint(close)
+    columns = None
+    if path is not None and path.exists():
+        with np.load(path) as stored:
+            if str(stored["fingerprint"]) == fingerprint:
+                columns = {name: stored[name] for name in stored.files if name != "fingerprint"}
+    if columns is None:
+        columns = {name: values[:, 0] for name, values in compute_labels(close, spec).items()}
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "wb") as fh:
+                np.savez(fh, fingerprint=np.array(fingerprint), **columns)
+            tmp.rename(path)
+    return pd.DataFrame(columns, index=prices.index)
+
+
+def training_rows(
+    features: pd.DataFrame,
+    prices: pd.DataFrame,
+    spec: LabelSpec | str = DEFAULT_LABEL,
+    symbol: str | None = None,
+    interval: str = "1d",
+) -> tuple[pd.DataFrame, pd.Series]:
+    """``build_features_*(prices)`` rows whose ``spec`` label is resolved, with their 0/1 ``target``.
+
+    Unresolved rows (horizon not closed yet, or no volatility estimate for a
+    barrier) carry target 0 without being negatives, so they are left out.
+    """
+    labels = cached_labels(prices, spec, symbol, interval)
+    resolved = labels["resolved"].to_numpy(dtype=bool)
+    return features[resolved], labels["target"][resolved].astype(int).rename("target")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the prediction log and its label join")
+    parser.add_argument("--plan")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--horizon", type=int, default=1)
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    log = load_prediction_log(args.plan, args.start, args.end)
+    print(f"{len(log)} logged predictions")
+    if not log.empty:
+        print(log.groupby(["plan", "source"]).size().to_string())
+        labeled = join_labels(log, interval=args.interval, horizon=args.horizon)
+        print(f"{len(labeled)} labeled rows ({labeled['symbol'].nunique()} symbols)")
+        if not labeled.empty:
+            print(utils.compute_strategy_metrics(labeled["forward_return"], labeled["signal"]))
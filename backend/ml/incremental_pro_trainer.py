@@ -1,14 +1,31 @@
-"""Scheduled incremental trainer for PRO plan."""
+"""Scheduled incremental trainer for PRO plan.
+
+Update modes:
+
+* ``full``: retrain a fresh model on the recent window (the original behaviour).
+* ``continue``: warm-start from the current booster and append a few boosting rounds
+  fitted only on rows that arrived after the model's ``trained_until`` stamp. Once
+  the model would exceed ``max_trees`` it falls back to a full retrain.
+* ``refresh``: keep the tree structure, re-estimate leaf values on the recent window
+  and prune splits whose gain no longer clears ``prune_gamma``.
+
+``python ml/incremental_pro_trainer.py --compare`` runs all three from the same base
+model and reports fit time, model size and holdout metrics.
+"""
 
 from __future__ import annotations
 
+import argparse
 import asyncio
+import json
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Tuple
 
 import joblib
+import pandas as pd
 import xgboost as xgb
 
 CURRENT_DIR = Path(__file__).resolve().parent
@@ -17,19 +34,118 @@ if str(BACKEND_DIR) not in sys.path:
     sys.path.append(str(BACKEND_DIR))
 
 from app.core.database import AsyncSessionLocal  # noqa: E402
-from ml import utils  # noqa: E402
+from ml import feature_store, utils  # noqa: E402
+from ml.labels import DEFAULT_LABEL, LabelSpec  # noqa: E402
 from ml.model_registry import get_latest_model_uri, register_model_version  # noqa: E402
 from ml.train_pro_model import SYMBOL, INTERVAL, train_pro_model  # noqa: E402
 
-
-def load_existing_model(uri: str) -> Tuple[xgb.XGBClassifier, list[str]]:
+UPDATE_MODES = ("full", "continue", "refresh")
+WINDOW_DAYS = 120
+CONTINUE_ROUNDS = 40
+MIN_NEW_ROWS = 5
+MAX_TREES = 600
+PRUNE_GAMMA = 0.5
+
+FULL_PARAMS = dict(
+    n_estimators=180,
+    max_depth=5,
+    learning_rate=0.05,
+    subsample=0.85,
+    colsample_bytree=0.85,
+    eval_metric="logloss",
+    random_state=42,
+)
+
+
+def load_existing_model(uri: str) -> Tuple[xgb.XGBClassifier, list[str], dict]:
     payload = joblib.load(uri)
     if isinstance(payload, dict) and "model" in payload:
-        return payload["model"], payload.get("feature_order", [])
-    return payload, payload["feature_order"] if isinstance(payload, dict) and "feature_order" in payload else []
-
-
-async def incremental_update(register: bool = True) -> Tuple[Path, dict]:
+        return payload["model"], payload.get("feature_order", []), payload
+    return payload, [], {}
+
+
+def rows_after(stamps: pd.Series, trained_until: str) -> pd.Index:
+    if stamps.str.fullmatch(r"\d+").all():
+        return stamps.index[stamps.astype(int) > int(trained_until)]
+    return stamps.index[pd.to_datetime(stamps) > pd.Timestamp(trained_until)]
+
+
+def n_live_nodes(model: xgb.XGBClassifier) -> int:
+    return sum(tree.count("\n") for tree in model.get_booster().get_dump())
+
+
+def fit_full(X: pd.DataFrame, y: pd.Series) -> xgb.XGBClassifier:
+    return xgb.XGBClassifier(**FULL_PARAMS).fit(X, y)
+
+
+def fit_continue(model: xgb.XGBClassifier, X_new: pd.DataFrame, y_new: pd.Series, rounds: int = CONTINUE_ROUNDS):
+    """Append ``rounds`` trees fitted on ``X_new`` to a copy of ``model``'s booster."""
+    params = {**FULL_PARAMS, **{k: v for k, v in model.get_params().items() if v is not None}, "n_estimators": rounds}
+    return xgb.XGBClassifier(**params).fit(X_new, y_new, xgb_model=model.get_booster().copy())
+
+
+def fit_refresh(model: xgb.XGBClassifier, X: pd.DataFrame, y: pd.Series, prune_gamma: float = PRUNE_GAMMA):
+    """Re-estimate leaf values on ``X`` and prune splits with gain below ``prune_gamma``.
+
+    The update process type is not supported on the QuantileDMatrix the sklearn
+    wrapper builds, so this goes through ``xgb.train`` with a plain DMatrix.
+    """
+    booster = model.get_booster()
+    params = {
+        "process_type": "update",
+        "updater": "refresh,prune",
+        "refresh_leaf": True,
+        "gamma": prune_gamma,
+        "objective": "binary:logistic",
+        "max_depth": FULL_PARAMS["max_depth"],
+    }
+    refreshed = xgb.train(params, xgb.DMatrix(X, label=y), num_boost_round=booster.num_boosted_rounds(), xgb_model=booster.copy())
+    candidate = xgb.XGBClassifier(**FULL_PARAMS)
+    candidate.load_model(refreshed.save_raw())
+    return candidate
+
+
+def update_model(
+    model: xgb.XGBClassifier,
+    features: pd.DataFrame,
+    target: pd.Series,
+    stamps: pd.Series,
+    trained_until: str | None,
+    mode: str = "continue",
+    *,
+    window_days: int = WINDOW_DAYS,
+    rounds: int = CONTINUE_ROUNDS,
+    max_trees: int = MAX_TREES,
+    prune_gamma: float = PRUNE_GAMMA,
+) -> Tuple[xgb.XGBClassifier | None, str]:
+    """Build a candidate from ``model``; returns ``(candidate, mode actually used)``.
+
+    ``candidate`` is None when ``continue`` finds fewer than ``MIN_NEW_ROWS`` new rows.
+    """
+    if mode not in UPDATE_MODES:
+        raise ValueError(f"mode must be one of {UPDATE_MODES}")
+    window = utils.recent_window(features.join(target.rename("target")), days=window_days)
+    X_win, y_win = window.drop(columns=["target"]), window["target"]
+
+    if mode == "continue":
+        if model.get_booster().num_boosted_rounds() + rounds > max_trees:
+            mode = "full"
+        else:
+            # Models saved before trained_until was recorded continue on the recent window.
+            new_idx = rows_after(stamps, trained_until) if trained_until else X_win.index
+            if len(new_idx) < MIN_NEW_ROWS:
+                return None, mode
+            return fit_continue(model, features.loc[new_idx], target.loc[new_idx], rounds), mode
+    if mode == "refresh":
+        return fit_refresh(model, X_win, y_win, prune_gamma), mode
+    return fit_full(X_win, y_win), mode
+
+
+def describe(model: xgb.XGBClassifier) -> dict:
+    return {"n_trees": model.get_booster().num_boosted_rounds(), "n_nodes": n_live_nodes(model)}
+
+
+async def incremental_update(register: bool = True, mode: str = "continue") -> Tuple[Path, dict]:
     async with AsyncSessionLocal() as session:
         current_uri = await get_latest_model_uri("pro", db_session=session)
         if not current_uri:
@@ -37,46 +153,103 @@ async def incremental_update(register: bool = True) -> Tuple[Path, dict]:
             path, metrics = train_pro_model(register=register)
             return path, metrics
 
-        model, feature_order = load_existing_model(current_uri)
+        model, feature_order, payload = load_existing_model(current_uri)
+        # Keep the target the model was trained on; models saved before the label was
+        # recorded were all trained on the default next-bar direction.
+        label = payload.get("label", DEFAULT_LABEL.name)
         df = utils.load_ohlcv(SYMBOL, INTERVAL)
-        features, target = utils.build_features_pro(df)
-        window_df = utils.recent_window(features.join(target.rename("target")), days=120)
-        features_win = window_df[feature_order] if feature_order else window_df.drop(columns=["target"])
-        target_win = window_df["target"]
-
-        # Train new model on rolling window
-        candidate = xgb.XGBClassifier(
-            n_estimators=180,
-            max_depth=5,
-            learning_rate=0.05,
-            subsample=0.85,
-            colsample_bytree=0.85,
-            eval_metric="logloss",
-            random_state=42,
-        )
-        candidate.fit(features_win, target_win)
-
-        # Evaluate old vs new on last 25%
-        split_idx = int(len(features_win) * 0.75)
-        X_val, y_val = features_win.iloc[split_idx:], target_win.iloc[split_idx:]
-        old_preds = model.predict(X_val)
-        new_preds = candidate.predict(X_val)
+        features, _ = utils.build_features_pro(df)
+        if feature_order:
+            features = features[feature_order]
+        # Bars whose horizon has not closed yet are left (with trained_until) for a later update.
+        features, target = feature_store.training_rows(features, df, label, SYMBOL, INTERVAL)
+        stamps = utils.row_stamps(df).loc[features.index]
+
+        start = time.perf_counter()
+        candidate, used_mode = update_model(model, features, target, stamps, payload.get("trained_until"), mode)
+        fit_seconds = time.perf_counter() - start
+        if candidate is None:
+            return Path(current_uri), payload.get("metrics", {})
+
+        # Evaluate old vs new on last 25% of the recent window
+        window = utils.recent_window(features.join(target.rename("target")), days=WINDOW_DAYS)
+        split_idx = int(len(window) * 0.75)
+        X_val = window.drop(columns=["target"]).iloc[split_idx:]
         returns = X_val["log_return"]
-        old_metrics = utils.compute_strategy_metrics(returns, old_preds)
-        new_metrics = utils.compute_strategy_metrics(returns, new_preds)
+        old_metrics = utils.compute_strategy_metrics(returns, model.predict(X_val))
+        new_metrics = utils.compute_strategy_metrics(returns, candidate.predict(X_val))
 
         if new_metrics["sharpe"] <= old_metrics["sharpe"]:
             return Path(current_uri), old_metrics
 
         timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
         model_path = utils.MODEL_DIR / f"pro_signal_model_incremental_{SYMBOL}_{INTERVAL}_{timestamp}.pkl"
-        utils.save_model(candidate, model_path, feature_order or list(features_win.columns), extra={"metrics": new_metrics})
+        extra = {
+            "metrics": new_metrics,
+            "trained_until": stamps.iloc[-1],
+            "update_mode": used_mode,
+            "fit_seconds": fit_seconds,
+            "label": label,
+            **describe(candidate),
+        }
+        utils.save_model(candidate, model_path, feature_order or list(features.columns), extra=extra)
         if register:
             await register_model_version("pro", str(model_path), new_metrics["sharpe"], new_metrics["win_rate"], session)
         return model_path, new_metrics
 
 
+def compare_update_modes(
+    df: pd.DataFrame, new_rows: int = 10, holdout: int = 20, label: LabelSpec | str = DEFAULT_LABEL
+) -> dict:
+    """Fit a base model, then update it with each mode and score all on the same holdout.
+
+    Rows are split as ``[base | new_rows | holdout]``; the base model sees only the
+    first block, every update sees the new rows, and nothing sees the holdout. Only
+    rows with a resolved ``label`` are used.
+    """
+    features, _ = utils.build_features_pro(df)
+    features, target = feature_store.training_rows(features, df, label)
+    stamps = utils.row_stamps(df).loc[features.index]
+    cut = len(features) - new_rows - holdout
+    if cut <= 0:
+        raise ValueError("not enough rows for the requested new_rows/holdout split")
+    base = xgb.XGBClassifier(**{**FULL_PARAMS, "n_estimators": 220}).fit(features.iloc[:cut], target.iloc[:cut])
+    seen = slice(0, cut + new_rows)
+    X_hold = features.iloc[cut + new_rows :]
+
+    report = {"rows": len(features), "label": LabelSpec.parse(label).name, "new_rows": new_rows, "holdout": holdout, "base": describe(base), "modes": {}}
+    for mode in UPDATE_MODES:
+        start = time.perf_counter()
+        candidate, used_mode = update_model(
+            base, features.iloc[seen], target.iloc[seen], stamps.iloc[seen], stamps.iloc[cut - 1], mode, rounds=CONTINUE_ROUNDS
+        )
+        elapsed = time.perf_counter() - start
+        if candidate is None:
+            report["modes"][mode] = {"skipped": "not enough new rows"}
+            continue
+        report["modes"][mode] = {
+            "mode_used": used_mode,
+            "fit_seconds": round(elapsed, 4),
+            **describe(candidate),
+            "holdout": utils.compute_strategy_metrics(X_hold["log_return"], candidate.predict(X_hold)),
+        }
+    return report
+
+
 if __name__ == "__main__":
-    path, metrics = asyncio.run(incremental_update(register=True))
-    print("Incremental PRO model saved to", path)
-    print("Metrics", metrics)
+    parser = argparse.ArgumentParser(description="Incremental PRO model update")
+    parser.add_argument("--mode", choices=UPDATE_MODES, default="continue")
+    parser.add_argument("--no-register", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="compare update modes instead of updating")
+    parser.add_argument("--new-rows", type=int, default=10)
+    parser.add_argument("--holdout", type=int, default=20)
+    parser.add_argument("--label", default=DEFAULT_LABEL.name, help="label for --compare; updates keep the model's own")
+    args = parser.parse_args()
+
+    if args.compare:
+        report = compare_update_modes(utils.load_ohlcv(SYMBOL, INTERVAL), args.new_rows, args.holdout, args.label)
+        print(json.dumps(report, indent=2))
+    else:
+        path, metrics = asyncio.run(incremental_update(register=not args.no_register, mode=args.mode))
+        print("Incremental PRO model saved to", path)
+        print("Metrics", metrics)
@@ -0,0 +1,246 @@
+"""Indicator kernels over ``(time, symbols)`` price matrices.
+
+Each function takes a ``(T, N)`` float array (1-D input is treated as one
+column) and computes every symbol in one vectorized pass. NaN handling and
+warmup follow the pandas code in ``ml.utils``:
+
+* rolling statistics need a full window of non-NaN values (pandas
+  ``rolling(w)``, ``min_periods=w``), otherwise they are NaN;
+* ``rsi`` is the recursive ``ewm(com=window - 1, adjust=False)`` of
+  ``compute_rsi``. It starts at each column's first observation and treats
+  interior NaNs the way pandas does with ``ignore_na=False``;
+* ``features_free`` / ``features_pro`` apply the same fills as
+  ``build_features_free`` / ``build_features_pro`` (``fillna(0)``, ``bfill``,
+  ``inf -> 1``) and return the columns in the same order.
+
+Rolling sums use cumulative sums over column-centred values, so rolling
+statistics match pandas to about 1e-13 rather than bit for bit; RSI is exact.
+``python benchmarks/indicators_bench.py`` compares them with the per-symbol
+pandas path.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+FREE_COLUMNS = ("log_return", "volatility_10", "ma_ratio", "rsi_14")
+PRO_COLUMNS = (
+    "log_return",
+    "volatility_10",
+    "volatility_20",
+    "volatility_50",
+    "ma_ratio",
+    "rsi_14",
+    "volume_zscore",
+    "price_spread",
+    "sentiment_score",
+)
+
+
+def _as_2d(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    return x[:, None] if x.ndim == 1 else x
+
+
+def _shift_diff(cumulative: np.ndarray, window: int) -> np.ndarray:
+    # cumulative[t] - cumulative[t - window], with cumulative[-1] == 0
+    out = cumulative.copy()
+    out[window:] -= cumulative[:-window]
+    return out
+
+
+def _window_sums(x: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Per-window (count of finite values, sum, sum of squares) of ``x`` centred per column, and the centres."""
+    valid = np.isfinite(x)
+    with np.errstate(invalid="ignore"):
+        centre = np.nanmean(np.where(valid, x, np.nan), axis=0)
+    centred = np.where(valid, x - np.nan_to_num(centre), 0.0)
+    counts = _shift_diff(np.cumsum(valid, axis=0, dtype=np.int64), window)
+    sums = _shift_diff(np.cumsum(centred, axis=0), window)
+    squares = _shift_diff(np.cumsum(centred * centred, axis=0), window)
+    return counts, sums, squares, np.nan_to_num(centre)
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    x = _as_2d(x)
+    counts, sums, _, centre = _window_sums(x, window)
+    out = sums / window + centre
+    out[counts < window] = np.nan
+    out[: window - 1] = np.nan
+    return out
+
+
+def rolling_std(x: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    x = _as_2d(x)
+    counts, sums, squares, _ = _window_sums(x, window)
+    var = (squares - sums * sums / window) / (window - ddof)
+    # Like pandas, a window of one repeated value has exactly zero variance instead of round-off.
+    if window > 1:
+        same = np.zeros(x.shape, dtype=np.int64)
+        same[1:] = x[1:] == x[:-1]
+        var[_shift_diff(np.cumsum(same, axis=0), window - 1) >= window - 1] = 0.0
+    out = np.sqrt(np.maximum(var, 0.0))
+    out[counts < window] = np.nan
+    out[: window - 1] = np.nan
+    return out
+
+
+def rolling_min(x: np.ndarray, window: int) -> np.ndarray:
+    x = _as_2d(x)
+    out = np.full_like(x, np.nan)
+    if len(x) >= window:
+        out[window - 1 :] = sliding_window_view(x, window, axis=0).min(axis=-1)
+    return out
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    x = _as_2d(x)
+    out = np.full_like(x, np.nan)
+    if len(x) >= window:
+        out[window - 1 :] = sliding_window_view(x, window, axis=0).max(axis=-1)
+    return out
+
+
+def diff(x: np.ndarray) -> np.ndarray:
+    x = _as_2d(x)
+    out = np.empty_like(x)
+    out[0] = np.nan
+    out[1:] = x[1:] - x[:-1]
+    return out
+
+
+def log_returns(close: np.ndarray) -> np.ndarray:
+    """``np.log(close).diff().fillna(0)``."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = diff(np.log(_as_2d(close)))
+    return np.where(np.isnan(out), 0.0, out)
+
+
+def bfill(x: np.ndarray) -> np.ndarray:
+    """Column-wise backward fill (``fillna(method="bfill")``); trailing NaNs stay NaN."""
+    x = _as_2d(x)
+    rows = np.arange(len(x))[:, None]
+    source = np.where(np.isnan(x), len(x), rows)
+    source = np.minimum.accumulate(source[::-1], axis=0)[::-1]
+    padded = np.vstack([x, np.full((1, x.shape[1]), np.nan)])
+    return np.take_along_axis(padded, source, axis=0)
+
+
+def ewm_mean(x: np.ndarray, alpha: float) -> np.ndarray:
+    """``ewm(alpha=alpha, adjust=False).mean()`` per column (``ignore_na=False``).
+
+    Columns with no NaN after their first observation go through ``lfilter``.
+    That is the same recursion pandas runs, with the same products, evaluated in C.
+    Columns with gaps take a time loop that mirrors pandas' NaN handling.
+    """
+    from scipy.signal import lfilter
+
+    x = _as_2d(x)
+    out = np.full_like(x, np.nan)
+    observed = ~np.isnan(x)
+    start = np.where(observed.any(axis=0), observed.argmax(axis=0), len(x))
+    gaps = (np.cumsum(observed, axis=0) < np.arange(1, len(x) + 1)[:, None] - start[None, :]).any(axis=0)
+    for first in np.unique(start[~gaps & (start < len(x))]):
+        cols = np.flatnonzero((start == first) & ~gaps)
+        seed = x[first, cols]
+        out[first, cols] = seed
+        if first + 1 < len(x):
+            out[first + 1 :, cols], _ = lfilter([alpha], [1.0, alpha - 1.0], x[first + 1 :, cols], axis=0, zi=((1 - alpha) * seed)[None, :])
+    if gaps.any():
+        out[:, gaps] = _ewm_loop(x[:, gaps], alpha)
+    return out
+
+
+def _ewm_loop(x: np.ndarray, alpha: float) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    weighted = np.full(x.shape[1], np.nan)
+    old_wt = np.ones(x.shape[1])
+    started = np.zeros(x.shape[1], dtype=bool)
+    for t in range(len(x)):
+        cur = x[t]
+        observed = ~np.isnan(cur)
+        first = observed & ~started
+        weighted[first] = cur[first]
+        started |= first
+        # Running columns decay the old weight every step and fold in observed values.
+        running = started & ~first
+        old_wt[running] *= 1 - alpha
+        update = running & observed & (weighted != cur)
+        w = old_wt[update]
+        weighted[update] = (w * weighted[update] + alpha * cur[update]) / (w + alpha)
+        old_wt[running & observed] = 1.0
+        out[t] = weighted
+    return out
+
+
+def rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    """``utils.compute_rsi``: Wilder-style RSI from recursive EWMs, NaN -> 50."""
+    delta = diff(close)
+    up = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+    down = np.where(np.isnan(delta), np.nan, -np.minimum(delta, 0.0))
+    alpha = 1.0 / window
+    ma_up = ewm_mean(up, alpha)
+    ma_down = ewm_mean(down, alpha)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100 - (100 / (1 + ma_up / (ma_down + 1e-9)))
+    return np.where(np.isnan(out), 50.0, out)
+
+
+def zscore(x: np.ndarray, window: int) -> np.ndarray:
+    """``(x - rolling mean) / (rolling std + 1e-9)``, NaN -> 0."""
+    x = _as_2d(x)
+    out = (x - rolling_mean(x, window)) / (rolling_std(x, window) + 1e-9)
+    return np.where(np.isnan(out), 0.0, out)
+
+
+def range_position(x: np.ndarray, window: int = 5) -> np.ndarray:
+    """Where ``x`` sits in its trailing ``window`` range, 0..1; NaN during warmup."""
+    x = _as_2d(x)
+    low = rolling_min(x, window)
+    return (x - low) / (rolling_max(x, window) - low + 1e-9)
+
+
+def ma_ratio(close: np.ndarray, fast: int, slow: int) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = bfill(rolling_mean(close, fast)) / bfill(rolling_mean(close, slow))
+    out[np.isinf(out)] = 1.0
+    return np.where(np.isnan(out), 1.0, out)
+
+
+def _fill0(x: np.ndarray) -> np.ndarray:
+    return np.where(np.isnan(x), 0.0, x)
+
+
+def features_free(close: np.ndarray) -> dict[str, np.ndarray]:
+    """``build_features_free`` for every column of ``close``, as ``{name: (T, N)}``."""
+    close = _as_2d(close)
+    returns = log_returns(close)
+    return {
+        "log_return": returns,
+        "volatility_10": _fill0(rolling_std(returns, 10)),
+        "ma_ratio": ma_ratio(close, 10, 30),
+        "rsi_14": rsi(close, 14),
+    }
+
+
+def features_pro(close: np.ndarray, volume: np.ndarray, sentiment: np.ndarray | None = None) -> dict[str, np.ndarray]:
+    """``build_features_pro`` for every column of ``close``/``volume``, as ``{name: (T, N)}``."""
+    close = _as_2d(close)
+    returns = log_returns(close)
+    return {
+        "log_return": returns,
+        "volatility_10": _fill0(rolling_std(returns, 10)),
+        "volatility_20": _fill0(rolling_std(returns, 20)),
+        "volatility_50": _fill0(rolling_std(returns, 50)),
+        "ma_ratio": ma_ratio(close, 10, 50),
+        "rsi_14": rsi(close, 14),
+        "volume_zscore": zscore(volume, 20),
+        "price_spread": range_position(close, 5),
+        "sentiment_score": np.zeros_like(close) if sentiment is None else _fill0(_as_2d(sentiment)),
+    }
+
+
+def stack(features: dict[str, np.ndarray], columns: tuple[str, ...] = PRO_COLUMNS) -> np.ndarray:
+    """``(T, N, n_features)`` tensor in ``columns`` order."""
+    return np.stack([features[name] for name in columns], axis=-1)
@@ -0,0 +1,197 @@
+"""Training labels computed from closes, for one symbol or a ``(time, symbols)`` matrix.
+
+Every kernel is vectorized over time and symbols. There are no per-row loops:
+
+* ``forward_returns``: log return from bar ``t`` to ``t + h`` for several
+  horizons at once;
+* ``forward_labels``: ``forward_return > threshold``. With ``h = 1`` and
+  threshold 0 this is the ``close.shift(-1) > close`` target of
+  ``build_features_*``;
+* ``triple_barrier``: which of an upper or lower return barrier the path from
+  ``t`` touches first within ``horizon`` bars. Barriers sit at ``upper`` /
+  ``lower`` times the trailing volatility of log returns, scaled to the
+  horizon (``vol * sqrt(horizon)``). If neither is touched, the vertical
+  barrier applies and the label is 0. Paths come from ``sliding_window_view``
+  and are processed ``CHUNK_ELEMENTS`` at a time.
+
+``LabelSpec`` names a definition (``"forward:1"``, ``"forward:5:0.002"``,
+``"barrier:20:2:1"``). ``compute_labels`` returns its columns: ``target`` (0/1,
+what the trainers fit), ``forward_return``, ``resolved`` and, for barriers,
+``barrier`` (-1/0/1) and ``exit_bar``. Rows whose horizon has not closed get
+target 0 and ``resolved = False``, as the last row does in ``build_features_*``.
+``feature_store.cached_labels`` stores them per (symbol, interval, spec), so a
+trainer can switch definitions without recomputing::
+
+    python ml/labels.py BTC-USD --interval 1d --label barrier:20:2:1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from ml import indicators  # noqa: E402
+
+# Upper bound on path elements (rows x symbols x horizon) materialized per triple-barrier chunk.
+CHUNK_ELEMENTS = 8_000_000
+LABEL_KINDS = ("forward", "barrier")
+
+
+@dataclass(frozen=True)
+class LabelSpec:
+    kind: str = "forward"
+    horizon: int = 1
+    # forward: minimum log return counted as "up"
+    threshold: float = 0.0
+    # barrier: widths in trailing-volatility units, and the volatility window
+    upper: float = 1.0
+    lower: float = 1.0
+    vol_window: int = 20
+
+    def __post_init__(self) -> None:
+        if self.kind not in LABEL_KINDS:
+            raise ValueError(f"Unknown label kind {self.kind!r}; known: {LABEL_KINDS}")
+        if self.horizon < 1:
+            raise ValueError("horizon must be >= 1")
+
+    @property
+    def name(self) -> str:
+        if self.kind == "forward":
+            return f"forward:{self.horizon}" + (f":{self.threshold:g}" if self.threshold else "")
+        return f"barrier:{self.horizon}:{self.upper:g}:{self.lower:g}" + (
+            f":{self.vol_window}" if self.vol_window != 20 else ""
+        )
+
+    @classmethod
+    def parse(cls, text: str | LabelSpec) -> LabelSpec:
+        """``forward:<h>[:<threshold>]`` or ``barrier:<h>:<upper>:<lower>[:<vol_window>]``."""
+        if isinstance(text, LabelSpec):
+            return text
+        kind, *args = text.split(":")
+        if kind == "forward" and len(args) <= 2:
+            return cls("forward", int(args[0]) if args else 1, float(args[1]) if len(args) > 1 else 0.0)
+        if kind == "barrier" and 3 <= len(args) <= 4:
+            return cls(
+                "barrier", int(args[0]), upper=float(args[1]), lower=float(args[2]), vol_window=int(args[3]) if len(args) > 3 else 20
+            )
+        raise ValueError(f"Cannot parse label spec {text!r}")
+
+
+DEFAULT_LABEL = LabelSpec()
+
+
+def _as_2d(close: np.ndarray) -> np.ndarray:
+    close = np.asarray(close, dtype=np.float64)
+    return close[:, None] if close.ndim == 1 else close
+
+
+def forward_returns(close: np.ndarray, horizons: Sequence[int]) -> np.ndarray:
+    """``(T, N, len(horizons))`` log returns ``log(close[t + h] / close[t])``; NaN past the end."""
+    log_close = np.log(_as_2d(close))
+    out = np.full(log_close.shape + (len(horizons),), np.nan)
+    for k, h in enumerate(horizons):
+        if h < len(log_close):
+            out[:-h, :, k] = log_close[h:] - log_close[:-h]
+    return out
+
+
+def forward_labels(close: np.ndarray, horizon: int = 1, threshold: float = 0.0) -> dict[str, np.ndarray]:
+    returns = forward_returns(close, [horizon])[..., 0]
+    resolved = ~np.isnan(returns)
+    return {
+        "target": (returns > threshold).astype(np.int8),
+        "forward_return": returns,
+        "resolved": resolved,
+    }
+
+
+def multi_horizon_labels(close: np.ndarray, horizons: Sequence[int], threshold: float = 0.0) -> dict[str, np.ndarray]:
+    """``target_<h>`` and ``forward_return_<h>`` for every horizon from one pass over the closes."""
+    returns = forward_returns(close, horizons)
+    out = {}
+    for k, h in enumerate(horizons):
+        out[f"forward_return_{h}"] = returns[..., k]
+        out[f"target_{h}"] = (returns[..., k] > threshold).astype(np.int8)
+    return out
+
+
+def triple_barrier(
+    close: np.ndarray, horizon: int, upper: float = 1.0, lower: float = 1.0, vol_window: int = 20
+) -> dict[str, np.ndarray]:
+    """First barrier touched within ``horizon`` bars: 1 upper, -1 lower, 0 vertical."""
+    close = _as_2d(close)
+    log_close = np.log(close)
+    t, n = log_close.shape
+    vol = indicators.rolling_std(indicators.log_returns(close), vol_window)
+    width = vol * np.sqrt(horizon)
+
+    barrier = np.zeros((t, n), dtype=np.int8)
+    exit_bar = np.zeros((t, n), dtype=np.int32)
+    exit_return = np.full((t, n), np.nan)
+    resolved = np.zeros((t, n), dtype=bool)
+    rows = t - horizon
+    if rows > 0:
+        # paths[i, j, k] = log return from bar i to bar i + k + 1
+        paths = sliding_window_view(log_close[1:], horizon, axis=0)[:rows]
+        step = max(1, CHUNK_ELEMENTS // max(1, n * horizon))
+        for lo in range(0, rows, step):
+            hi = min(rows, lo + step)
+            path = paths[lo:hi] - log_close[lo:hi, :, None]
+            up = path >= (upper * width[lo:hi])[..., None]
+            down = path <= -(lower * width[lo:hi])[..., None]
+            first_up = np.where(up.any(axis=-1), up.argmax(axis=-1), horizon)
+            first_down = np.where(down.any(axis=-1), down.argmax(axis=-1), horizon)
+            hit = np.minimum(first_up, first_down)
+            chunk = np.where(first_up < first_down, 1, np.where(first_down < first_up, -1, 0))
+            barrier[lo:hi] = chunk
+            exit_bar[lo:hi] = np.minimum(hit, horizon - 1) + 1
+            exit_return[lo:hi] = np.take_along_axis(path, np.minimum(hit, horizon - 1)[..., None], axis=-1)[..., 0]
+            resolved[lo:hi] = ~np.isnan(width[lo:hi]) & ~np.isnan(path).any(axis=-1)
+    barrier[~resolved] = 0
+    exit_bar[~resolved] = 0
+    return {
+        "target": (barrier == 1).astype(np.int8),
+        "forward_return": np.where(resolved, exit_return, np.nan),
+        "resolved": resolved,
+        "barrier": barrier,
+        "exit_bar": exit_bar,
+    }
+
+
+def compute_labels(close: np.ndarray, spec: LabelSpec | str = DEFAULT_LABEL) -> dict[str, np.ndarray]:
+    """Columns for ``spec`` as ``(T, N)`` arrays (``(T, 1)`` for a single series)."""
+    spec = LabelSpec.parse(spec)
+    if spec.kind == "forward":
+        return forward_labels(close, spec.horizon, spec.threshold)
+    return triple_barrier(close, spec.horizon, spec.upper, spec.lower, spec.vol_window)
+
+
+if __name__ == "__main__":
+    from ml import feature_store, utils
+
+    parser = argparse.ArgumentParser(description="Compute (and cache) labels for a symbol's bars")
+    parser.add_argument("symbol")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--label", default=DEFAULT_LABEL.name, help="e.g. forward:5, forward:5:0.002, barrier:20:2:1")
+    args = parser.parse_args()
+
+    # Pass the text: run as a script, this module's LabelSpec is not the one feature_store imported.
+    spec = LabelSpec.parse(args.label)
+    labels = feature_store.cached_labels(utils.load_ohlcv(args.symbol, args.interval), args.label, args.symbol, args.interval)
+    resolved = labels[labels["resolved"]]
+    summary = {"label": spec.name, "rows": len(labels), "resolved": len(resolved), "target_rate": float(resolved["target"].mean())}
+    if "barrier" in labels:
+        summary["barriers"] = {str(k): int(v) for k, v in resolved["barrier"].value_counts().sort_index().items()}
+    print(json.dumps(summary, indent=2))
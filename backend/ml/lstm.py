@@ -0,0 +1,15 @@
+from torch import nn
+
+
+class SimpleLSTMClassifier(nn.Module):
+    """Small LSTM classifier for sequence-based enterprise model."""
+
+    def __init__(self, input_dim: int, hidden_dim: int = 32, num_layers: int = 1):
+        super().__init__()
+        self.lstm = nn.LSTM(input_dim, hidden_dim, num_layers=num_layers, batch_first=True)
+        self.head = nn.Sequential(nn.Linear(hidden_dim, 32), nn.ReLU(), nn.Linear(32, 2))
+
+    def forward(self, x):
+        out, _ = self.lstm(x)
+        last = out[:, -1, :]
+        return self.head(last)
@@ -0,0 +1,319 @@
+"""Checksummed model packages with native, memory-mappable weight files.
+
+A package (``<stem>.pkg``) is a symlink to a versioned directory
+(``<stem>.pkg.v<ns>``) holding ``manifest.json`` plus weights:
+
+* ``lstm``: one ``.npy`` per state-dict tensor under ``tensors/``, memory-mapped on
+  load and attached with ``load_state_dict(assign=True)`` so the parameters point
+  straight at the page cache and are shared by every process serving the package;
+* ``xgboost``: the booster in UBJSON (``model.ubj``), loaded without unpickling;
+* ``sklearn``: ``model.joblib`` written with ``joblib.dump`` and loaded with
+  ``mmap_mode="r"``, so the tree arrays are memory-mapped as well.
+
+The manifest records feature order, seq_len, metrics and a sha256 per file, which
+``load_package`` verifies before anything is deserialized. ``ModelVersion.uri``
+can point at the package and ``MLModelService`` loads it directly.
+
+Re-saving writes a new version directory and swaps the symlink with one
+``os.replace``. A reader therefore always finds a complete package at the path.
+``load_package`` resolves the link once, so it never mixes files from two
+versions. The previous version is kept for readers that resolved it just
+before the swap; older ones are removed.
+
+    python ml/model_package.py convert ml/models/pro_signal_model_BTC-USD_1d_<ts>.pkl
+    python ml/model_package.py bench ml/models/enterprise_model_BTC-USD_1d_<ts>.pt
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+PACKAGE_FORMAT = "investia-model-package"
+PACKAGE_VERSION = 1
+PACKAGE_SUFFIX = ".pkg"
+MANIFEST = "manifest.json"
+_METADATA_KEYS = ("feature_order", "seq_len", "metrics", "input_dim", "hidden_dim", "trained_until")
+
+
+class PackageIntegrityError(ValueError):
+    """A package file is missing or does not match the checksum in its manifest."""
+
+
+def is_package(uri: str | Path) -> bool:
+    path = Path(uri)
+    return path.is_dir() and (path / MANIFEST).exists()
+
+
+def package_path(artifact: str | Path) -> Path:
+    return Path(artifact).with_suffix(PACKAGE_SUFFIX)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _kind(model: Any) -> str:
+    if model.__class__.__name__ == "SimpleLSTMClassifier":
+        return "lstm"
+    if model.__class__.__module__.startswith("xgboost"):
+        return "xgboost"
+    return "sklearn"
+
+
+def save_package(model: Any, path: str | Path, feature_order: list[str], extra: dict | None = None) -> Path:
+    """Write ``model`` and its metadata as a package directory at ``path``."""
+    path = Path(path)
+    staging = path.with_name(f"{path.name}.v{time.time_ns()}")
+    staging.mkdir(parents=True)
+
+    kind = _kind(model)
+    if kind == "lstm":
+        (staging / "tensors").mkdir()
+        for name, tensor in model.state_dict().items():
+            np.save(staging / "tensors" / f"{name}.npy", tensor.detach().cpu().numpy())
+    elif kind == "xgboost":
+        model.get_booster().save_model(str(staging / "model.ubj"))
+    else:
+        import joblib
+
+        joblib.dump(model, staging / "model.joblib")
+
+    files = {
+        str(file.relative_to(staging)): {"sha256": _sha256(file), "bytes": file.stat().st_size}
+        for file in sorted(staging.rglob("*"))
+        if file.is_file()
+    }
+    manifest = {
+        "format": PACKAGE_FORMAT,
+        "version": PACKAGE_VERSION,
+        "kind": kind,
+        "created_at": datetime.utcnow().isoformat(),
+        "feature_order": list(feature_order),
+        "files": files,
+        **{key: value for key, value in (extra or {}).items() if key != "model"},
+    }
+    if kind == "lstm":
+        manifest.setdefault("input_dim", model.lstm.input_size)
+        manifest.setdefault("hidden_dim", model.lstm.hidden_size)
+    if kind == "xgboost":
+        manifest["xgboost_params"] = {k: v for k, v in model.get_params().items() if isinstance(v, (int, float, str))}
+    (staging / MANIFEST).write_text(json.dumps(manifest, indent=2, default=str))
+
+    _swap_in(staging, path)
+    return path
+
+
+def _swap_in(version: Path, path: Path) -> None:
+    """Point ``path`` at ``version`` with an atomic symlink replace, keeping one previous version."""
+    previous = path.resolve() if path.is_symlink() else None
+    if path.is_dir() and not path.is_symlink():
+        # Packages written before versioning are plain directories, which a symlink cannot replace.
+        previous = path.with_name(f"{path.name}.v0")
+        shutil.rmtree(previous, ignore_errors=True)
+        path.rename(previous)
+    link = path.with_name(f"{path.name}.link{os.getpid()}")
+    link.unlink(missing_ok=True)
+    link.symlink_to(version.name)
+    os.replace(link, path)
+    for old in path.parent.glob(f"{path.name}.v*"):
+        if old != version and old != previous:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def read_manifest(path: str | Path) -> dict:
+    manifest = json.loads((Path(path) / MANIFEST).read_text())
+    if manifest.get("format") != PACKAGE_FORMAT or manifest.get("version", 0) > PACKAGE_VERSION:
+        raise PackageIntegrityError(f"{path} is not a supported model package")
+    return manifest
+
+
+def verify_package(path: str | Path, manifest: dict | None = None) -> dict:
+    path = Path(path)
+    manifest = manifest or read_manifest(path)
+    for name, info in manifest["files"].items():
+        file = path / name
+        if not file.exists():
+            raise PackageIntegrityError(f"{file} is missing")
+        if _sha256(file) != info["sha256"]:
+            raise PackageIntegrityError(f"{file} does not match its manifest checksum")
+    return manifest
+
+
+def load_package(path: str | Path, verify: bool = True) -> dict:
+    """Load a package into the payload dict shape ``MLModelService`` scores."""
+    path = Path(path).resolve()  # pin one version even if the package is swapped mid-load
+    manifest = verify_package(path) if verify else read_manifest(path)
+    kind = manifest["kind"]
+    if kind == "lstm":
+        import torch
+
+        from ml.lstm import SimpleLSTMClassifier
+
+        state = {}
+        with warnings.catch_warnings():
+            # The mapped arrays are read-only; inference never writes to the weights.
+            warnings.simplefilter("ignore", UserWarning)
+            for name in manifest["files"]:
+                if name.startswith("tensors/"):
+                    array = np.load(path / name, mmap_mode="r")
+                    state[Path(name).stem] = torch.from_numpy(array)
+        with torch.device("meta"):
+            model = SimpleLSTMClassifier(manifest["input_dim"], manifest.get("hidden_dim", 32))
+        model.load_state_dict(state, assign=True)
+        model.requires_grad_(False)
+        model.eval()
+    elif kind == "xgboost":
+        import xgboost as xgb
+
+        model = xgb.XGBClassifier(**manifest.get("xgboost_params", {}))
+        model.load_model(str(path / "model.ubj"))
+    else:
+        import joblib
+
+        model = joblib.load(path / "model.joblib", mmap_mode="r")
+
+    payload = {key: manifest[key] for key in _METADATA_KEYS if key in manifest}
+    payload.update({"model": model, "kind": kind, "manifest": manifest})
+    return payload
+
+
+def load_legacy(artifact: str | Path) -> dict:
+    """Load a ``.pkl``/``.pt`` artifact into the same payload shape as ``load_package``."""
+    artifact = Path(artifact)
+    if artifact.suffix == ".pt":
+        import torch
+
+        from ml.lstm import SimpleLSTMClassifier
+
+        payload = torch.load(artifact, map_location="cpu")
+        model = SimpleLSTMClassifier(payload["input_dim"], payload.get("hidden_dim", 32))
+        model.load_state_dict(payload["state_dict"])
+        model.eval()
+        payload["model"] = model
+        return payload
+    import joblib
+
+    payload = joblib.load(artifact)
+    return payload if isinstance(payload, dict) else {"model": payload, "feature_order": []}
+
+
+def convert(artifact: str | Path, output: str | Path | None = None) -> Path:
+    payload = load_legacy(artifact)
+    extra = {key: payload[key] for key in _METADATA_KEYS if key in payload and key != "feature_order"}
+    extra["source"] = Path(artifact).name
+    return save_package(payload["model"], output or package_path(artifact), payload.get("feature_order", []), extra)
+
+
+_PROBE = r"""
+import json, sys, time
+sys.path.insert(0, {backend!r})
+from ml import model_package
+
+def status(field):
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return None
+
+# Import the ML stack up front so only deserialization is timed.
+import joblib, sklearn.ensemble, torch, xgboost  # noqa: F401
+from ml import lstm  # noqa: F401
+
+uri = {uri!r}
+rss_before = status("VmRSS")
+start = time.perf_counter()
+if model_package.is_package(uri):
+    model_package.load_package(uri, verify={verify!r})
+else:
+    model_package.load_legacy(uri)
+print(json.dumps({{
+    "load_seconds": time.perf_counter() - start,
+    "rss_delta_mb": status("VmRSS") - rss_before,
+    "rss_anon_mb": status("RssAnon"),
+    "rss_file_mb": status("RssFile"),
+}}))
+"""
+
+
+def bench(artifact: str | Path, runs: int = 5) -> dict:
+    """Load ``artifact`` and its package in fresh interpreters and compare load time and memory."""
+    package = package_path(artifact)
+    if not is_package(package):
+        convert(artifact, package)
+
+    def probe(uri: Path, verify: bool = True) -> dict:
+        code = _PROBE.format(backend=str(BACKEND_DIR), uri=str(uri), verify=verify)
+        results = []
+        for _ in range(runs):
+            out = subprocess.check_output([sys.executable, "-c", code], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True)
+            results.append(json.loads(out.strip().splitlines()[-1]))
+        return {key: statistics.median(r[key] for r in results) for key in results[0]}
+
+    return {
+        "artifact": str(artifact),
+        "legacy": probe(Path(artifact)),
+        "package": probe(package),
+        "package_unverified": probe(package, verify=False),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model package tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert_cmd = sub.add_parser("convert", help="write <stem>.pkg next to a .pkl/.pt artifact")
+    convert_cmd.add_argument("artifact")
+    convert_cmd.add_argument("--register", choices=["free", "pro", "enterprise"], help="register the package for a plan")
+    verify_cmd = sub.add_parser("verify", help="check a package against its manifest checksums")
+    verify_cmd.add_argument("package")
+    bench_cmd = sub.add_parser("bench", help="compare load time and memory against the legacy artifact")
+    bench_cmd.add_argument("artifact")
+    bench_cmd.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        path = convert(args.artifact)
+        print("Wrote", path)
+        if args.register:
+            import asyncio
+
+            from app.core.database import AsyncSessionLocal
+            from ml.model_registry import register_model_version
+
+            metrics = read_manifest(path).get("metrics", {})
+
+            async def _register():
+                async with AsyncSessionLocal() as session:
+                    await register_model_version(
+                        args.register, str(path), metrics.get("sharpe", 0.0), metrics.get("win_rate", 0.0), session
+                    )
+
+            asyncio.run(_register())
+    elif args.command == "verify":
+        manifest = verify_package(args.package)
+        print(f"{args.package}: {len(manifest['files'])} files OK")
+    else:
+        print(json.dumps(bench(args.artifact, args.runs), indent=2))
@@ -1,31 +1,98 @@
+from pathlib import Path
 from typing import List, Optional
 
-from sqlalchemy import select
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import AsyncSessionLocal
-from app.models.model_version import ModelVersion
+from app.models.model_version import ActiveModel, ModelVersion
 
+# Same directory as ml.utils.MODEL_DIR, without importing torch into the API process.
+MODEL_DIR = Path(__file__).resolve().parent / "models"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
-async def register_model_version(plan: str, uri: str, sharpe: float, win_rate: float, db_session: AsyncSession) -> ModelVersion:
+
+def _upsert_active(dialect: str, version: ModelVersion):
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(ActiveModel).values(plan=version.plan, model_version_id=version.id, uri=version.uri, promoted_at=func.now())
+    return stmt.on_conflict_do_update(
+        index_elements=[ActiveModel.plan],
+        set_={"model_version_id": version.id, "uri": version.uri, "promoted_at": func.now()},
+    )
+
+
+async def register_model_version(
+    plan: str, uri: str, sharpe: float, win_rate: float, db_session: AsyncSession, promote: bool = True
+) -> ModelVersion:
+    """Record a version and, unless ``promote`` is False, make it the plan's active model in the same transaction."""
     version = ModelVersion(plan=plan, uri=uri, sharpe=sharpe, win_rate=win_rate)
     db_session.add(version)
+    await db_session.flush()
+    if promote:
+        await db_session.execute(_upsert_active(db_session.get_bind().dialect.name, version))
     await db_session.commit()
     await db_session.refresh(version)
     return version
 
 
+async def promote_model_version(version_id: int, db_session: AsyncSession) -> Optional[ModelVersion]:
+    """Point the version's plan at ``version_id`` (also used to roll back to an older version)."""
+    version = await db_session.get(ModelVersion, version_id)
+    if version is None:
+        return None
+    await db_session.execute(_upsert_active(db_session.get_bind().dialect.name, version))
+    await db_session.commit()
+    return version
+
+
+async def is_registered_uri(uri: str, db_session: AsyncSession) -> bool:
+    return await db_session.scalar(select(ModelVersion.id).where(ModelVersion.uri == uri).limit(1)) is not None
+
+
 async def get_latest_model_uri(plan: str, db_session: AsyncSession) -> Optional[str]:
-    result = await db_session.execute(
-        select(ModelVersion).where(ModelVersion.plan == plan).order_by(ModelVersion.created_at.desc())
-    )
-    version = result.scalars().first()
-    return version.uri if version else None
+    uri = await db_session.scalar(select(ActiveModel.uri).where(ActiveModel.plan == plan))
+    if uri is None:
+        # Versions registered with promote=False only; newest one via the (plan, created_at) index.
+        uri = await db_session.scalar(
+            select(ModelVersion.uri)
+            .where(ModelVersion.plan == plan)
+            .order_by(ModelVersion.created_at.desc(), ModelVersion.id.desc())
+            .limit(1)
+        )
+    return uri
 
 
-async def list_model_versions(plan: str | None, db_session: AsyncSession) -> List[ModelVersion]:
-    stmt = select(ModelVersion).order_by(ModelVersion.created_at.desc())
+async def get_active_models(plan: str | None, db_session: AsyncSession) -> List[ModelVersion]:
+    stmt = select(ModelVersion).join(ActiveModel, ActiveModel.model_version_id == ModelVersion.id)
     if plan:
-        stmt = stmt.where(ModelVersion.plan == plan)
+        stmt = stmt.where(ActiveModel.plan == plan)
     result = await db_session.execute(stmt)
     return result.scalars().all()
+
+
+async def list_model_versions(
+    plan: str | None,
+    db_session: AsyncSession,
+    limit: int = DEFAULT_PAGE_SIZE,
+    before_id: int | None = None,
+) -> List[ModelVersion]:
+    """Newest-first page of versions; pass the last row's id as ``before_id`` for the next page.
+
+    Paging is keyset on ``(created_at, id)``: the cursor row's timestamp is looked up
+    in SQL, so each page is an index range scan no matter how deep it is.
+    """
+    stmt = select(ModelVersion).order_by(ModelVersion.created_at.desc(), ModelVersion.id.desc())
+    if plan:
+        stmt = stmt.where(ModelVersion.plan == plan)
+    if before_id is not None:
+        cursor_created_at = select(ModelVersion.created_at).where(ModelVersion.id == before_id).scalar_subquery()
+        stmt = stmt.where(
+            or_(
+                ModelVersion.created_at < cursor_created_at,
+                and_(ModelVersion.created_at == cursor_created_at, ModelVersion.id < before_id),
+            )
+        )
+    result = await db_session.execute(stmt.limit(max(1, min(limit, MAX_PAGE_SIZE))))
+    return result.scalars().all()
@@ -8,9 +8,9 @@ from datetime import datetime
 from pathlib import Path
 from typing import Tuple
 
-import joblib
 import numpy as np
 import torch
+from numpy.lib.stride_tricks import sliding_window_view
 from torch import nn
 from torch.utils.data import DataLoader, TensorDataset
 
@@ -20,10 +20,14 @@ if str(BACKEND_DIR) not in sys.path:
     sys.path.append(str(BACKEND_DIR))
 
 from app.core.database import AsyncSessionLocal  # noqa: E402
-from ml import utils  # noqa: E402
+from ml import feature_store, utils  # noqa: E402
+from ml.labels import DEFAULT_LABEL  # noqa: E402
 from ml.model_registry import get_latest_model_uri, register_model_version  # noqa: E402
+from ml.quantize import compile_checkpoint  # noqa: E402
 from ml.train_enterprise_model import SYMBOL, INTERVAL, train_enterprise_model  # noqa: E402
 
+FEATURE_WARMUP_BARS = 250
+
 
 def load_lstm_checkpoint(uri: str):
     payload = torch.load(uri, map_location="cpu")
@@ -51,7 +55,111 @@ def fine_tune(model: nn.Module, X: np.ndarray, y: np.ndarray, epochs: int = 2, l
     return model
 
 
-async def online_loop(max_cycles: int = 3, eval_interval: int = 1, register: bool = True) -> Tuple[Path, dict]:
+class SequenceBuffer:
+    """Rolling, appendable store of feature rows and labels for LSTM fine-tuning.
+
+    Rows are kept in one contiguous float32 array and sequences are strided views
+    over it, so appending a bar costs O(n_features) and only the sampled windows
+    are ever copied. Sequence ``i`` covers rows ``[i, i + seq_len)`` and is labelled
+    with the target of row ``i + seq_len``, matching ``utils.make_sequence_data``.
+    Storage holds ``2 * capacity`` rows; when it fills up, the newest ``capacity``
+    are moved to the front and older ones are dropped.
+    """
+
+    def __init__(self, seq_len: int, n_features: int, capacity: int = 4096) -> None:
+        self.seq_len = seq_len
+        self.capacity = capacity
+        self._rows = np.empty((2 * capacity, n_features), dtype=np.float32)
+        self._labels = np.empty(2 * capacity, dtype=np.int64)
+        self._returns = np.empty(2 * capacity, dtype=np.float64)
+        self._start = 0
+        self._end = 0
+        self._dropped = 0  # rows discarded from the front, so indices can be tracked across compactions
+        self._unseen_from = 0  # absolute index of the first sequence not yet returned by take_new()
+
+    def __len__(self) -> int:
+        return max(0, self._end - self._start - self.seq_len)
+
+    def append(self, rows: np.ndarray, labels: np.ndarray, returns: np.ndarray) -> int:
+        """Append labelled bars and return how many new sequences became available."""
+        before = len(self)
+        n = len(rows)
+        if n > self.capacity:
+            self._dropped += n - self.capacity
+            rows, labels, returns = rows[-self.capacity :], labels[-self.capacity :], returns[-self.capacity :]
+            n = self.capacity
+        if self._end + n > len(self._rows):
+            keep = min(self._end - self._start, self.capacity - n)
+            src = slice(self._end - keep, self._end)
+            self._dropped += self._end - self._start - keep
+            self._rows[:keep] = self._rows[src]
+            self._labels[:keep] = self._labels[src]
+            self._returns[:keep] = self._returns[src]
+            self._start, self._end = 0, keep
+        self._rows[self._end : self._end + n] = rows
+        self._labels[self._end : self._end + n] = labels
+        self._returns[self._end : self._end + n] = returns
+        self._end += n
+        return len(self) - before
+
+    def sequences(self, idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Materialize ``(X, y, returns)`` for local sequence indices ``idx``."""
+        rows = self._rows[self._start : self._end]
+        windows = sliding_window_view(rows, self.seq_len, axis=0)[:-1].transpose(0, 2, 1)
+        label_idx = idx + self.seq_len
+        return (
+            np.ascontiguousarray(windows[idx]),
+            self._labels[self._start : self._end][label_idx],
+            self._returns[self._start : self._end][label_idx],
+        )
+
+    def take_new(self) -> np.ndarray:
+        """Local indices of sequences added since the previous call."""
+        first = max(self._unseen_from - self._dropped, 0)
+        self._unseen_from = self._dropped + len(self)
+        return np.arange(first, len(self))
+
+    def replay(self, k: int, exclude: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Sample up to ``k`` sequences older than the trailing ``exclude`` ones, without replacement."""
+        older = len(self) - len(exclude)
+        if older <= 0 or k <= 0:
+            return np.empty(0, dtype=np.int64)
+        return rng.choice(older, size=min(k, older), replace=False)
+
+    def recent(self, n: int) -> np.ndarray:
+        return np.arange(max(len(self) - n, 0), len(self))
+
+
+def incremental_features(df, start: int, end: int, warmup: int = FEATURE_WARMUP_BARS):
+    """Features for bars ``[start, end)`` computed from a bounded lookback.
+
+    The rolling windows in ``build_features_pro`` are at most 50 bars and the RSI EWM
+    has converged well within ``warmup`` bars, so the result matches the full-history build.
+    """
+    lo = max(0, start - warmup)
+    features, _ = utils.build_features_pro(df.iloc[lo:end])
+    return features.fillna(0).iloc[start - lo :]
+
+
+async def online_loop(
+    max_cycles: int = 3,
+    eval_interval: int = 1,
+    register: bool = True,
+    bars_per_cycle: int = 10,
+    replay_ratio: float = 2.0,
+    eval_sequences: int = 60,
+    seed: int = 42,
+    compile_inference: bool = False,
+) -> Tuple[Path, dict]:
+    """Fine-tune the latest ENTERPRISE model as bars arrive.
+
+    Streaming is simulated over the stored history: the buffer is seeded with the
+    bars the model has already seen and each cycle appends ``bars_per_cycle`` new
+    ones. Every cycle trains on the new sequences plus ``replay_ratio`` times as many
+    replayed older ones, so its cost tracks the new data rather than the history.
+    ``compile_inference`` writes a parity-checked TorchScript/INT8 artifact next to
+    each saved checkpoint (see ``ml.quantize``).
+    """
     async with AsyncSessionLocal() as session:
         uri = await get_latest_model_uri("enterprise", db_session=session)
         if not uri:
@@ -60,30 +168,52 @@ async def online_loop(max_cycles: int = 3, eval_interval: int = 1, register: boo
         model, payload = load_lstm_checkpoint(uri)
 
         df = utils.load_ohlcv(SYMBOL, INTERVAL)
-        features, target = utils.build_features_pro(df)
-        features = features.fillna(0)
         seq_len = payload.get("seq_len", 20)
+        rng = np.random.default_rng(seed)
+
+        # Fine-tune on the target the model was trained on; checkpoints saved before the
+        # label was recorded were all trained on the default next-bar direction.
+        label = payload.get("label", DEFAULT_LABEL.name)
+        labels = feature_store.cached_labels(df, label, SYMBOL, INTERVAL)
+        target = labels["target"].astype(int)
+        # Resolved labels form one block: a barrier needs a volatility estimate first,
+        # and the newest bars wait for their horizon to close.
+        resolved = np.flatnonzero(labels["resolved"].to_numpy(dtype=bool))
+        first, labelled = resolved[0], resolved[-1] + 1
+        cursor = max(first + seq_len + 1, labelled - max_cycles * bars_per_cycle)
+        features = incremental_features(df, first, cursor)
         feature_order = payload.get("feature_order", list(features.columns))
+        buffer = SequenceBuffer(seq_len, len(feature_order))
+        buffer.append(
+            features[feature_order].to_numpy(np.float32), target.iloc[first:cursor].to_numpy(), features["log_return"].to_numpy()
+        )
+        buffer.take_new()
 
         best_metrics = payload.get("metrics") or {"sharpe": -1e9, "win_rate": 0}
         best_uri = uri
 
         for cycle in range(1, max_cycles + 1):
-            # Simulate streaming by taking the most recent window
-            stream_df = utils.recent_window(features.join(target.rename("target")), days=60 + 10 * cycle)
-            X_seq = utils.make_sequence_data(stream_df[feature_order], seq_len=seq_len)
-            y_seq = stream_df["target"].iloc[seq_len:].to_numpy()
-            if len(y_seq) == 0:
+            end = min(cursor + bars_per_cycle, labelled)
+            if end <= cursor:
                 break
-
-            model = fine_tune(model, X_seq, y_seq, epochs=2, lr=5e-4)
+            features = incremental_features(df, cursor, end)
+            buffer.append(
+                features[feature_order].to_numpy(np.float32), target.iloc[cursor:end].to_numpy(), features["log_return"].to_numpy()
+            )
+            cursor = end
+            new_idx = buffer.take_new()
+            if len(new_idx) == 0:
+                continue
+
+            train_idx = np.concatenate([new_idx, buffer.replay(int(len(new_idx) * replay_ratio), new_idx, rng)])
+            X_train, y_train, _ = buffer.sequences(train_idx)
+            model = fine_tune(model, X_train, y_train, epochs=2, lr=5e-4)
 
             if cycle % eval_interval == 0:
-                preds = []
+                X_eval, _, returns = buffer.sequences(buffer.recent(eval_sequences))
                 with torch.no_grad():
-                    logits = model(torch.tensor(X_seq, dtype=torch.float32))
+                    logits = model(torch.from_numpy(X_eval))
                     preds = torch.argmax(logits, dim=1).cpu().numpy()
-                returns = stream_df["log_return"].iloc[seq_len:]
                 metrics = utils.compute_strategy_metrics(returns, preds)
                 if metrics["sharpe"] > best_metrics.get("sharpe", -1e9):
                     timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
@@ -91,14 +221,17 @@ async def online_loop(max_cycles: int = 3, eval_interval: int = 1, register: boo
                     torch.save(
                         {
                             "state_dict": model.state_dict(),
-                            "input_dim": X_seq.shape[2],
+                            "input_dim": len(feature_order),
                             "hidden_dim": 32,
                             "feature_order": feature_order,
                             "seq_len": seq_len,
+                            "label": label,
                             "metrics": metrics,
                         },
                         model_path,
                     )
+                    if compile_inference:
+                        compile_checkpoint(model_path, X_eval, returns, model=model)
                     best_metrics = metrics
                     best_uri = str(model_path)
                     if register:
@@ -0,0 +1,181 @@
+"""Compiled (TorchScript, optionally INT8) inference artifacts for the enterprise LSTM.
+
+``compile_checkpoint`` builds two candidates from a ``.pt`` checkpoint:
+
+* ``int8``: dynamically quantized LSTM/Linear weights, scripted and frozen;
+* ``float32``: the float model, scripted and frozen.
+
+Each is checked against the eager float model on recent sequences (signal
+agreement and strategy Sharpe) and timed at batch sizes 1 and 64. The INT8 variant
+is used when it passes parity and is not slower than float32 TorchScript;
+otherwise the float32 one is. The selected module is saved next to the checkpoint
+as ``<stem>.ts`` with the full report embedded, and ``MLModelService`` serves it
+in preference to the checkpoint.
+
+    python ml/quantize.py ml/models/enterprise_model_BTC-USD_1d_<ts>.pt
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch import nn
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from ml.lstm import SimpleLSTMClassifier  # noqa: E402
+
+PARITY_MIN_AGREEMENT = 0.97
+PARITY_MAX_SHARPE_DROP = 0.25
+LATENCY_BATCH_SIZES = (1, 64)
+REPORT_FILE = "report.json"
+
+
+def compiled_path(checkpoint: str | Path) -> Path:
+    return Path(checkpoint).with_suffix(".ts")
+
+
+def load_checkpoint(checkpoint: str | Path) -> tuple[SimpleLSTMClassifier, dict]:
+    payload = torch.load(checkpoint, map_location="cpu")
+    model = SimpleLSTMClassifier(payload["input_dim"], payload.get("hidden_dim", 32))
+    model.load_state_dict(payload["state_dict"])
+    model.eval()
+    return model, payload
+
+
+def build_variants(model: nn.Module) -> dict[str, torch.jit.ScriptModule]:
+    model.eval()
+    quantized = torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+    return {
+        "int8": torch.jit.freeze(torch.jit.script(quantized)),
+        "float32": torch.jit.freeze(torch.jit.script(model)),
+    }
+
+
+def _predict(module, X: torch.Tensor) -> np.ndarray:
+    with torch.no_grad():
+        return torch.argmax(module(X), dim=1).numpy()
+
+
+def _latency_us(module, X: torch.Tensor, repeats: int = 200) -> dict[str, float]:
+    out = {}
+    with torch.no_grad():
+        for batch in LATENCY_BATCH_SIZES:
+            xb = X[:batch]
+            for _ in range(10):
+                module(xb)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                module(xb)
+            out[f"batch_{batch}"] = (time.perf_counter() - start) / repeats * 1e6
+    return out
+
+
+def _serialized_bytes(module) -> int:
+    buffer = io.BytesIO()
+    if isinstance(module, torch.jit.ScriptModule):
+        torch.jit.save(module, buffer)
+    else:
+        torch.save(module.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
+
+
+def parity_report(model: nn.Module, X: np.ndarray, returns: np.ndarray) -> dict:
+    """Agreement, Sharpe, latency and size for each compiled variant against the eager float model."""
+    from ml.utils import compute_strategy_metrics
+
+    X_tensor = torch.from_numpy(np.ascontiguousarray(X, dtype=np.float32))
+    reference = _predict(model, X_tensor)
+    reference_sharpe = compute_strategy_metrics(returns, reference)["sharpe"]
+    report = {
+        "samples": len(X),
+        "reference": {
+            "sharpe": reference_sharpe,
+            "latency_us": _latency_us(model, X_tensor),
+            "bytes": _serialized_bytes(model),
+        },
+        "variants": {},
+    }
+    for name, module in build_variants(model).items():
+        preds = _predict(module, X_tensor)
+        sharpe = compute_strategy_metrics(returns, preds)["sharpe"]
+        agreement = float(np.mean(preds == reference)) if len(preds) else 1.0
+        report["variants"][name] = {
+            "agreement": agreement,
+            "sharpe": sharpe,
+            "passes_parity": agreement >= PARITY_MIN_AGREEMENT and reference_sharpe - sharpe <= PARITY_MAX_SHARPE_DROP,
+            "latency_us": _latency_us(module, X_tensor),
+            "bytes": _serialized_bytes(module),
+            "module": module,
+        }
+    return report
+
+
+def select_variant(report: dict) -> str | None:
+    int8, float32 = report["variants"]["int8"], report["variants"]["float32"]
+    if int8["passes_parity"] and int8["latency_us"]["batch_1"] <= float32["latency_us"]["batch_1"]:
+        return "int8"
+    if float32["passes_parity"]:
+        return "float32"
+    return None
+
+
+def compile_checkpoint(
+    checkpoint: str | Path, X_eval: np.ndarray, returns: np.ndarray, model: nn.Module | None = None
+) -> tuple[Path | None, dict]:
+    """Write ``<stem>.ts`` for ``checkpoint`` if a variant passes parity; returns its path and the report."""
+    if model is None:
+        model, _ = load_checkpoint(checkpoint)
+    report = parity_report(model, X_eval, returns)
+    selected = select_variant(report)
+    modules = {name: variant.pop("module") for name, variant in report["variants"].items()}
+    report["selected"] = selected
+    if selected is None:
+        return None, report
+
+    path = compiled_path(checkpoint)
+    torch.jit.save(modules[selected], str(path), _extra_files={REPORT_FILE: json.dumps(report)})
+    return path, report
+
+
+def load_compiled(path: str | Path) -> tuple[torch.jit.ScriptModule, dict]:
+    extra = {REPORT_FILE: ""}
+    module = torch.jit.load(str(path), map_location="cpu", _extra_files=extra)
+    return module, json.loads(extra[REPORT_FILE] or "{}")
+
+
+def enterprise_eval_sequences(payload: dict, n: int = 256) -> tuple[np.ndarray, np.ndarray]:
+    """Most recent ``n`` enterprise sequences and their returns, built like the trainer does."""
+    from ml import utils
+    from ml.train_enterprise_model import INTERVAL, SYMBOL
+
+    features, _ = utils.build_features_pro(utils.load_ohlcv(SYMBOL, INTERVAL))
+    features = features.fillna(0)
+    feature_order = payload.get("feature_order", list(features.columns))
+    seq_len = payload.get("seq_len", 20)
+    X_seq = utils.make_sequence_data(features[feature_order], seq_len=seq_len)
+    returns = features["log_return"].iloc[seq_len:].to_numpy()
+    return X_seq[-n:], returns[-n:]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile an enterprise LSTM checkpoint for serving")
+    parser.add_argument("checkpoint")
+    parser.add_argument("--samples", type=int, default=256)
+    args = parser.parse_args()
+
+    model, payload = load_checkpoint(args.checkpoint)
+    X_eval, returns = enterprise_eval_sequences(payload, args.samples)
+    path, report = compile_checkpoint(args.checkpoint, X_eval, returns, model=model)
+    print(json.dumps(report, indent=2))
+    print("Compiled artifact:", path or "none (no variant passed parity)")
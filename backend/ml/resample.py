@@ -0,0 +1,310 @@
+"""Coarser OHLCV bars (5m, 15m, 1h, 1d, ...) derived from 1-minute bars.
+
+``aggregate_bars`` does the vectorized work. Bars are bucketed by
+``timestamp // interval`` (UTC, so a day starts at midnight UTC). Then
+``np.*.reduceat`` takes, per bucket, the first open, max high, min low, last
+close and summed volume.
+
+``BarResampler`` applies it incrementally. ``update(symbol, bars)`` aggregates a
+batch of 1m bars for every configured interval and merges the first bucket into
+the bar still open from the previous batch. It returns the bars that are now
+complete; a bucket is complete once a later bucket has been seen. A streaming
+feed passes one bar at a time and a backfill passes csv chunks, and both run
+the same code.
+
+``backfill`` writes the derived bars to ``DATA_DIR/resampled/<symbol>_<interval>.csv``
+with a state file holding the open bars, the byte offset of the source consumed
+so far and a fingerprint of the consumed bytes. A run resumes by seeking to that
+offset, but only if the fingerprint still matches; an edited or replaced source
+is aggregated again from the start. A source row counts once its newline is
+written, so a row still being appended is left for the next run.
+``ensure_interval`` only aggregates source rows appended since the last run. ``utils.load_ohlcv`` calls it for any interval that has no csv of its
+own, so feature builders and trainers can ask for e.g. ``"15m"`` directly.
+
+    python ml/resample.py BTC-USD --intervals 5m 15m 1h 1d
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import itertools
+import json
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = CURRENT_DIR.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from ml import utils  # noqa: E402
+
+BASE_INTERVAL = "1m"
+INTERVAL_SECONDS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14_400, "1d": 86_400}
+DEFAULT_INTERVALS = ("5m", "15m", "1h", "1d")
+RESAMPLED_DIR = utils.DATA_DIR / "resampled"
+BAR_COLUMNS = ("date", "open", "high", "low", "close", "volume")
+# Written explicitly: pandas drops the time from a batch whose bars all fall on midnight.
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def aggregate_bars(
+    timestamps: np.ndarray,
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray,
+    seconds: int,
+) -> dict[str, np.ndarray]:
+    """Aggregate time-ordered bars into ``seconds``-wide buckets; ``bucket`` is the bucket start in ns."""
+    width = np.int64(seconds) * 1_000_000_000
+    bucket = timestamps.astype("datetime64[ns]").view(np.int64) // width
+    if len(bucket) and np.any(np.diff(bucket) < 0):
+        raise ValueError("bars must be in time order")
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]]) if len(bucket) else np.zeros(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(bucket)] - 1
+    return {
+        "bucket": bucket[starts] * width,
+        "open": open_[starts],
+        "high": np.maximum.reduceat(high, starts) if len(starts) else high[:0],
+        "low": np.minimum.reduceat(low, starts) if len(starts) else low[:0],
+        "close": close[ends],
+        "volume": np.add.reduceat(volume, starts) if len(starts) else volume[:0],
+    }
+
+
+def _columns(bars: pd.DataFrame) -> tuple[np.ndarray, ...]:
+    close = bars["close"].to_numpy(dtype=np.float64)
+    return (
+        pd.to_datetime(bars["date"]).to_numpy(dtype="datetime64[ns]"),
+        bars["open"].to_numpy(dtype=np.float64) if "open" in bars else close,
+        bars["high"].to_numpy(dtype=np.float64) if "high" in bars else close,
+        bars["low"].to_numpy(dtype=np.float64) if "low" in bars else close,
+        close,
+        bars["volume"].to_numpy(dtype=np.float64) if "volume" in bars else np.zeros(len(bars)),
+    )
+
+
+@dataclass
+class OpenBar:
+    bucket: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+class BarResampler:
+    def __init__(self, intervals: Iterable[str] = DEFAULT_INTERVALS) -> None:
+        self.intervals = list(intervals)
+        unknown = [i for i in self.intervals if i not in INTERVAL_SECONDS]
+        if unknown:
+            raise ValueError(f"Unsupported intervals {unknown}; known: {sorted(INTERVAL_SECONDS)}")
+        self.open_bars: dict[tuple[str, str], OpenBar] = {}
+
+    def update(self, symbol: str, bars: pd.DataFrame) -> dict[str, pd.DataFrame]:
+        """Fold time-ordered 1m ``bars`` into every interval; returns the bars completed by them."""
+        if bars.empty:
+            return {interval: _frame(None) for interval in self.intervals}
+        return {interval: _frame(done) for interval, done in self.update_arrays(symbol, *_columns(bars)).items()}
+
+    def update_arrays(self, symbol: str, *columns: np.ndarray) -> dict[str, dict[str, np.ndarray]]:
+        """``update`` on raw ``(timestamps, open, high, low, close, volume)`` arrays, without DataFrames."""
+        return {interval: self._update(symbol, interval, columns) for interval in self.intervals}
+
+    def _update(self, symbol: str, interval: str, columns: tuple[np.ndarray, ...]) -> dict[str, np.ndarray]:
+        agg = aggregate_bars(*columns, INTERVAL_SECONDS[interval])
+        key = (symbol, interval)
+        current = self.open_bars.get(key)
+        done = None
+        if current is not None:
+            first = int(agg["bucket"][0])
+            if first < current.bucket:
+                raise ValueError(f"{symbol} bars went back in time ({interval} bucket {first} < {current.bucket})")
+            if first == current.bucket:
+                agg["open"][0] = current.open
+                agg["high"][0] = max(agg["high"][0], current.high)
+                agg["low"][0] = min(agg["low"][0], current.low)
+                agg["volume"][0] += current.volume
+            else:
+                done = {name: np.r_[getattr(current, name), agg[name][:-1]] for name in agg}
+        if done is None:
+            done = {name: values[:-1] for name, values in agg.items()}
+        self.open_bars[key] = OpenBar(*(values[-1].item() for values in agg.values()))
+        return done
+
+    def flush(self, symbol: str) -> dict[str, pd.DataFrame]:
+        """Bars still open for ``symbol`` (not complete yet), one row per interval."""
+        out = {}
+        for interval in self.intervals:
+            current = self.open_bars.get((symbol, interval))
+            out[interval] = _frame({name: np.array([value]) for name, value in asdict(current).items()} if current else None)
+        return out
+
+    def state(self) -> dict:
+        return {f"{symbol}|{interval}": asdict(bar) for (symbol, interval), bar in self.open_bars.items()}
+
+    def load_state(self, state: dict) -> None:
+        self.open_bars = {tuple(key.split("|", 1)): OpenBar(**bar) for key, bar in state.items()}
+
+
+def _frame(values: dict[str, np.ndarray] | None) -> pd.DataFrame:
+    if values is None:
+        values = {"bucket": np.zeros(0, dtype=np.int64), **{name: np.zeros(0) for name in BAR_COLUMNS[1:]}}
+    return pd.DataFrame(
+        {
+            "date": np.asarray(values["bucket"], dtype=np.int64).view("datetime64[ns]"),
+            **{name: np.asarray(values[name], dtype=np.float64) for name in BAR_COLUMNS[1:]},
+        }
+    )
+
+
+def resampled_path(symbol: str, interval: str, directory: Path | None = None) -> Path:
+    return (directory or RESAMPLED_DIR) / f"{symbol.replace('/', '-')}_{interval}.csv"
+
+
+def _state_path(symbol: str, directory: Path) -> Path:
+    return directory / f"{symbol.replace('/', '-')}.state.json"
+
+
+# Bytes hashed at each end of the consumed part of the source to check it is unchanged.
+FINGERPRINT_BYTES = 64 * 1024
+
+
+def _fingerprint(path: Path, offset: int) -> str:
+    """Hash of the first and the last ``FINGERPRINT_BYTES`` before ``offset``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        digest.update(fh.read(min(offset, FINGERPRINT_BYTES)))
+        fh.seek(max(0, offset - FINGERPRINT_BYTES))
+        digest.update(fh.read(min(offset, FINGERPRINT_BYTES)))
+    return digest.hexdigest()
+
+
+def _read_source(path: Path, offset: int, chunk_rows: int) -> Iterator[tuple[pd.DataFrame, int]]:
+    """Chunks of complete rows after byte ``offset``, each with the offset just past it."""
+    with open(path, "rb") as fh:
+        header = fh.readline()
+        if offset:
+            fh.seek(offset)
+        else:
+            offset = fh.tell()
+        while True:
+            lines = list(itertools.islice(fh, chunk_rows))
+            if lines and not lines[-1].endswith(b"\n"):
+                lines.pop()  # still being written
+            if not lines:
+                return
+            data = b"".join(lines)
+            offset += len(data)
+            chunk = pd.read_csv(io.BytesIO(header + data))
+            yield chunk.rename(columns={c: c.lower() for c in chunk.columns}), offset
+            if len(lines) < chunk_rows:
+                return
+
+
+def backfill(
+    symbol: str,
+    intervals: Iterable[str] = DEFAULT_INTERVALS,
+    *,
+    source: Path | None = None,
+    directory: Path | None = None,
+    chunk_rows: int = 500_000,
+    rebuild: bool = False,
+) -> dict:
+    """Derive ``intervals`` for ``symbol`` from its 1m csv, continuing from the saved state when possible.
+
+    Only complete bars are written. The state file records the open bars, the
+    source offset consumed with its fingerprint and each output's size. An append
+    interrupted by a crash is truncated away on the next run.
+    """
+    source = source or utils.ohlcv_path(symbol, BASE_INTERVAL)
+    directory = directory or RESAMPLED_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    intervals = list(intervals)
+    state_path = _state_path(symbol, directory)
+    state = json.loads(state_path.read_text()) if state_path.exists() and not rebuild else {}
+    source_size, source_mtime = source.stat().st_size, source.stat().st_mtime_ns
+    offset = state.get("source_offset", 0)
+    if state and (
+        offset > source_size
+        or state.get("source_fingerprint") != _fingerprint(source, offset)
+        or set(intervals) - set(state.get("sizes", {}))
+    ):
+        state, offset = {}, 0  # source rewritten or new intervals requested: start over
+
+    resampler = BarResampler(intervals)
+    outputs = {interval: resampled_path(symbol, interval, directory) for interval in intervals}
+    if state:
+        resampler.load_state(state["open_bars"])
+        for interval, path in outputs.items():
+            with open(path, "r+b") as fh:
+                fh.truncate(state["sizes"][interval])
+    else:
+        for path in outputs.values():
+            pd.DataFrame(columns=list(BAR_COLUMNS)).to_csv(path, index=False, date_format=DATE_FORMAT)
+
+    consumed = state.get("source_rows", 0)
+    for chunk, offset in _read_source(source, offset, chunk_rows):
+        for interval, bars in resampler.update(symbol, chunk).items():
+            if len(bars):
+                bars.to_csv(outputs[interval], mode="a", header=False, index=False, date_format=DATE_FORMAT)
+        consumed += len(chunk)
+
+    state = {
+        "source": str(source),
+        "source_size": source_size,
+        "source_mtime_ns": source_mtime,
+        "source_rows": consumed,
+        "source_offset": offset,
+        "source_fingerprint": _fingerprint(source, offset),
+        "sizes": {interval: path.stat().st_size for interval, path in outputs.items()},
+        "open_bars": resampler.state(),
+    }
+    tmp = state_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state))
+    tmp.rename(state_path)
+    return state
+
+
+def can_derive(symbol: str, interval: str) -> bool:
+    return interval in INTERVAL_SECONDS and interval != BASE_INTERVAL and utils.ohlcv_path(symbol, BASE_INTERVAL).exists()
+
+
+def ensure_interval(symbol: str, interval: str, directory: Path | None = None) -> Path:
+    """Path of the derived ``interval`` csv, catching up on source rows appended since the last run."""
+    directory = directory or RESAMPLED_DIR
+    source = utils.ohlcv_path(symbol, BASE_INTERVAL)
+    path = resampled_path(symbol, interval, directory)
+    state_path = _state_path(symbol, directory)
+    if path.exists() and state_path.exists():
+        state = json.loads(state_path.read_text())
+        stat = source.stat()
+        if interval in state["sizes"] and (state["source_size"], state.get("source_mtime_ns")) == (stat.st_size, stat.st_mtime_ns):
+            return path
+        intervals = sorted(set(state["sizes"]) | {interval}, key=INTERVAL_SECONDS.get)
+    else:
+        intervals = sorted(set(DEFAULT_INTERVALS) | {interval}, key=INTERVAL_SECONDS.get)
+    backfill(symbol, intervals, source=source, directory=directory)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Derive coarser OHLCV bars from a symbol's 1m csv")
+    parser.add_argument("symbol")
+    parser.add_argument("--intervals", nargs="+", default=list(DEFAULT_INTERVALS), choices=sorted(INTERVAL_SECONDS))
+    parser.add_argument("--chunk-rows", type=int, default=500_000)
+    parser.add_argument("--rebuild", action="store_true", help="ignore saved state and re-derive from the start")
+    args = parser.parse_args()
+
+    result = backfill(args.symbol, args.intervals, chunk_rows=args.chunk_rows, rebuild=args.rebuild)
+    print(json.dumps({k: v for k, v in result.items() if k != "open_bars"}, indent=2))
@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import sys
 from datetime import datetime
@@ -11,17 +12,31 @@ if str(BACKEND_DIR) not in sys.path:
     sys.path.append(str(BACKEND_DIR))
 
 from app.core.database import AsyncSessionLocal  # noqa: E402
-from ml import utils  # noqa: E402
+from ml import feature_store, utils  # noqa: E402
+from ml.labels import DEFAULT_LABEL, LabelSpec  # noqa: E402
 from ml.model_registry import register_model_version  # noqa: E402
+from ml.quantize import compile_checkpoint  # noqa: E402
 
 SYMBOL = "BTC-USD"
 INTERVAL = "1d"
 
 
-def train_enterprise_model(register: bool = True):
-    """Enterprise model uses an LSTM classifier over sequential PRO features."""
-    df = utils.load_ohlcv(SYMBOL, INTERVAL)
-    features, target = utils.build_features_pro(df)
+def train_enterprise_model(
+    register: bool = True,
+    world_size: int = 1,
+    compile_inference: bool = False,
+    interval: str = INTERVAL,
+    label: LabelSpec | str = DEFAULT_LABEL,
+):
+    """Enterprise model uses an LSTM classifier over sequential PRO features.
+
+    With ``world_size > 1`` training is data-parallel across local processes (see ``ml.distributed``).
+    ``compile_inference`` also writes the parity-checked TorchScript/INT8 artifact (see ``ml.quantize``).
+    ``label`` picks the target definition (see ``ml.labels``); the default is the next-bar direction.
+    """
+    df = utils.load_ohlcv(SYMBOL, interval)
+    features, _ = utils.build_features_pro(df)
+    features, target = feature_store.training_rows(features, df, label, SYMBOL, interval)
     features = features.fillna(0)
     feature_order = list(features.columns)
 
@@ -29,12 +44,19 @@ def train_enterprise_model(register: bool = True):
     X_seq = utils.make_sequence_data(features, seq_len=seq_len)
     y_seq = target.iloc[seq_len:].to_numpy()
 
-    model, preds = utils.train_lstm(X_seq, y_seq, feature_order, epochs=10, lr=1e-3)
+    if world_size > 1:
+        from ml.distributed import train_lstm_ddp
+
+        model, _ = train_lstm_ddp(X_seq, y_seq, feature_order, world_size=world_size, epochs=10, lr=1e-3)
+        with torch.no_grad():
+            preds = torch.argmax(model(torch.from_numpy(X_seq)), dim=1).numpy()
+    else:
+        model, preds = utils.train_lstm(X_seq, y_seq, feature_order, epochs=10, lr=1e-3)
     returns_series = features["log_return"].iloc[seq_len:]
     metrics = utils.compute_strategy_metrics(returns_series, preds)
 
     timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    model_path = utils.MODEL_DIR / f"enterprise_model_{SYMBOL}_{INTERVAL}_{timestamp}.pt"
+    model_path = utils.MODEL_DIR / f"enterprise_model_{SYMBOL}_{interval}_{timestamp}.pt"
     model_path.parent.mkdir(parents=True, exist_ok=True)
     torch.save(
         {
@@ -43,9 +65,12 @@ def train_enterprise_model(register: bool = True):
             "hidden_dim": 32,
             "feature_order": feature_order,
             "seq_len": seq_len,
+            "label": LabelSpec.parse(label).name,
         },
         model_path,
     )
+    if compile_inference:
+        compile_checkpoint(model_path, X_seq[-256:], returns_series.to_numpy()[-256:], model=model)
 
     if register:
         async def _register():
@@ -58,6 +83,10 @@ def train_enterprise_model(register: bool = True):
 
 
 if __name__ == "__main__":
-    path, metrics = train_enterprise_model(register=True)
+    parser = argparse.ArgumentParser(description="Train and register the ENTERPRISE model")
+    parser.add_argument("--label", default=DEFAULT_LABEL.name, help="e.g. forward:5, forward:5:0.002, barrier:20:2:1")
+    args = parser.parse_args()
+
+    path, metrics = train_enterprise_model(register=True, label=args.label)
     print("Saved ENTERPRISE model to", path)
     print("Validation metrics", metrics)
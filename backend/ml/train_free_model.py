@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import sys
 from datetime import datetime
@@ -12,16 +13,18 @@ if str(BACKEND_DIR) not in sys.path:
     sys.path.append(str(BACKEND_DIR))
 
 from app.core.database import AsyncSessionLocal  # noqa: E402
-from ml import utils  # noqa: E402
+from ml import feature_store, utils  # noqa: E402
+from ml.labels import DEFAULT_LABEL, LabelSpec  # noqa: E402
 from ml.model_registry import register_model_version  # noqa: E402
 
 SYMBOL = "BTC-USD"
 INTERVAL = "1d"
 
 
-def train_free_model(register: bool = True):
-    df = utils.load_ohlcv(SYMBOL, INTERVAL)
-    features, target = utils.build_features_free(df)
+def train_free_model(register: bool = True, interval: str = INTERVAL, label: LabelSpec | str = DEFAULT_LABEL):
+    df = utils.load_ohlcv(SYMBOL, interval)
+    features, _ = utils.build_features_free(df)
+    features, target = feature_store.training_rows(features, df, label, SYMBOL, interval)
     tscv = TimeSeriesSplit(n_splits=4)
     best_model = None
     best_metrics = {"sharpe": -1e9}
@@ -47,8 +50,8 @@ def train_free_model(register: bool = True):
     val_metrics = utils.compute_strategy_metrics(X_val["log_return"], val_preds)
 
     timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    model_path = utils.MODEL_DIR / f"free_signal_model_{SYMBOL}_{INTERVAL}_{timestamp}.pkl"
-    utils.save_model(best_model, model_path, feature_order, extra={"metrics": val_metrics})
+    model_path = utils.MODEL_DIR / f"free_signal_model_{SYMBOL}_{interval}_{timestamp}.pkl"
+    utils.save_model(best_model, model_path, feature_order, extra={"metrics": val_metrics, "label": LabelSpec.parse(label).name})
 
     if register:
         async def _register():
@@ -61,6 +64,10 @@ def train_free_model(register: bool = True):
 
 
 if __name__ == "__main__":
-    path, metrics = train_free_model(register=True)
+    parser = argparse.ArgumentParser(description="Train and register the FREE model")
+    parser.add_argument("--label", default=DEFAULT_LABEL.name, help="e.g. forward:5, forward:5:0.002, barrier:20:2:1")
+    args = parser.parse_args()
+
+    path, metrics = train_free_model(register=True, label=args.label)
     print("Saved FREE model to", path)
     print("Validation metrics", metrics)
@@ -12,30 +12,31 @@ from sklearn.metrics import accuracy_score
 from sklearn.model_selection import TimeSeriesSplit
 from torch import nn
 
+from ml.lstm import SimpleLSTMClassifier  # noqa: F401  re-exported for trainers and older imports
+
 DATA_DIR = Path(__file__).resolve().parent / "data"
 MODEL_DIR = Path(__file__).resolve().parent / "models"
 MODEL_DIR.mkdir(parents=True, exist_ok=True)
 
 
-class SimpleLSTMClassifier(nn.Module):
-    """Small LSTM classifier for sequence-based enterprise model."""
+def ohlcv_path(symbol: str, interval: str) -> Path:
+    return DATA_DIR / f"{symbol.replace('/', '-')}_{interval}.csv"
+
 
-    def __init__(self, input_dim: int, hidden_dim: int = 32, num_layers: int = 1):
-        super().__init__()
-        self.lstm = nn.LSTM(input_dim, hidden_dim, num_layers=num_layers, batch_first=True)
-        self.head = nn.Sequential(nn.Linear(hidden_dim, 32), nn.ReLU(), nn.Linear(32, 2))
+def has_ohlcv(symbol: str, interval: str) -> bool:
+    """True when ``interval`` bars exist for ``symbol`` or can be derived from its 1m bars."""
+    from ml.resample import can_derive
 
-    def forward(self, x):
-        out, _ = self.lstm(x)
-        last = out[:, -1, :]
-        return self.head(last)
+    return ohlcv_path(symbol, interval).exists() or can_derive(symbol, interval)
 
 
 def load_ohlcv(symbol: str = "BTC-USD", interval: str = "1d") -> pd.DataFrame:
-    """Load OHLCV from csv in data folder; fallback to synthetic data."""
-    path = DATA_DIR / f"{symbol.replace('/', '-')}_{interval}.csv"
+    """Load OHLCV from csv in data folder, derived from 1m bars if needed; fallback to synthetic data."""
+    path = ohlcv_path(symbol, interval)
     if not path.exists():
-        path = DATA_DIR / "sample_prices.csv"
+        from ml.resample import can_derive, ensure_interval
+
+        path = ensure_interval(symbol, interval) if can_derive(symbol, interval) else DATA_DIR / "sample_prices.csv"
     if not path.exists():
         # synthetic fallback
         dates = pd.date_range(end=pd.Timestamp.today(), periods=300, freq="D")
@@ -48,7 +49,8 @@ def load_ohlcv(symbol: str = "BTC-USD", interval: str = "1d") -> pd.DataFrame:
         return df
     df = pd.read_csv(path)
     if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"])
+        # ISO8601 accepts rows with and without a time, e.g. derived bars written before DATE_FORMAT.
+        df["date"] = pd.to_datetime(df["date"], format="ISO8601")
         df = df.sort_values("date")
     df = df.rename(columns={c: c.lower() for c in df.columns})
     if "close" not in df.columns:
@@ -201,6 +203,13 @@ def make_sequence_data(X: pd.DataFrame, seq_len: int = 20) -> np.ndarray:
     return np.stack(sequences)
 
 
+def row_stamps(df: pd.DataFrame) -> pd.Series:
+    """Per-row stamp stored as a model's ``trained_until``: the bar date when present, else the row position."""
+    if "date" in df.columns:
+        return pd.to_datetime(df["date"]).astype(str)
+    return pd.Series(df.index.astype(str), index=df.index)
+
+
 def recent_window(df: pd.DataFrame, days: int = 60) -> pd.DataFrame:
     if "date" not in df.columns:
         return df.tail(days)